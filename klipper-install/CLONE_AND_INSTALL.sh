@@ -65,6 +65,46 @@ else
         echo "  ✓ Copied extras/winder.py"
     fi
     
+    if [ -f "extras/angle_sensor.py" ]; then
+        cp "extras/angle_sensor.py" "$TARGET_DIR/klippy/extras/"
+        echo "  ✓ Copied extras/angle_sensor.py"
+    fi
+    
+    if [ -f "extras/spindle_estimator.py" ]; then
+        cp "extras/spindle_estimator.py" "$TARGET_DIR/klippy/extras/"
+        echo "  ✓ Copied extras/spindle_estimator.py"
+    fi
+    
+    if [ -f "extras/spindle_speed.py" ]; then
+        cp "extras/spindle_speed.py" "$TARGET_DIR/klippy/extras/"
+        echo "  ✓ Copied extras/spindle_speed.py"
+    fi
+    
+    if [ -f "extras/winder_jobs.py" ]; then
+        cp "extras/winder_jobs.py" "$TARGET_DIR/klippy/extras/"
+        echo "  ✓ Copied extras/winder_jobs.py"
+    fi
+    
+    if [ -f "extras/winder_events.py" ]; then
+        cp "extras/winder_events.py" "$TARGET_DIR/klippy/extras/"
+        echo "  ✓ Copied extras/winder_events.py"
+    fi
+    
+    if [ -f "extras/winder_journal.py" ]; then
+        cp "extras/winder_journal.py" "$TARGET_DIR/klippy/extras/"
+        echo "  ✓ Copied extras/winder_journal.py"
+    fi
+    
+    if [ -f "extras/winder_quality.py" ]; then
+        cp "extras/winder_quality.py" "$TARGET_DIR/klippy/extras/"
+        echo "  ✓ Copied extras/winder_quality.py"
+    fi
+    
+    if [ -f "extras/winder_sim.py" ]; then
+        cp "extras/winder_sim.py" "$TARGET_DIR/klippy/extras/"
+        echo "  ✓ Copied extras/winder_sim.py"
+    fi
+    
     if [ -f "kinematics/winder.py" ]; then
         cp "kinematics/winder.py" "$TARGET_DIR/klippy/kinematics/"
         echo "  ✓ Copied kinematics/winder.py"
@@ -75,6 +115,16 @@ else
         echo "  ✓ Copied .config.winder-minimal"
     fi
     
+    # Pulse counter with Hall edge capture (host module and MCU source)
+    if [ -f "scripts/patch_pulse_counter.sh" ]; then
+        ./scripts/patch_pulse_counter.sh "$TARGET_DIR" || true
+    fi
+    
+    # Bulk ADC streaming for angle_sample_rate (MCU source)
+    if [ -f "scripts/patch_adc_bulk.sh" ]; then
+        ./scripts/patch_adc_bulk.sh "$TARGET_DIR" || true
+    fi
+    
     # Copy scripts
     if [ -d "scripts" ]; then
         cp scripts/*.py "$TARGET_DIR/scripts/" 2>/dev/null || true
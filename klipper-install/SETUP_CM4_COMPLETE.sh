@@ -295,8 +295,18 @@ cd "$INSTALL_DIR"
 [ -f "install.sh" ] && ./install.sh "$KLIPPER_DIR" || {
     mkdir -p "$KLIPPER_DIR/klippy/extras" "$KLIPPER_DIR/klippy/kinematics"
     [ -f "extras/winder.py" ] && cp extras/winder.py "$KLIPPER_DIR/klippy/extras/" && echo "  ✓ winder.py"
+    [ -f "extras/angle_sensor.py" ] && cp extras/angle_sensor.py "$KLIPPER_DIR/klippy/extras/" && echo "  ✓ angle_sensor.py"
+    [ -f "extras/spindle_estimator.py" ] && cp extras/spindle_estimator.py "$KLIPPER_DIR/klippy/extras/" && echo "  ✓ spindle_estimator.py"
+    [ -f "extras/spindle_speed.py" ] && cp extras/spindle_speed.py "$KLIPPER_DIR/klippy/extras/" && echo "  ✓ spindle_speed.py"
+    [ -f "extras/winder_jobs.py" ] && cp extras/winder_jobs.py "$KLIPPER_DIR/klippy/extras/" && echo "  ✓ winder_jobs.py"
+    [ -f "extras/winder_events.py" ] && cp extras/winder_events.py "$KLIPPER_DIR/klippy/extras/" && echo "  ✓ winder_events.py"
+    [ -f "extras/winder_journal.py" ] && cp extras/winder_journal.py "$KLIPPER_DIR/klippy/extras/" && echo "  ✓ winder_journal.py"
+    [ -f "extras/winder_quality.py" ] && cp extras/winder_quality.py "$KLIPPER_DIR/klippy/extras/" && echo "  ✓ winder_quality.py"
+    [ -f "extras/winder_sim.py" ] && cp extras/winder_sim.py "$KLIPPER_DIR/klippy/extras/" && echo "  ✓ winder_sim.py"
     [ -f "kinematics/winder.py" ] && cp kinematics/winder.py "$KLIPPER_DIR/klippy/kinematics/" && echo "  ✓ kinematics/winder.py"
     [ -f ".config.winder-minimal" ] && cp .config.winder-minimal "$KLIPPER_DIR/.config.winder-minimal" && echo "  ✓ .config preset"
+    [ -f "scripts/patch_pulse_counter.sh" ] && ./scripts/patch_pulse_counter.sh "$KLIPPER_DIR" || true
+    [ -f "scripts/patch_adc_bulk.sh" ] && ./scripts/patch_adc_bulk.sh "$KLIPPER_DIR" || true
 }
 echo -e "${GREEN}✓ Custom files installed${NC}"
 
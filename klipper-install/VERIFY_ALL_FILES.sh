@@ -36,6 +36,21 @@ check_file() {
 }
 
 check_file "extras/winder.py"
+check_file "extras/angle_sensor.py"
+check_file "extras/spindle_estimator.py"
+check_file "extras/spindle_speed.py"
+check_file "extras/winder_jobs.py"
+check_file "extras/winder_events.py"
+check_file "extras/winder_journal.py"
+check_file "extras/winder_quality.py"
+check_file "extras/winder_sim.py"
+check_file "extras/pulse_counter.py"
+check_file "src/pulse_counter.c"
+check_file "scripts/patch_pulse_counter.sh"
+check_file "scripts/patch_adc_bulk.sh"
+check_file "src/adc_bulk.c"
+check_file "test/klippy/winder_sim.cfg"
+check_file "test/klippy/winder_sim.test"
 check_file "kinematics/winder.py"
 check_file ".config.winder-minimal"
 check_file "install.sh"
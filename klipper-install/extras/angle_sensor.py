@@ -5,18 +5,83 @@
 # This file may be distributed under the terms of the GNU GPLv3 license.
 import logging
 import math
+from . import bulk_sensor
 
 REPORT_TIME = 0.100  # Report RPM every 100ms
 SAMPLE_TIME = 0.001  # Sample ADC every 1ms
 SAMPLE_COUNT = 4     # Average 4 samples
 CALLBACK_TIME = 0.01 # Callback every 10ms for buffering
+BULK_BATCH_TIME = 0.05 # Process streamed ADC samples every 50ms
+
+class BulkADC:
+    """Fixed-rate ADC sampling streamed in sensor_bulk_data blocks
+    The MCU samples the pin every 1/sample_rate seconds (adc_bulk.c) and
+    packs the readings 25 to a message; FixedFreqReader reconstructs the
+    sample times. Samples are handed to the callback in batches every
+    BULK_BATCH_TIME as (read_time, value) with value in 0.0-1.0, the same
+    as an MCU_adc callback, but without a message per sample.
+    """
+    def __init__(self, printer, pin, sample_rate):
+        self.printer = printer
+        self.sample_rate = sample_rate
+        ppins = printer.lookup_object('pins')
+        pin_params = ppins.lookup_pin(pin)
+        self.mcu = mcu = pin_params['chip']
+        self.pin = pin_params['pin']
+        self.oid = mcu.create_oid()
+        self.callback = None
+        self.inv_max = 1.0
+        self.last_value = (0.0, 0.0)
+        chip_smooth = sample_rate * BULK_BATCH_TIME * 2
+        self.ffreader = bulk_sensor.FixedFreqReader(mcu, chip_smooth, "<H")
+        self.batch_bulk = bulk_sensor.BatchBulkHelper(
+            printer, self._process_batch, self._start_measurements,
+            self._finish_measurements, BULK_BATCH_TIME)
+        self.query_adc_bulk_cmd = None
+        mcu.add_config_cmd("config_adc_bulk oid=%d pin=%s"
+                           % (self.oid, self.pin))
+        mcu.add_config_cmd("query_adc_bulk oid=%d rest_ticks=0"
+                           % (self.oid,), on_restart=True)
+        mcu.register_config_callback(self._build_config)
+        printer.register_event_handler("klippy:ready", self._handle_ready)
+    def _build_config(self):
+        self.inv_max = 1.0 / self.mcu.get_constant_float("ADC_MAX")
+        self.query_adc_bulk_cmd = self.mcu.lookup_command(
+            "query_adc_bulk oid=%c rest_ticks=%u")
+        self.ffreader.setup_query_command("query_adc_bulk_status oid=%c",
+                                          oid=self.oid,
+                                          cq=self.mcu.alloc_command_queue())
+    def setup_adc_callback(self, callback):
+        self.callback = callback
+    def get_last_value(self):
+        return self.last_value
+    def _handle_ready(self):
+        # Stream for as long as klippy runs
+        self.batch_bulk.add_client(lambda msg: True)
+    def _start_measurements(self):
+        rest_ticks = self.mcu.seconds_to_clock(1.0 / self.sample_rate)
+        self.query_adc_bulk_cmd.send([self.oid, rest_ticks])
+        self.ffreader.note_start()
+    def _finish_measurements(self):
+        if self.printer.is_shutdown():
+            return
+        self.query_adc_bulk_cmd.send_wait_ack([self.oid, 0])
+        self.ffreader.note_end()
+    def _process_batch(self, eventtime):
+        samples = self.ffreader.pull_samples()
+        if not samples:
+            return {}
+        callback = self.callback
+        inv_max = self.inv_max
+        if callback is not None:
+            for read_time, raw in samples:
+                callback(read_time, raw * inv_max)
+        read_time, raw = samples[-1]
+        self.last_value = (raw * inv_max, read_time)
+        return {}
 
 class AngleSensor:
-    """ADC-based angle sensor with saturation handling and Hall sensor integration"""
-    
-    # Pre-calculated constants
-    RAD_TO_RPM = 60.0 / (2.0 * math.pi)  # ~9.5493
-    MIN_TIME_DIFF = 0.0001  # 100 microseconds minimum for valid RPM calculation
+    """ADC-based angle sensor feeding the shared spindle estimator"""
     
     def __init__(self, config):
         self.printer = config.get_printer()
@@ -37,9 +102,13 @@ class AngleSensor:
         # Saturation threshold
         self.saturation_threshold = config.getfloat('saturation_threshold', 0.95, minval=0.8, maxval=1.0)
         
+        # Stream samples at this rate via sensor_bulk (0 = one
+        # analog_in_state message every CALLBACK_TIME)
+        self.sample_rate = config.getfloat('sample_rate', 0.0, minval=0.0,
+                                           maxval=5000.0)
+        
         # State
         self.mcu_adc = None
-        self.current_rpm = 0.0
         self.current_angle = 0.0  # Current angle in degrees
         self.current_angle_rad = 0.0  # Current angle in radians
         self.angle_revolutions = 0  # Full revolutions tracked
@@ -51,19 +120,19 @@ class AngleSensor:
         self._angle_calibration_samples = 0
         self._angle_calibration_complete = False
         
-        # Buffering for RPM calculation
-        self.angle_buffer = []
-        self.angle_buffer_max = 10  # 10 samples = 100ms at 10ms intervals
-        
-        # RPM smoothing
-        self._angle_smoothed_rpm = 0.0
+        if self.sample_rate:
+            self.mcu_adc = BulkADC(self.printer, self.sensor_pin,
+                                   self.sample_rate)
+            self.mcu_adc.setup_adc_callback(self._adc_callback)
         
         # Last values
         self.last_angle_value = None
         self.last_angle_time = None
         
-        # Hall sensor reference (for saturation handling)
-        self.spindle_hall = None
+        # Fused spindle state (bridges saturation gaps with Hall edges),
+        # the only consumer of the angle readings
+        self.estimator = self.printer.load_object(config, 'spindle_estimator')
+        self.estimator.register_source('angle', self.name)
         
         # Register event handlers
         self.printer.register_event_handler("klippy:connect", self.handle_connect)
@@ -77,6 +146,10 @@ class AngleSensor:
     
     def handle_connect(self):
         """Setup ADC pin when MCU connects"""
+        if self.sample_rate:
+            logging.info("Angle sensor '%s' streaming pin %s at %.0f Hz"
+                         % (self.name, self.sensor_pin, self.sample_rate))
+            return
         ppins = self.printer.lookup_object('pins')
         self.mcu_adc = ppins.setup_pin('adc', self.sensor_pin)
         
@@ -91,12 +164,6 @@ class AngleSensor:
         except Exception:
             pass  # query_adc not available - ADC callbacks still work
         
-        # Try to get spindle_hall reference for saturation handling
-        try:
-            self.spindle_hall = self.printer.lookup_object('spindle_hall', None)
-        except Exception:
-            pass
-        
         logging.info("Angle sensor '%s' initialized on pin %s" % (self.name, self.sensor_pin))
     
     def _adc_callback(self, read_time, read_value):
@@ -154,20 +221,11 @@ class AngleSensor:
         current_angle_rad = mapped_value * 2.0 * math.pi
         current_angle_deg = current_angle_rad * 180.0 / math.pi
         
-        # Add to buffer
-        hall_count = 0
-        if self.spindle_hall:
-            hall_count = self.spindle_hall.get_count()
-        
-        self.angle_buffer.append((read_time, current_angle_rad, hall_count))
-        
-        # Keep only last N samples
-        if len(self.angle_buffer) > self.angle_buffer_max:
-            self.angle_buffer.pop(0)
-        
-        # Process buffer every 100ms
-        if len(self.angle_buffer) >= self.angle_buffer_max:
-            self._process_buffer()
+        if not self.is_saturated:
+            # Saturated readings are skipped - the estimator coasts on the
+            # Hall edges and unwraps the next reading against its state
+            self.estimator.update_angle(read_time, mapped_value)
+        self.angle_revolutions = int(self.estimator.get_turns())
         
         # Update last values
         self.last_angle_value = current_angle_rad
@@ -175,53 +233,9 @@ class AngleSensor:
         self.current_angle_rad = current_angle_rad
         self.current_angle = current_angle_deg
     
-    def _process_buffer(self):
-        """Process buffered samples to calculate RPM"""
-        if len(self.angle_buffer) < 2:
-            return
-        
-        first_time, first_angle, first_hall = self.angle_buffer[0]
-        last_time, last_angle, last_hall = self.angle_buffer[-1]
-        
-        time_diff = last_time - first_time
-        if time_diff < self.MIN_TIME_DIFF:
-            return
-        
-        # Calculate angle change
-        angle_diff_rad = last_angle - first_angle
-        
-        # Handle wraparound
-        if angle_diff_rad > math.pi:
-            angle_diff_rad -= 2.0 * math.pi
-        elif angle_diff_rad < -math.pi:
-            angle_diff_rad += 2.0 * math.pi
-        
-        # Calculate RPM
-        if not self.is_saturated:
-            angular_velocity_rad_s = angle_diff_rad / time_diff
-            calculated_rpm = abs(angular_velocity_rad_s) * self.RAD_TO_RPM
-        else:
-            # Use Hall sensor if saturated
-            if self.spindle_hall:
-                calculated_rpm = self.spindle_hall.get_rpm()
-            else:
-                calculated_rpm = 0.0
-        
-        # Smooth RPM
-        alpha = 0.3
-        if not hasattr(self, '_angle_smoothed_rpm'):
-            self._angle_smoothed_rpm = calculated_rpm
-        else:
-            self._angle_smoothed_rpm = alpha * calculated_rpm + (1.0 - alpha) * self._angle_smoothed_rpm
-        
-        self.current_rpm = self._angle_smoothed_rpm
-        
-        # Clear buffer
-        self.angle_buffer = []
-    
     def get_rpm(self):
-        """Get current RPM"""
-        return self.current_rpm
+        """Get current RPM (fused spindle estimate)"""
+        return self.estimator.get_rpm()
     
     def get_angle(self):
         """Get current angle in degrees"""
@@ -230,7 +244,7 @@ class AngleSensor:
     def get_status(self, eventtime):
         """Get status for API"""
         return {
-            'rpm': self.current_rpm,
+            'rpm': self.estimator.get_rpm(),
             'angle': self.current_angle,
             'angle_rad': self.current_angle_rad,
             'revolutions': self.angle_revolutions,
@@ -268,7 +282,7 @@ class AngleSensor:
         gcmd.respond_info("Angle Sensor '%s':" % self.name)
         gcmd.respond_info("  ADC: %.6f (raw), %.6f (mapped)" % (value, mapped_value))
         gcmd.respond_info("  Angle: %.2f°" % angle_deg)
-        gcmd.respond_info("  RPM: %.1f" % self.current_rpm)
+        gcmd.respond_info("  RPM: %.1f" % self.estimator.get_rpm())
         gcmd.respond_info("  Saturated: %s" % self.is_saturated)
         if self._angle_calibration_complete:
             gcmd.respond_info("  Calibrated: %.4f - %.4f" % (adc_min, adc_max))
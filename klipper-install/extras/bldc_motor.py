@@ -4,6 +4,7 @@
 #
 # This file may be distributed under the terms of the GNU GPLv3 license.
 import logging
+from . import spindle_speed
 
 class BLDCMotor:
     def __init__(self, config):
@@ -21,6 +22,9 @@ class BLDCMotor:
         self.min_rpm = config.getfloat('min_rpm', 10.0, above=0.0)
         self.pwm_frequency = config.getfloat('pwm_frequency', 1000.0, above=0.0)
         self.min_pwm_duty = config.getfloat('min_pwm_duty', 0.05, minval=0.0, maxval=1.0)
+        # Measured RPM -> PWM duty map (same format as the winder's
+        # WINDER_CALIBRATE_PWM result); linear up to max_rpm if not set
+        self.pwm_map = spindle_speed.load_pwm_map(config, self.max_rpm)
         
         # Direction control
         # BLDC controller: DIR pin LOW = change direction, HIGH = normal
@@ -197,10 +201,9 @@ class BLDCMotor:
             self.stop_motor()
             return
         
-        # Calculate PWM duty cycle
-        # Linear mapping: 0 RPM = 0%, max_rpm = 100%
+        # Calculate PWM duty cycle from the calibrated map
         # But enforce minimum duty cycle
-        duty_cycle = rpm / self.max_rpm
+        duty_cycle = self.pwm_map.get_duty(rpm)
         duty_cycle = max(self.min_pwm_duty, min(duty_cycle, 1.0))
         
         toolhead = self.printer.lookup_object('toolhead')
@@ -0,0 +1,216 @@
+# Spindle State Estimator (Hall + ADC angle fusion)
+#
+# Copyright (C) 2024
+#
+# This file may be distributed under the terms of the GNU GPLv3 license.
+import math
+import threading
+
+STALE_TIME = 2.0  # Velocity drops to zero after this long without a measurement
+
+class SpindleEstimator:
+    """Alpha-beta-gamma filter for spindle angle, velocity and acceleration
+
+    Measurements come from the Hall edge counter (edge timestamps from
+    MCU_counter) and the ADC angle sensor (0-1 turn readings). Both update
+    one shared state, so the winder, angle_sensor and spindle_hall modules
+    all see the same estimate. The state is in turns, turns/s and turns/s^2
+    at print_time.
+
+    Hall edges only give relative turns: the first edge fixes the phase and
+    only edges of that polarity are used afterwards (the Hall pulse is not
+    50% duty). ADC readings are unwrapped against the predicted angle.
+
+    Measurements arrive from the MCU response threads, so updates are
+    serialized with a lock and the published state is a single tuple.
+    """
+    def __init__(self, config):
+        self.printer = config.get_printer()
+        self.name = config.get_name()
+        # Fading memory factor per source (0 = trust every measurement,
+        # closer to 1 = smoother); Hall edge times are precise, the ADC
+        # angle is noisy but arrives ten times as often
+        self.hall_smoothing = config.getfloat('hall_smoothing', 0.3,
+                                              minval=0.0, below=1.0)
+        self.angle_smoothing = config.getfloat('angle_smoothing', 0.8,
+                                               minval=0.0, below=1.0)
+        self.hall_gains = self._calc_gains(self.hall_smoothing)
+        self.angle_gains = self._calc_gains(self.angle_smoothing)
+        self.lock = threading.Lock()
+        self.callbacks = []
+        self.sources = {}
+        self.reset()
+        self.printer.register_event_handler("klippy:shutdown", self.reset)
+
+    def _calc_gains(self, theta):
+        # Fading memory alpha-beta-gamma gains (critically damped)
+        alpha = 1.0 - theta**3
+        beta = 1.5 * (1.0 - theta)**2 * (1.0 + theta)
+        gamma = 0.5 * (1.0 - theta)**3
+        return alpha, beta, gamma
+
+    def reset(self):
+        """Forget the spindle state (eg, after a shutdown)"""
+        self.state = (0.0, 0.0, 0.0, 0.0)  # (print_time, turns, velocity, accel)
+        self.initialized = False
+        self.hall_ref = None       # (count, turns) of the reference Hall edge
+        self.hall_last = None      # (count_time, count) of the last edge
+        self.hall_count = None     # Count of the last used (same polarity) edge
+        self.hall_time = None      # Time of the last Hall measurement
+        self.angle_time = None     # Time of the last ADC measurement
+
+    def register_source(self, source, owner):
+        """Claim the 'hall' or 'angle' input for the config section owner
+        A second Hall counter (or angle sensor) would feed another count
+        into the same state, so only one section may provide each."""
+        other = self.sources.setdefault(source, owner)
+        if other != owner:
+            raise self.printer.config_error(
+                "Spindle %s input is already provided by [%s], remove it"
+                " from [%s]" % (source, other, owner))
+
+    def register_callback(self, cb):
+        """cb(print_time, turns, velocity, accel), called whenever the
+        state changes, from the MCU response thread - keep it short"""
+        self.callbacks.append(cb)
+
+    # Filter core (caller holds self.lock)
+    def _predict(self, print_time):
+        t, turns, velocity, accel = self.state
+        dt = print_time - t
+        return (turns + (velocity + .5 * accel * dt) * dt,
+                velocity + accel * dt, accel)
+
+    def _correct(self, print_time, measured, gains, interval):
+        turns, velocity, accel = self._predict(print_time)
+        if not self.initialized:
+            self.state = (print_time, measured, 0.0, 0.0)
+            self.initialized = True
+            return
+        alpha, beta, gamma = gains
+        resid = measured - turns
+        turns += alpha * resid
+        if interval > 0.0:
+            velocity += beta * resid / interval
+            accel += 2.0 * gamma * resid / (interval * interval)
+        last_time = self.state[0]
+        if print_time < last_time:
+            # Older than the state (sources on different MCUs/messages) -
+            # carry the correction forward to the state time
+            dt = last_time - print_time
+            turns += (velocity + .5 * accel * dt) * dt
+            velocity += accel * dt
+            print_time = last_time
+        self.state = (print_time, turns, velocity, accel)
+
+    def _notify(self):
+        state = self.state
+        for cb in self.callbacks:
+            cb(*state)
+
+    # Measurement inputs
+    def update_hall(self, print_time, count, count_time, pulses_per_rev):
+        """Feed an MCU_counter report (count of both edges)"""
+        with self.lock:
+            edges_per_rev = 2 * pulses_per_rev
+            ref = self.hall_ref
+            if ref is None:
+                if self.hall_last is not None and count != self.hall_last[1]:
+                    # First edge - fix the Hall phase at the current estimate
+                    turns = self._predict(count_time)[0]
+                    if not self.initialized:
+                        turns = 0.0
+                    self.hall_ref = (count, turns)
+                    self.hall_count = count
+                    self.hall_time = count_time
+                    if not self.initialized:
+                        self.state = (count_time, turns, 0.0, 0.0)
+                        self.initialized = True
+                self.hall_last = (count_time, count)
+                return
+            if count != self.hall_last[1] and (count - ref[0]) & 1 == 0:
+                interval = count_time - self.hall_time
+                measured = ref[1] + float(count - ref[0]) / edges_per_rev
+                if self.hall_count == ref[0] and self.angle_time is None:
+                    # Second edge - start from the mean speed between the
+                    # two edges instead of letting the filter find it
+                    self.state = (count_time, measured,
+                                  (measured - ref[1]) / interval, 0.0)
+                else:
+                    self._correct(count_time, measured, self.hall_gains,
+                                  interval)
+                self.hall_count = count
+                self.hall_time = count_time
+                self.hall_last = (count_time, count)
+            elif count != self.hall_last[1]:
+                self.hall_last = (count_time, count)
+                return
+            else:
+                # No new edge - bound the speed by the time since the last
+                # edge, unless the angle sensor is tracking the spindle
+                if (self.angle_time is not None
+                        and print_time - self.angle_time < STALE_TIME):
+                    return
+                if not self._check_stale(print_time, 1.0 / pulses_per_rev):
+                    return
+            self._notify()
+
+    def update_angle(self, read_time, angle):
+        """Feed an unsaturated ADC angle reading (0.0-1.0 of a turn)"""
+        with self.lock:
+            if self.initialized:
+                predicted = self._predict(read_time)[0]
+                measured = angle + math.floor(predicted - angle + 0.5)
+            else:
+                measured = angle
+            interval = 0.0
+            if self.angle_time is not None:
+                interval = read_time - self.angle_time
+            self._correct(read_time, measured, self.angle_gains, interval)
+            self.angle_time = read_time
+            self._notify()
+
+    def _check_stale(self, print_time, turns_per_edge):
+        t, turns, velocity, accel = self.state
+        idle = print_time - self.hall_time
+        if idle >= STALE_TIME:
+            max_velocity = 0.0
+        elif idle > 0.0:
+            max_velocity = turns_per_edge / idle
+        else:
+            return False
+        if abs(velocity) <= max_velocity and (velocity or not accel):
+            return False
+        velocity = math.copysign(max_velocity, velocity)
+        self.state = (t, turns, velocity, 0.0)
+        return True
+
+    # Queries
+    def get_state(self):
+        """Return (print_time, turns, velocity, accel)"""
+        return self.state
+    def get_turns(self, print_time=None):
+        if print_time is None:
+            return self.state[1]
+        with self.lock:
+            return self._predict(print_time)[0]
+    def get_velocity(self):
+        """Spindle speed in turns per second"""
+        return self.state[2]
+    def get_rpm(self):
+        return abs(self.state[2]) * 60.0
+    def get_angle(self):
+        """Spindle angle in degrees (0-360)"""
+        return (self.state[1] % 1.0) * 360.0
+    def get_status(self, eventtime):
+        t, turns, velocity, accel = self.state
+        return {
+            'print_time': t,
+            'turns': turns,
+            'angle': (turns % 1.0) * 360.0,
+            'rpm': velocity * 60.0,
+            'acceleration': accel * 60.0,  # RPM per second
+        }
+
+def load_config(config):
+    return SpindleEstimator(config)
@@ -0,0 +1,112 @@
+# Spindle speed control: learned RPM to PWM map and PI speed loop
+#
+# Copyright (C) 2024
+#
+# This file may be distributed under the terms of the GNU GPLv3 license.
+import bisect
+
+# The speed loop only integrates within this fraction of the target speed
+# (the map already gets the spindle close, the integrator only trims it)
+SPEED_INTEGRAL_BAND = 0.2
+# Largest integrator correction, as a fraction of the target speed
+SPEED_INTEGRAL_MAX = 0.2
+
+class PWMMap:
+    """Piecewise linear RPM to PWM duty map
+    The points are (duty, rpm) pairs measured by a calibration sweep.
+    Speeds between two points are interpolated, speeds below the first
+    point are interpolated from zero duty and speeds above the last point
+    follow the last segment. Without points the map is linear, with
+    max_rpm at full duty.
+    """
+    def __init__(self, max_rpm, points=()):
+        self.max_rpm = max_rpm
+        self.set_points(points)
+    def set_points(self, points):
+        # Keep a strictly increasing map, so it can be inverted
+        duties, rpms = [], []
+        for duty, rpm in sorted(points):
+            if rpms and (rpm <= rpms[-1] or duty <= duties[-1]):
+                continue
+            duties.append(duty)
+            rpms.append(rpm)
+        self.duties, self.rpms = duties, rpms
+    def get_points(self):
+        return list(zip(self.duties, self.rpms))
+    def _interpolate(self, xs, ys, x):
+        if len(xs) == 1 or x <= xs[0]:
+            if xs[0] <= 0.:
+                return ys[0]
+            return ys[0] * x / xs[0]
+        pos = min(bisect.bisect_left(xs, x), len(xs) - 1)
+        x0, x1 = xs[pos-1], xs[pos]
+        y0, y1 = ys[pos-1], ys[pos]
+        return y0 + (y1 - y0) * (x - x0) / (x1 - x0)
+    def get_duty(self, rpm):
+        if rpm <= 0.:
+            return 0.
+        if not self.rpms:
+            duty = rpm / self.max_rpm
+        else:
+            duty = self._interpolate(self.rpms, self.duties, rpm)
+        return max(0., min(duty, 1.))
+    def get_rpm(self, duty):
+        if duty <= 0.:
+            return 0.
+        if not self.rpms:
+            return duty * self.max_rpm
+        return max(0., self._interpolate(self.duties, self.rpms, duty))
+
+def load_pwm_map(config, max_rpm):
+    """Read the 'pwm_map' option (one "duty, rpm" pair per line)"""
+    points = config.getlists('pwm_map', (), seps=(',', '\n'), count=2,
+                             parser=float)
+    for duty, rpm in points:
+        if not 0. <= duty <= 1. or rpm < 0.:
+            raise config.error("Invalid pwm_map point '%.3f, %.1f' in"
+                               " section '%s'" % (duty, rpm,
+                                                  config.get_name()))
+    return PWMMap(max_rpm, points)
+
+def format_pwm_map(points):
+    """Format map points as a 'pwm_map' option value"""
+    return "".join(["\n%.4f, %.1f" % (duty, rpm) for duty, rpm in points])
+
+class SpeedLoop:
+    """Feed-forward plus PI spindle speed loop
+    The PI terms work in RPM and the sum is converted to a duty with the
+    PWMMap, so the map is the feed-forward and the gains do not depend on
+    the motor's RPM per duty. kp is the RPM added per RPM of error and ki
+    the same per second. Anti-windup: the integrator only runs within
+    SPEED_INTEGRAL_BAND of the target (not during a speed change), is
+    held while the output is saturated in the direction of the error and
+    is limited to SPEED_INTEGRAL_MAX of the target.
+    """
+    def __init__(self, pwm_map, kp, ki):
+        self.pwm_map = pwm_map
+        self.kp = kp
+        self.ki = ki
+        self.reset()
+    def reset(self):
+        self.integral = 0.
+    def update(self, target_rpm, measured_rpm, dt):
+        """Return the duty for target_rpm given a new measurement taken dt
+        seconds after the previous one (measured_rpm None = feed-forward
+        only)"""
+        if target_rpm <= 0.:
+            self.integral = 0.
+            return 0.
+        if measured_rpm is None:
+            return self.pwm_map.get_duty(target_rpm + self.integral)
+        error = target_rpm - measured_rpm
+        rpm = target_rpm + self.kp * error + self.integral
+        duty = self.pwm_map.get_duty(rpm)
+        saturated = ((duty >= 1. and error > 0.)
+                     or (duty <= 0. and error < 0.))
+        if abs(error) < SPEED_INTEGRAL_BAND * target_rpm and not saturated:
+            limit = SPEED_INTEGRAL_MAX * target_rpm
+            self.integral = max(-limit, min(
+                self.integral + self.ki * error * dt, limit))
+            rpm = target_rpm + self.kp * error + self.integral
+            duty = self.pwm_map.get_duty(rpm)
+        return duty
@@ -100,14 +100,387 @@ def load_kinematics(toolhead, config):
     return WinderKinematics(toolhead, config)
 
 # CNC Puck Winder Control Module
-import logging
-from . import pulse_counter
+import bisect, collections, logging, random
+from . import angle_sensor, bulk_sensor, pulse_counter, spindle_speed
+from . import winder_events, winder_journal, winder_quality
 
-class WinderController:
-    # Pre-calculated constants for angle sensor (avoid recalculating in callback)
-    RAD_TO_RPM = 60.0 / (2.0 * math.pi)  # ~9.5493
-    MIN_TIME_DIFF = 0.0001  # 100 microseconds minimum for valid RPM calculation
+# Electronic gearing: the spindle trajectory (turns vs print_time) is
+# queued this far ahead of the MCU clock, in segments of at most
+# SPINDLE_SEGMENT_TIME while the spindle speed is ramping
+GEARING_LEAD_TIME = 1.0
+GEARING_FEED_TIME = 0.2
+SPINDLE_SEGMENT_TIME = 0.1
+# Measured-angle correction: the spindle trapq absorbs the Hall-measured
+# turn error over one lead window, limited to this fraction of the speed
+GEARING_MAX_CORRECTION = 0.05
+# Winding programs split each pass into collinear segments of at most
+# this duration, so velocity sync updates apply within one segment
+PROGRAM_SEGMENT_TIME = 0.5
+# Traverse motion kept queued ahead of the MCU while running a program
+# (two feed periods). A move ending more than WIND_SPLIT_TIME past that is
+# queued up to it and finished at the next feed, so the traverse stops
+# within WIND_BUFFER_TIME of a stop request.
+WIND_BUFFER_TIME = 0.5
+WIND_SPLIT_TIME = 0.05
+# Velocity sync: max_velocity is set this much above the required traverse
+# speed, and only updated when the required speed changes by more than
+# SYNC_SPEED_THRESHOLD
+SYNC_VELOCITY_MARGIN = 1.1
+SYNC_SPEED_THRESHOLD = 0.05
+# With sync_trigger: event the spindle timer only feeds queued motion
+PROGRAM_FEED_TIME = 0.25
+IDLE_UPDATE_TIME = 1.0
+# Closed loop speed control: the loop runs on each spindle estimate, at
+# most once per SPEED_CONTROL_TIME, and queues the new PWM duty
+# SPEED_CONTROL_LEAD ahead of the MCU clock (smaller changes are skipped)
+SPEED_CONTROL_TIME = 0.05
+SPEED_CONTROL_LEAD = 0.1
+SPEED_DUTY_DEADBAND = 0.001
+# Turn-exact stop (velocity mode TURNS=): the PWM ramp down is queued on
+# the MCU once its start is within TURN_STOP_HORIZON (and at least
+# TURN_STOP_LEAD ahead), in steps of STOP_RAMP_STEP. A program's traverse
+# is only queued up to the turn the ramp starts at, and the rest follows
+# the ramp in the same steps. TURN_STOP_SETTLE after the brake the final
+# count is read. If the stop ran undisturbed and the spindle was measured
+# during it, STOP_LAG_LEARN of the error is folded into the stop lag, by
+# at most STOP_LAG_MAX_STEP per stop and within 0..STOP_LAG_MAX (and set
+# for SAVE_CONFIG).
+TURN_STOP_HORIZON = 0.5
+TURN_STOP_LEAD = 0.1
+STOP_RAMP_STEP = 0.05
+TURN_STOP_SETTLE = 1.0
+STOP_LAG_LEARN = 0.5
+STOP_LAG_MAX_STEP = 0.05
+STOP_LAG_MAX = 1.0
+# Spindle/traverse S-curve ramps (spindle_ramp: s_curve) are queued in
+# steps of this duration
+RAMP_STEP_TIME = 0.05
+# Angle-indexed passes (reversal_angle): the dwell that brings the spindle
+# to the reversal angle is queued once the pass start is within
+# INDEX_LEAD_TIME of the MCU clock, so the spindle angle is predicted over
+# at most that long; below INDEX_MIN_RPS there is no indexing
+INDEX_LEAD_TIME = 0.5
+INDEX_MIN_RPS = 0.5
+
+class WinderDump:
+    """A winder/dump_<name> bulk endpoint (BatchBulkHelper)
+    Rows can be added from the reactor or the MCU response threads; they
+    are only kept while a client is subscribed (rows is None otherwise),
+    so an unused stream costs one attribute check per row. batch_cb, if
+    given, turns the queued rows into the rows sent.
+    """
+    def __init__(self, printer, name, header, start_cb=None, batch_cb=None):
+        self.start_cb = start_cb
+        self.batch_cb = batch_cb
+        self.rows = None
+        self.batch_bulk = bulk_sensor.BatchBulkHelper(
+            printer, self._process_batch, self._start, self._stop)
+        self.batch_bulk.add_mux_endpoint("winder/dump_" + name, "name", None,
+                                         {'header': header})
+    def _start(self):
+        if self.start_cb is not None:
+            self.start_cb()
+        self.rows = collections.deque()
+    def _stop(self):
+        self.rows = None
+    def is_active(self):
+        return self.rows is not None
+    def add(self, *row):
+        rows = self.rows
+        if rows is not None:
+            rows.append(row)
+    def _process_batch(self, eventtime):
+        rows = self.rows
+        if not rows:
+            return {}
+        data = [rows.popleft() for i in range(len(rows))]
+        if self.batch_cb is not None:
+            data = self.batch_cb(data)
+        return {'data': data}
+
+class TurnTracker:
+    """Whole spindle turn crossings and the traverse position at each
+    check_turn() runs from a spindle estimator callback (MCU response
+    thread) and queues (turn, print time, velocity) rows. locate_turn()
+    runs in the reactor and gives a queued turn's traverse position and
+    the program pass of the move queued around it (add_move), along with
+    the previous located turn.
+    """
+    def __init__(self):
+        self.moves = collections.deque()
+        self.origin = 0.0
+        self.next_turn = None
+        self.last = None
+    def reset(self, origin=0.0, next_turn=None):
+        self.moves.clear()
+        self.origin = origin
+        self.next_turn = next_turn
+        self.last = None
+    def add_move(self, end_time, pass_index):
+        self.moves.append((end_time, pass_index))
+    def check_turn(self, rows, print_time, turns, velocity):
+        """Append a row to rows for every whole turn (from origin) crossed
+        since the last update"""
+        if rows is None or velocity <= 0.0:
+            return
+        turns -= self.origin
+        next_turn = self.next_turn
+        if next_turn is None or turns < next_turn - 2:
+            # First update, or the estimator was reset
+            next_turn = int(math.floor(turns)) + 1
+        while turns >= next_turn:
+            rows.append((next_turn,
+                         print_time - (turns - next_turn) / velocity,
+                         velocity))
+            next_turn += 1
+        self.next_turn = next_turn
+    def locate_turn(self, dtrapq, turn_time):
+        """Return (y, pass_index, last) for the turn at turn_time; y is
+        None without a traverse position, pass_index None before the first
+        move and last the (y, pass_index) of the previous call"""
+        y = None
+        if dtrapq is not None:
+            pos, velocity = dtrapq.get_trapq_position(turn_time)
+            if pos is not None:
+                y = pos[1]
+        moves = self.moves
+        while len(moves) > 1 and moves[0][0] < turn_time:
+            moves.popleft()
+        pass_index = None
+        if moves:
+            pass_index = moves[0][1]
+        last = self.last
+        self.last = (y, pass_index)
+        return y, pass_index, last
+
+class SpindleRamp:
+    """S-curve spindle speed ramp shared by the spindle and the traverse
+    The speed follows smoothstep, v(u) = V * (3u^2 - 2u^3) with u = t/T,
+    so the acceleration starts and ends at zero and peaks at accel
+    (turns/s^2) half way. T = 1.5 * V / accel and the ramp covers V * T / 2
+    turns, both ways.
+    """
+    def __init__(self, accel, step_time=RAMP_STEP_TIME):
+        self.accel = accel
+        self.step_time = step_time
+    def get_time(self, rps):
+        return 1.5 * rps / self.accel
+    def get_turns(self, rps):
+        return .5 * rps * self.get_time(rps)
+    def get_steps(self, rps, down=False):
+        """Return [(duration, turns, mid_rps), ...] ramp steps up to (or
+        down from) rps"""
+        ramp_t = self.get_time(rps)
+        count = max(1, int(math.ceil(ramp_t / self.step_time)))
+        steps = []
+        last_turns = 0.0
+        for i in range(1, count + 1):
+            u = float(i) / count
+            turns = rps * ramp_t * (u**3 - .5 * u**4)
+            mid = (i - .5) / count
+            mid_rps = rps * (3.0 * mid**2 - 2.0 * mid**3)
+            steps.append((ramp_t / count, turns - last_turns, mid_rps))
+            last_turns = turns
+        if down:
+            steps.reverse()
+        return steps
+
+class LayerSchedule:
+    """Per-layer pitch and winding edges of one coil
+    A layer is one forward and one back pass. Layer n winds at
+    layer_pitch[n] (the last entry repeats), or without a table at
+    pitch * (1 + pitch_growth * n), the build-up as the wire beds less
+    tightly on the growing coil. Each edge moves flange_shrink further in
+    per layer. The table covers `layers` layers, or as many as `turns`
+    needs, and is indexed by layer number.
+    """
+    def __init__(self, start_y, end_y, pitch, layer_pitch=(),
+                 pitch_growth=0.0, flange_shrink=0.0, layers=1, turns=None):
+        self.pitches = []
+        self.edges = []
+        total = 0.0
+        pass_start = start_y
+        while (len(self.pitches) < layers if turns is None
+               else total < turns - 0.000001):
+            layer = len(self.pitches)
+            if layer_pitch:
+                layer_p = layer_pitch[min(layer, len(layer_pitch) - 1)]
+            else:
+                layer_p = pitch * (1.0 + pitch_growth * layer)
+            layer_start = start_y + flange_shrink * layer
+            layer_end = end_y - flange_shrink * layer
+            if layer_p <= 0.0:
+                raise ValueError("Invalid pitch %.4f at layer %d"
+                                 % (layer_p, layer))
+            if layer_end - layer_start < layer_p:
+                raise ValueError("Flange shrink leaves no winding width at"
+                                 " layer %d" % (layer,))
+            self.pitches.append(layer_p)
+            self.edges.append((layer_start, layer_end))
+            # Forward from the previous layer's start edge, then back
+            total += (2.0 * layer_end - pass_start - layer_start) / layer_p
+            pass_start = layer_start
+        self.turns = total if turns is None else turns
+    def get_pitch(self, layer):
+        return self.pitches[min(layer, len(self.pitches) - 1)]
+    def get_edges(self, layer):
+        return self.edges[min(layer, len(self.edges) - 1)]
+
+class ScatterPattern:
+    """Per-pass pitch factors of a scatter wound coil
+    'random' draws each factor uniformly within amount of 1 from a
+    random.Random(seed) stream, so a seed reproduces the coil. 'sine'
+    modulates the factor by amount over period passes, and 'table' repeats
+    a list of factors. Factors are generated in pass order and cached.
+    """
+    def __init__(self, pattern, amount=0.0, seed=0, period=8.0, table=()):
+        self.pattern = pattern
+        self.amount = amount
+        self.seed = seed
+        self.period = period
+        self.table = list(table)
+        self.rng = random.Random(seed)
+        self.factors = []
+    def _next_factor(self, index):
+        if self.pattern == 'random':
+            return 1.0 + self.amount * self.rng.uniform(-1.0, 1.0)
+        if self.pattern == 'sine':
+            return 1.0 + self.amount * math.sin(
+                2.0 * math.pi * index / self.period)
+        return self.table[index % len(self.table)]
+    def get_factor(self, index):
+        while len(self.factors) <= index:
+            self.factors.append(self._next_factor(len(self.factors)))
+        return self.factors[index]
+
+class WindingProgram:
+    """Precomputed traverse moves for one coil
+    The coil (turns at a given pitch between two flange positions) is
+    compiled into (y, speed, dwell, spindle_rps) entries. They are queued
+    on the toolhead in one stream, so the lookahead queue is never drained
+    at a reversal and the host is not blocked between passes.
+    
+    With a SpindleRamp the coil starts and ends with ramp steps: each step
+    moves the traverse by its turns times the pitch in the step duration,
+    and carries the spindle speed to command at its start (spindle_rps is
+    None without a ramp). Pitch is then constant from the first turn.
     
+    With a LayerSchedule every pass winds at its layer's pitch and turns
+    at its layer's edges. The ramps and the spindle speed are planned in
+    turns, so only the traverse speed follows the layer pitch. A
+    ScatterPattern further scales the pitch of every pass.
+    """
+    def __init__(self, start_y, end_y, pitch, turns, speed,
+                 reversal_dwell=0.0, segment_time=PROGRAM_SEGMENT_TIME,
+                 ramp=None, schedule=None, scatter=None):
+        width = end_y - start_y
+        if width <= 0.0:
+            raise ValueError("Flange offsets leave no winding width")
+        if pitch <= 0.0 or turns <= 0.0 or speed <= 0.0:
+            raise ValueError("Invalid winding program (pitch=%.4f turns=%.1f"
+                             " speed=%.3f)" % (pitch, turns, speed))
+        self.start_y = start_y
+        self.end_y = end_y
+        self.pitch = pitch
+        self.turns = turns
+        self.speed = speed
+        if schedule is None:
+            schedule = LayerSchedule(start_y, end_y, pitch, turns=turns)
+        self.schedule = schedule
+        self.scatter = scatter
+        self.cruise_rps = None
+        # Path legs: (turns at the end of the leg, turns per second, spindle
+        # rps to command)
+        legs = [(turns, speed / pitch, None)]
+        if ramp is not None:
+            rps = speed / pitch
+            ramp_turns = ramp.get_turns(rps)
+            if 2.0 * ramp_turns > turns:
+                # Short coil - lower the cruise speed so the ramps meet
+                rps *= math.sqrt(.5 * turns / ramp_turns)
+                ramp_turns = .5 * turns
+            self.cruise_rps = rps
+            legs = []
+            done = 0.0
+            for move_t, step_turns, step_rps in ramp.get_steps(rps):
+                done += step_turns
+                legs.append((done, step_turns / move_t, step_rps))
+            if turns - 2.0 * ramp_turns > 0.000001:
+                legs.append((turns - ramp_turns, rps, rps))
+            done = turns - ramp_turns
+            for move_t, step_turns, step_rps in ramp.get_steps(rps, True):
+                done = min(done + step_turns, turns)
+                legs.append((done, step_turns / move_t, step_rps))
+            legs[-1] = (turns,) + legs[-1][1:]
+        self.moves = []
+        # Coil turns at the end of every move
+        self.move_turns = []
+        # Index into self.moves of the last move of every pass
+        self.pass_ends = []
+        self.duration = 0.0
+        self.max_speed = 0.0
+        seg_turns = max(speed * segment_time, pitch) / pitch
+        done = 0.0
+        pos, direction = start_y, 1.0
+        pass_pitch = self.get_pass_pitch(0)
+        target = schedule.get_edges(0)[1]
+        pass_left = (target - pos) / pass_pitch
+        for leg_turns, leg_rate, rps in legs:
+            leg_end = min(leg_turns, turns)
+            while leg_end - done > 0.000001:
+                leg_n = min(leg_end - done, pass_left)
+                if leg_n >= pass_left - 0.000001:
+                    leg_n = pass_left
+                    end = target
+                else:
+                    end = pos + direction * leg_n * pass_pitch
+                leg_speed = leg_rate * pass_pitch
+                self.max_speed = max(self.max_speed, leg_speed)
+                count = 1
+                if rps is None or rps == self.cruise_rps:
+                    count = max(1, int(math.ceil(leg_n / seg_turns)))
+                for i in range(1, count):
+                    self.moves.append((pos + (end - pos) * i / count,
+                                       leg_speed, 0.0, rps))
+                    self.move_turns.append(done + leg_n * i / count)
+                self.moves.append((end, leg_speed, 0.0, rps))
+                self.move_turns.append(done + leg_n)
+                self.duration += leg_n / leg_rate
+                pos = end
+                done += leg_n
+                pass_left -= leg_n
+                if pass_left <= 0.000001:
+                    self.pass_ends.append(len(self.moves) - 1)
+                    direction = -direction
+                    layer = len(self.pass_ends) // 2
+                    pass_pitch = self.get_pass_pitch(len(self.pass_ends))
+                    target = schedule.get_edges(layer)[
+                        0 if direction < 0.0 else 1]
+                    pass_left = abs(target - pos) / pass_pitch
+                    if turns - done > 0.000001 and reversal_dwell:
+                        self.moves[-1] = (end, leg_speed, reversal_dwell, rps)
+                        self.duration += reversal_dwell
+        if not self.pass_ends or self.pass_ends[-1] != len(self.moves) - 1:
+            self.pass_ends.append(len(self.moves) - 1)
+    def get_move_position(self, index, turns):
+        """Traverse position after turns coil turns, part way into move
+        index (clamped to that move)"""
+        start_y, start_turns = self.start_y, 0.0
+        if index:
+            start_y = self.moves[index - 1][0]
+            start_turns = self.move_turns[index - 1]
+        move_turns = self.move_turns[index] - start_turns
+        if move_turns <= 0.0:
+            return start_y
+        frac = min(1.0, max(0.0, (turns - start_turns) / move_turns))
+        return start_y + (self.moves[index][0] - start_y) * frac
+    def get_pass_pitch(self, pass_index):
+        pitch = self.schedule.get_pitch(pass_index // 2)
+        if self.scatter is not None:
+            pitch *= self.scatter.get_factor(pass_index)
+        return pitch
+
+class WinderController:
     def __init__(self, config):
         self.printer = config.get_printer()
         self.name = config.get_name()
@@ -129,19 +502,75 @@ class WinderController:
         # Winding parameters
         self.wire_diameter = config.getfloat('wire_diameter', 0.056, above=0.001)
         self.bobbin_width = config.getfloat('bobbin_width', 12.0, above=0.0)
+        # Keep the wire this far from each flange; dwell at every reversal
+        self.flange_offset = config.getfloat('flange_offset', 0.0, minval=0.0)
+        self.reversal_dwell = config.getfloat('reversal_dwell', 0.0, minval=0.0)
+        # Start every pass (and the coil) at this spindle angle (degrees of
+        # the spindle estimator angle, velocity mode), so the crossovers
+        # stack in one place
+        self.reversal_angle = config.getfloat('reversal_angle', None,
+                                              minval=0.0, below=360.0)
+        # Bobbin build-up (velocity mode): per-layer pitch table, or a pitch
+        # growing by pitch_growth of wire_diameter per layer, and edges
+        # moving flange_shrink further in per layer
+        self.layer_pitch = config.getfloatlist('layer_pitch', ())
+        for layer_p in self.layer_pitch:
+            if layer_p <= 0.0:
+                raise config.error("Invalid layer_pitch %.4f in section '%s'"
+                                   % (layer_p, self.name))
+        self.pitch_growth = config.getfloat('pitch_growth', 0.0, minval=0.0)
+        self.flange_shrink = config.getfloat('flange_shrink', 0.0, minval=0.0)
+        self.layer_schedule = None
+        # Scatter winding (velocity mode): per-pass pitch factors, drawn
+        # from scatter_seed (a new seed per coil if unset), a sine over
+        # scatter_period passes or scatter_table
+        self.scatter_pattern = config.getchoice(
+            'scatter_pattern', ['none', 'random', 'sine', 'table'], 'none')
+        self.scatter_amount = config.getfloat('scatter_amount', 0.2,
+                                              minval=0.0, below=1.0)
+        self.scatter_period = config.getfloat('scatter_period', 8.0,
+                                              above=0.0)
+        self.scatter_table = config.getfloatlist('scatter_table', ())
+        for factor in self.scatter_table:
+            if factor <= 0.0:
+                raise config.error("Invalid scatter_table factor %.3f in"
+                                   " section '%s'" % (factor, self.name))
+        if self.scatter_pattern == 'table' and not self.scatter_table:
+            raise config.error("scatter_pattern: table requires"
+                               " scatter_table in section '%s'" % (self.name,))
+        self.scatter_seed = config.getint('scatter_seed', None, minval=0)
+        self.scatter = None
         self.spindle_edge_offset = config.getfloat('spindle_edge', 38.0, minval=0.0)
         self.traverse_max = config.getfloat('traverse_max', 93.0, above=0.0)
         self.home_offset = config.getfloat('home_offset', 2.0, minval=0.0)
-        
-        # Hall sensor timing
-        self.hall_sample_time = config.getfloat('hall_sample_time', 0.01, above=0.001)
+        # Positioning moves run at [printer] max_velocity; the velocity
+        # sync lowers the toolhead's max_velocity while winding
+        self.travel_speed = config.getsection('printer').getfloat(
+            'max_velocity', above=0.0)
+        
+        # Hall sensor timing: the MCU samples the pin every hall_sample_time
+        # and reports the edge count every hall_poll_time
+        self.hall_sample_time = config.getfloat('hall_sample_time', 0.0005,
+                                                minval=0.0001, maxval=0.01)
         self.hall_poll_time = config.getfloat('hall_poll_time', 0.1, above=0.01)
         self.hall_update_rate = config.getfloat('hall_update_rate', 10.0, above=1.0)
+        # Stream every spindle Hall edge time from the MCU (sensor_bulk)
+        # instead of only the last edge of each report
+        self.hall_edge_capture = config.getboolean('hall_edge_capture', False)
         
         # Speed limits
         self.max_motor_rpm = config.getfloat('max_motor_rpm', 3000.0, above=0.0)
         self.max_spindle_rpm = config.getfloat('max_spindle_rpm', 2000.0, above=0.0)
         self.min_spindle_rpm = config.getfloat('min_spindle_rpm', 10.0, above=0.0)
+        # Learned RPM -> PWM duty map (motor RPM, from WINDER_CALIBRATE_PWM);
+        # linear up to max_motor_rpm until calibrated
+        self.pwm_map = spindle_speed.load_pwm_map(config, self.max_motor_rpm)
+        # Closed loop spindle speed: PI on the spindle estimate on top of
+        # the map (velocity mode winds and SET_SPINDLE_SPEED)
+        self.speed_control = config.getboolean('speed_control', False)
+        self.speed_loop = spindle_speed.SpeedLoop(
+            self.pwm_map, config.getfloat('speed_kp', 0.5, minval=0.0),
+            config.getfloat('speed_ki', 2.0, minval=0.0))
         
         # Sync parameters
         self.sync_tolerance = config.getfloat('sync_tolerance', 0.01, above=0.0, below=0.1)
@@ -149,25 +578,85 @@ class WinderController:
         # Klipper can only handle so many MCU commands per second
         # 10 Hz = updates every 100ms (safe for MCU timing constraints)
         self.sync_update_rate = config.getfloat('sync_update_rate', 10.0, above=1.0, below=50.0)
+        # Sync trigger: 'timer' checks the sync at sync_update_rate, 'event'
+        # checks it on every spindle measurement (in the MCU response path)
+        # and only wakes the reactor when a correction is needed
+        self.sync_trigger = config.getchoice('sync_trigger', ['timer', 'event'],
+                                             'timer')
+        # Sync mode: 'velocity' adjusts traverse speed from measured RPM,
+        # 'gearing' computes traverse position from spindle turns in kin_winder.c
+        self.sync_mode = config.getchoice('sync_mode', ['velocity', 'gearing'],
+                                          'velocity')
+        # Spindle acceleration of the geared spindle trajectory and peak
+        # acceleration of spindle_ramp: s_curve (RPM/s)
+        self.spindle_accel = config.getfloat('spindle_accel', 1000.0, above=0.0)
+        # Velocity mode spindle start/stop: 'none' = step the PWM to the
+        # target and let the traverse follow the measured speed, 's_curve' =
+        # spindle PWM and traverse planned from one S-curve at spindle_accel
+        self.spindle_ramp = None
+        if config.getchoice('spindle_ramp', ['none', 's_curve'],
+                            'none') == 's_curve':
+            self.spindle_ramp = SpindleRamp(self.spindle_accel / 60.0)
+        # Correct the geared spindle trajectory from spindle Hall edge times
+        self.gearing_feedback = config.getboolean('gearing_feedback', True)
+        # Turn-exact stop: PWM ramp down rate (RPM/s) and the time the
+        # spindle lags behind the ramp; the lag is relearned from the final
+        # turn count of every clean stop
+        self.stop_decel = config.getfloat('stop_decel', 1000.0, above=0.0)
+        self.stop_lag = config.getfloat('stop_lag', 0.1, minval=0.0,
+                                        maxval=STOP_LAG_MAX)
+        # Crash-safe wind journal for WINDER_RESUME (velocity mode):
+        # progress is recorded every journal_interval from a background
+        # thread
+        self.journal = None
+        journal_path = config.get('journal_path', None)
+        if journal_path is not None:
+            self.journal = winder_journal.WindJournal(journal_path)
+        self.journal_interval = config.getfloat('journal_interval', 0.5,
+                                                above=0.0)
+        # Per-turn quality record of every velocity mode coil, one file
+        # per coil in quality_dir
+        self.quality = None
+        quality_dir = config.get('quality_dir', None)
+        if quality_dir is not None:
+            self.quality = winder_quality.QualityRecorder(quality_dir)
         
         # Initialize state
         self.motor_pwm = None
         self.motor_dir = None
         self.motor_brake = None
         self.spindle_freq_counter = None
+        self.spindle_edge_capture = None
+        self._edge_count = 0
+        self._edge_time = 0.0
         self.motor_freq_counter = None
         self.angle_sensor_adc = None  # ADC for angle sensor
         self.spindle_measured_rpm = 0.0
-        self.spindle_hall_rpm = 0.0  # Hall sensor RPM (PRIMARY)
-        self.spindle_angle_rpm = 0.0  # Angle sensor RPM (SECONDARY)
+        self.spindle_hall_rpm = 0.0  # Hall sensor RPM (diagnostic)
+        # Fused Hall + angle estimate, shared with angle_sensor/spindle_hall.
+        # It is the one consumer of the spindle Hall edges and the angle
+        # readings; turns and RPM are read back from its state.
+        self.spindle_estimator = self.printer.load_object(
+            config, 'spindle_estimator')
+        if self.spindle_hall_pin:
+            self.spindle_estimator.register_source('hall', self.name)
+        if self.angle_sensor_pin:
+            self.spindle_estimator.register_source('angle', self.name)
+        if self.sync_trigger == 'event':
+            self.spindle_estimator.register_callback(self._check_sync_event)
+        if self.speed_control:
+            self.spindle_estimator.register_callback(self._check_speed_event)
+        if self.quality is not None:
+            self.spindle_estimator.register_callback(self._check_quality_turn)
+        self.spindle_estimator.register_callback(self._check_dump_turn)
         self.motor_measured_rpm = 0.0
         self.last_angle_value = None
         self.last_angle_time = None
         self.angle_revolutions = 0  # Track full revolutions (net forward revolutions)
-        self.angle_total_rad = 0.0  # Track cumulative angle (with revolutions)
-        # Buffer for fast sampling with 100ms reporting
-        self.angle_buffer = []  # Buffer of (time, angle) tuples
-        self.angle_buffer_max = 10  # Buffer 10 samples (10ms each = 100ms total)
+        # Stream angle samples at this rate via sensor_bulk (0 = one
+        # analog_in_state message every 10ms)
+        self.angle_sample_rate = config.getfloat('angle_sample_rate', 0.0,
+                                                 minval=0.0, maxval=5000.0)
         
         # Auto-calibration for angle sensor (min/max mapping)
         # Config options for manual calibration
@@ -181,8 +670,15 @@ class WinderController:
         self._angle_adc_observed_max = None
         self._angle_calibration_samples = 0
         self._angle_calibration_complete = False
-        self.rpm_timer = None
-        self.sync_timer = None
+        self.spindle_timer = None
+        self.next_sync_time = 0.0
+        self.sync_speed = 0.0  # Traverse speed of the last sync update
+        self.sync_pending = False
+        self.speed_control_active = False
+        self.speed_pending = False
+        self.speed_time = None  # Estimator time of the last speed loop update
+        self.pwm_duty = 0.0
+        self.pwm_time = 0.0  # Print time of the last queued PWM change
         self.current_layer = 0
         self.winding_direction = 1
         self.motor_rpm_target = 0.0
@@ -190,9 +686,139 @@ class WinderController:
         self.is_winding = False
         self.start_position = self.spindle_edge_offset
         self.current_y_position = 0.0
+        # Winding program state machine:
+        # idle -> winding -> draining (all moves queued) -> idle
+        #                 -> stopping (stop requested) -> idle
+        self.wind_state = 'idle'
+        self.program = None
+        self.program_index = 0
+        self.program_pass = 0
+        self.program_queue_time = 0.0
+        self.program_end_time = 0.0
+        # spindle_ramp: spindle speed of the last queued program move and
+        # print time until which the PWM follows the ramp (no speed loop or
+        # velocity sync)
+        self.program_rps = None
+        self.ramp_hold_time = 0.0
+        # reversal_angle: the next pass waits for its index dwell
+        self.index_pending = False
+        self.stop_request_time = None
+        self.stop_latency = None
+        self.wind_aborted = False  # Last wind ended by stop_motor()
+        # Queued program moves (end print time, index, y), popped once the
+        # MCU has run them, and the journal's last logged move
+        self.program_done = collections.deque()
+        self.journal_time = 0.0
+        self.journal_index = None
+        self.program_origin = 0.0
+        # Program coil turns queued on the traverse (the last move may be
+        # queued part way while a turn-exact stop is pending)
+        self.program_queued_turns = 0.0
+        # Program dwells (reversal_dwell and reversal_angle index) queued as
+        # (start print time, dwell time, spindle turns); the spindle lays
+        # those turns at the flange, outside the program's coil turns
+        self.program_dwells = []
+        # Quality record: spindle turn crossings (turn, print time,
+        # velocity) from the estimator callback, counted from quality_origin
+        self.quality_turns = collections.deque()
+        self.quality_tracker = TurnTracker()
+        self.quality_origin = None
+        # Bulk streams for live clients and motan: spindle turn crossings
+        # (turn, print time, velocity), spindle Hall edges (edge time,
+        # count), and traverse sync updates (velocity sync or gearing
+        # feedback; speed and correction in traverse mm/s). The turn rows
+        # are located like the quality record's, and the traverse
+        # direction of the last streamed turn is kept for the pitch error
+        self.dump_spindle = WinderDump(
+            self.printer, 'spindle',
+            ('time', 'turn', 'rpm', 'traverse_pos', 'pitch_error'),
+            self._start_dump_spindle, self._dump_spindle_rows)
+        self.dump_hall = WinderDump(self.printer, 'hall', ('time', 'count'))
+        self.dump_sync = WinderDump(
+            self.printer, 'sync',
+            ('time', 'spindle_rpm', 'traverse_speed', 'correction'))
+        self.dump_tracker = TurnTracker()
+        self.dump_direction = None
+        # Turn-exact stop: target turn count from wind_origin_turns (spindle
+        # estimator turns at the start), and (ramp start, brake time, speed,
+        # planned stop turns) once the stop is queued
+        self.wind_target_turns = None
+        self.wind_origin_turns = 0.0
+        self.turn_stop = None
+        self.turn_error = None
+        
+        # Spindle trajectory (turns vs print_time) for electronic gearing
+        self.motion_queuing = self.printer.load_object(config, 'motion_queuing')
+        self.spindle_trapq = self.motion_queuing.allocate_trapq()
+        self.trapq_append = self.motion_queuing.lookup_trapq_append()
+        self.spindle_print_time = 0.0
+        self.spindle_turns = 0.0
+        self.spindle_velocity = 0.0  # Commanded spindle speed (turns/s)
+        self.gearing_active = False
+        self.gearing_stopping = False
+        self.gearing_target_rps = 0.0
+        self.gearing_origin_turns = 0.0
+        self.gearing_end_turns = 0.0
+        self.gearing_width = self.bobbin_width
+        self._last_pwm_duty = None
+        # Queued spindle segments (print_time, move_t, start_v, accel,
+        # start_turns, correction, start_total_correction) used to look up
+        # the trapq position at a Hall edge time
+        self.spindle_moves = collections.deque()
+        self.gearing_total_correction = 0.0
+        self.gearing_slip_sample = None
+        self.gearing_slip_rate = 0.0
+        self.gearing_turn_error = 0.0
+        self.gearing_edge_ref = None
+        self.gearing_start_count = None
+        # Last two distinct spindle Hall edges ((count_time, count), ...)
+        self._spindle_edges = None
+        self.motion_report = self.printer.load_object(config, 'motion_report')
+        if hasattr(self.motion_report, 'register_trapq'):
+            self.motion_report.register_trapq('winder_spindle',
+                                              self.spindle_trapq)
+        else:
+            # Stock Klipper motion_report (the installers do not ship this
+            # repo's klippy/extras/motion_report.py) - register it the same way
+            from . import motion_report
+            self.motion_report.dtrapqs['winder_spindle'] = (
+                motion_report.DumpTrapQ(self.printer, 'winder_spindle',
+                                        self.spindle_trapq))
+        
+        # Diagnostic events: each category is logged at most budget times
+        # per second (0 = never), and its last events are dumped on an MCU
+        # shutdown. Recording is cheap enough for the MCU callbacks.
+        events = self.events = winder_events.EventLog(self.printer)
+        self.ev_spindle_count = events.add_category(
+            'spindle_count', "Spindle counter - count=%d, delta=%d", 0)
+        self.ev_motor_count = events.add_category(
+            'motor_count', "Motor counter - count=%d, delta=%d", 0)
+        self.ev_angle_sample = events.add_category(
+            'angle_sample', "ADC debug - raw=%.4f, mapped=%.4f, angle=%.2f°"
+            " (range %.4f-%.4f)", 0)
+        self.ev_angle_calibrated = events.add_category(
+            'angle_calibrated', "Angle sensor auto-calibrated - ADC range:"
+            " %.4f to %.4f (span: %.4f, VCC: %.2fV)%s")
+        self.ev_spindle_rpm = events.add_category(
+            'spindle_rpm', "Spindle RPM=%.1f (hall=%.1f)")
+        self.ev_motor_rpm = events.add_category(
+            'motor_rpm', "Motor Hall - freq=%.3f Hz, RPM=%.1f")
+        self.ev_sync = events.add_category(
+            'sync', "Sync - Traverse speed: %.3f mm/s (RPM: %.1f,"
+            " error: %.1f%%)", 2)
+        self.ev_gearing_behind = events.add_category(
+            'gearing_behind', "Spindle trajectory fell behind by %.3fs")
         
         # Setup pins early so _build_config runs during MCU configuration
         ppins = self.printer.lookup_object('pins')
+        # The simulated spindle registers its pin chip when it is loaded,
+        # which may be after this section
+        for pin in (self.motor_pwm_pin, self.motor_dir_pin,
+                    self.motor_brake_pin, self.motor_hall_pin,
+                    self.spindle_hall_pin, self.angle_sensor_pin):
+            if pin and pin.lstrip('^~!').strip().startswith('winder_sim:'):
+                self.printer.load_object(config, 'winder_sim')
+                break
         self.motor_pwm = ppins.setup_pin('pwm', self.motor_pwm_pin)
         self.motor_pwm.setup_max_duration(0)
         self.motor_pwm.setup_cycle_time(0.001)
@@ -213,8 +839,8 @@ class WinderController:
             original_counter = pulse_counter.FrequencyCounter(
                 self.printer, 
                 self.spindle_hall_pin,
-                self.hall_sample_time,
-                self.hall_poll_time
+                self.hall_poll_time,    # report period
+                self.hall_sample_time   # pin sampling period
             )
             # Access the underlying MCU_counter to add logging
             mcu_counter = original_counter._counter
@@ -224,19 +850,31 @@ class WinderController:
                 if not hasattr(debug_callback, '_last_count'):
                     debug_callback._last_count = 0
                 delta = count - debug_callback._last_count
-                # Store current count for angle sensor to use
-                if not hasattr(self, '_spindle_hall_count'):
-                    self._spindle_hall_count = count
-                self._spindle_hall_count = count
-                # Only log when we see new edges
+                # Record edge timestamps for the spindle trajectory (the
+                # tuple is replaced atomically, read from the reactor)
+                edges = self._spindle_edges
+                if edges is None:
+                    self._spindle_edges = ((count_time, count), (count_time, count))
+                elif count != edges[1][1]:
+                    self._spindle_edges = (edges[1], (count_time, count))
+                    if self.spindle_edge_capture is None:
+                        self.dump_hall.add(count_time, count)
+                if self.spindle_edge_capture is not None:
+                    self._feed_spindle_edges(time)
+                else:
+                    self.spindle_estimator.update_hall(time, count, count_time,
+                                                       self.spindle_hall_ppr)
                 if delta > 0:
-                    logging.debug("Winder: Spindle counter - count=%d, delta=%d" % (count, delta))
+                    self.events.record(self.ev_spindle_count, count, delta)
                 debug_callback._last_count = count
                 if original_callback:
                     original_callback(time, count, count_time)
             
             mcu_counter.setup_callback(debug_callback)
             self.spindle_freq_counter = original_counter
+            if self.hall_edge_capture:
+                self.spindle_edge_capture = pulse_counter.MCU_counter_edges(
+                    mcu_counter)
             logging.info("Winder: Spindle Hall sensor initialized on %s, counter OID=%d" 
                         % (self.spindle_hall_pin, mcu_counter._oid))
         
@@ -246,8 +884,8 @@ class WinderController:
             motor_counter_obj = pulse_counter.FrequencyCounter(
                 self.printer,
                 self.motor_hall_pin,
-                self.hall_sample_time,
-                self.hall_poll_time
+                self.hall_poll_time,    # report period
+                self.hall_sample_time   # pin sampling period
             )
             # Add debug callback for motor too
             motor_mcu_counter = motor_counter_obj._counter
@@ -256,11 +894,9 @@ class WinderController:
             def motor_debug_callback(time, count, count_time):
                 if not hasattr(motor_debug_callback, '_last_count'):
                     motor_debug_callback._last_count = 0
-                motor_debug_callback._last_count = count
                 delta = count - motor_debug_callback._last_count
-                # Only log when we see new edges
                 if delta > 0:
-                    logging.debug("Winder: Motor counter - count=%d, delta=%d" % (count, delta))
+                    self.events.record(self.ev_motor_count, count, delta)
                 motor_debug_callback._last_count = count
                 if motor_original_callback:
                     motor_original_callback(time, count, count_time)
@@ -271,7 +907,14 @@ class WinderController:
                         % (self.motor_hall_pin, motor_mcu_counter._oid))
         
         # Setup ADC angle sensor if configured
-        if self.angle_sensor_pin:
+        if self.angle_sensor_pin and self.angle_sample_rate:
+            # Fixed-rate sampling streamed in sensor_bulk_data blocks
+            self.angle_sensor_adc = angle_sensor.BulkADC(
+                self.printer, self.angle_sensor_pin, self.angle_sample_rate)
+            self.angle_sensor_adc.setup_adc_callback(self._angle_sensor_callback)
+            logging.info("Winder: ADC angle sensor streaming %s at %.0f Hz"
+                         % (self.angle_sensor_pin, self.angle_sample_rate))
+        elif self.angle_sensor_pin:
             ppins = self.printer.lookup_object('pins')
             self.angle_sensor_adc = ppins.setup_pin('adc', self.angle_sensor_pin)
             # Sample every 1ms, average 4 samples, but callback every 10ms for fast buffering
@@ -293,6 +936,8 @@ class WinderController:
         self.printer.register_event_handler("klippy:connect", self._handle_connect)
         self.printer.register_event_handler("klippy:ready", self._handle_ready)
         self.printer.register_event_handler("klippy:shutdown", self._handle_shutdown)
+        self.printer.register_event_handler("klippy:disconnect",
+                                            self._handle_disconnect)
         
         logging.info("Winder: Traverse range: %.2f-%.2fmm, Winding range: %.2f-%.2fmm"
                     % (0.0, self.traverse_max, self.start_position,
@@ -304,10 +949,15 @@ class WinderController:
                               desc=self.cmd_WINDER_START_help)
         gcode.register_command('WINDER_STOP', self.cmd_WINDER_STOP,
                               desc=self.cmd_WINDER_STOP_help)
+        gcode.register_command('WINDER_RESUME', self.cmd_WINDER_RESUME,
+                              desc=self.cmd_WINDER_RESUME_help)
         gcode.register_command('WINDER_STATUS', self.cmd_WINDER_STATUS,
                               desc=self.cmd_WINDER_STATUS_help)
         gcode.register_command('SET_SPINDLE_SPEED', self.cmd_SET_SPINDLE_SPEED,
                               desc=self.cmd_SET_SPINDLE_SPEED_help)
+        gcode.register_command('WINDER_CALIBRATE_PWM',
+                               self.cmd_WINDER_CALIBRATE_PWM,
+                               desc=self.cmd_WINDER_CALIBRATE_PWM_help)
         gcode.register_command('SET_WIRE_DIAMETER', self.cmd_SET_WIRE_DIAMETER,
                               desc=self.cmd_SET_WIRE_DIAMETER_help)
         gcode.register_command('TEST_ANGLE_SENSOR', self.cmd_TEST_ANGLE_SENSOR,
@@ -316,21 +966,12 @@ class WinderController:
                               desc=self.cmd_ANGLE_SENSOR_CALIBRATE_help)
     
     def _angle_sensor_callback(self, read_time, read_value):
-        """Callback for ADC angle sensor - calculates RPM from angle changes
-        Sensor: 12-bit (4096 steps), 360° range, 0.088° resolution
-        Sensor VCC: Configurable (default 5V, actual may be different like 3.848V)
-        Sensor output: 0-VCC (0-360°) - connected to TH0 (PA0) with built-in conditioning
-        read_value: 0.0 to 1.0 (normalized from 0-4095 ADC counts)
-        
-        Auto-calibration: Tracks min/max ADC values and maps them to 0-360°
-        Uses Hall sensor to handle saturation: When ADC saturates, Hall sensor tracks revolutions.
-        Distinguishes stillness from rotation: When saturated, checks Hall sensor to detect rotation.
-        
-        Fast sampling (10ms): Buffer samples for accurate RPM calculation
-        Reporting (100ms): Average buffered samples and update RPM
-        
-        NOTE: This callback must be FAST to meet Klipper timing constraints.
-        Keep calculations minimal, logging async, and avoid blocking operations.
+        """ADC angle sensor callback (MCU response thread)
+        read_value is the normalized ADC reading (0.0-1.0), one full turn
+        over the calibrated ADC range. Auto-calibration tracks the observed
+        min/max unless angle_adc_min/max are set. Unsaturated readings are
+        fed to the spindle estimator (update_angle), which also gives the
+        turn count reported by the status commands.
         """
         # Auto-calibrate min/max ADC values if enabled
         if self.angle_auto_calibrate and not self._angle_calibration_complete:
@@ -347,16 +988,14 @@ class WinderController:
                 (self._angle_adc_observed_max - self._angle_adc_observed_min) > 0.5
             ):
                 self._angle_calibration_complete = True
-                reactor = self.printer.get_reactor()
                 saturation_note = ""
                 if self._angle_adc_observed_max >= 0.99:
                     saturation_note = " (SATURATED at max - consider voltage divider to use full range)"
-                reactor.register_async_callback(
-                    lambda et, sn=saturation_note: logging.info(
-                        "Winder: Angle sensor auto-calibrated - ADC range: %.4f to %.4f (span: %.4f, VCC: %.2fV)%s" 
-                        % (self._angle_adc_observed_min, self._angle_adc_observed_max,
-                           self._angle_adc_observed_max - self._angle_adc_observed_min,
-                           self.angle_sensor_vcc, sn)))
+                self.events.record(
+                    self.ev_angle_calibrated, self._angle_adc_observed_min,
+                    self._angle_adc_observed_max,
+                    self._angle_adc_observed_max - self._angle_adc_observed_min,
+                    self.angle_sensor_vcc, saturation_note)
         
         # Determine actual min/max for mapping
         if self.angle_adc_min is not None and self.angle_adc_max is not None:
@@ -384,271 +1023,48 @@ class WinderController:
         
         # Check for saturation (mapped value >= 0.99 or read_value >= adc_max)
         is_saturated = mapped_value >= 0.99 or read_value >= adc_max
-        
-        # Initialize Hall sensor tracking
-        if not hasattr(self, '_last_hall_count'):
-            if hasattr(self, '_spindle_hall_count'):
-                self._last_hall_count = self._spindle_hall_count
-            else:
-                self._last_hall_count = 0
-        
-        if not hasattr(self, '_saturated_revolutions'):
-            self._saturated_revolutions = 0  # Track extra revolutions while saturated
-        
-        if not hasattr(self, '_last_angle_base'):
-            self._last_angle_base = 0.0  # Base angle (0-2π) from ADC
-        
-        # Get current Hall sensor count
-        current_hall_count = 0
-        if hasattr(self, '_spindle_hall_count'):
-            current_hall_count = self._spindle_hall_count
-        
-        # Check if Hall sensor has incremented (new revolution)
-        hall_incremented = False
-        hall_delta = 0
-        if current_hall_count > self._last_hall_count:
-            hall_delta = current_hall_count - self._last_hall_count
-            hall_incremented = True
-            self._last_hall_count = current_hall_count
-        
         if is_saturated:
-            # In saturation zone - use Hall sensor to track revolutions
-            # Each Hall increment = 1 full revolution = 2π radians
-            if hall_incremented:
-                # Hall sensor incremented while saturated - add full revolution
-                self._saturated_revolutions += hall_delta
-                # Log when we detect a revolution while saturated
-                reactor = self.printer.get_reactor()
-                reactor.register_async_callback(
-                    lambda et, hd=hall_delta, sr=self._saturated_revolutions: logging.info(
-                        "Winder: Saturated - Hall sensor incremented by %d, total saturated revs=%d" 
-                        % (hd, sr)))
-            
-            # While saturated, use Hall sensor count to determine angle
-            # Base angle is 360° (saturated), plus any extra revolutions from Hall sensor
-            # Convert to 0-1.0 range: saturated = 1.0, but we track revolutions separately
-            clamped_value = 1.0  # Always 360° while saturated
-            # The actual angle will be calculated as: base (360°) + revolutions * 360°
+            clamped_value = 1.0
         else:
-            # Normal reading, not saturated - use mapped value
             clamped_value = min(1.0, max(0.0, mapped_value))
-            
-            # If we were saturated and just exited, reset saturated revolutions
-            # (the actual angle reading will be used now)
-            if hasattr(self, '_was_saturated') and self._was_saturated:
-                # Just exited saturation - reset counter, use actual reading
-                if self._saturated_revolutions > 0:
-                    reactor = self.printer.get_reactor()
-                    reactor.register_async_callback(
-                        lambda et, sr=self._saturated_revolutions: logging.info(
-                            "Winder: Exited saturation - had %d saturated revolutions, now using ADC" 
-                            % sr))
-                self._saturated_revolutions = 0
-            
-            self._last_angle_base = clamped_value
+        current_angle_rad = clamped_value * 2.0 * math.pi
+        current_angle_deg = clamped_value * 360.0
         
-        # Track saturation state
-        self._was_saturated = is_saturated
+        # Every sample is kept for the shutdown dump, never logged
+        self.events.record(self.ev_angle_sample, read_value, mapped_value,
+                           current_angle_deg, adc_min, adc_max)
         
-        # Convert normalized ADC value (0.0-1.0) to radians (0-2π)
-        current_angle_rad = clamped_value * 2.0 * math.pi
-        current_angle_deg = current_angle_rad * 180.0 / math.pi
-        
-        # Debug: Log raw ADC value DISABLED (was spamming logs)
-        # Uncomment below to enable debug logging every 10 seconds:
-        # if not hasattr(self, '_adc_debug_count'):
-        #     self._adc_debug_count = 0
-        # self._adc_debug_count += 1
-        # if self._adc_debug_count % 1000 == 0:  # Log every 1000 readings = 10 seconds
-        if False:  # Disabled
-            reactor = self.printer.get_reactor()
-            cal_status = ""
-            if self._angle_calibration_complete:
-                cal_status = " (calibrated: %.4f-%.4f)" % (adc_min, adc_max)
-            reactor.register_async_callback(
-                lambda et, rv=read_value, mv=mapped_value, cad=current_angle_deg, cs=cal_status: logging.info(
-                    "Winder: ADC debug - raw=%.4f, mapped=%.4f, angle=%.2f°%s" 
-                    % (rv, mv, cad, cs)))
-        
-        # Add to buffer (fast sampling every 10ms)
-        # Store Hall count with each sample for saturation handling
-        self.angle_buffer.append((read_time, current_angle_rad, current_hall_count))
-        
-        # Keep only last N samples (10 samples = 100ms at 10ms intervals)
-        if len(self.angle_buffer) > self.angle_buffer_max:
-            self.angle_buffer.pop(0)
-        
-        # Process buffer every 100ms (when we have 10 samples)
-        if len(self.angle_buffer) >= self.angle_buffer_max:
-            # Get first and last samples from buffer
-            first_time, first_angle, first_hall_count = self.angle_buffer[0]
-            last_time, last_angle, last_hall_count = self.angle_buffer[-1]
-            
-            # Calculate Hall sensor change over buffer period
-            hall_count_delta = last_hall_count - first_hall_count
-            
-            # Debug: Check if angle is actually changing
-            angle_diff_rad_raw = last_angle - first_angle
-            # Show raw ADC values from buffer for debugging
-            first_adc_raw = first_angle / (2.0 * math.pi)  # Convert back to 0-1.0
-            last_adc_raw = last_angle / (2.0 * math.pi)
-            
-            # Calculate total angle change (handle wraparound and saturation)
-            # When saturated, use Hall sensor to calculate RPM
-            # When not saturated, use angle sensor as before
-            
-            # Check if we're currently saturated (check last sample in buffer)
-            is_currently_saturated = is_saturated
-            
-            # Check if sensor is actually still (not rotating)
-            # When saturated, check Hall sensor - if Hall is incrementing, it's rotating through the gap
-            is_actually_still = False
-            if abs(angle_diff_rad_raw) < 0.01:  # Less than 0.57° change over 100ms
-                # ADC not changing - but check if Hall sensor indicates rotation
-                if is_currently_saturated:
-                    # When saturated, use Hall sensor to detect rotation
-                    if hall_count_delta == 0:
-                        # ADC saturated AND Hall sensor not incrementing = sitting still
-                        is_actually_still = True
-                    # else: Hall sensor incrementing = rotating through saturation gap (not still)
-                else:
-                    # Not saturated and ADC not changing = sitting still
-                    is_actually_still = True
-            
-            if is_actually_still:
-                # Sensor still logging DISABLED (was spamming logs)
-                # Uncomment below to enable:
-                # if not hasattr(self, '_still_log_count'):
-                #     self._still_log_count = 0
-                # self._still_log_count += 1
-                # if self._still_log_count % 100 == 0:  # Log every 100 times = 10 seconds when still
-                #     reactor = self.printer.get_reactor()
-                #     hall_info = ""
-                #     if is_currently_saturated:
-                #         hall_info = " (saturated, Hall delta=%d)" % hall_count_delta
-                #     reactor.register_async_callback(
-                #         lambda et, hinfo=hall_info: logging.debug(
-                #             "Winder: Angle sensor still - ADC: %.4f->%.4f, Angle: %.2f°->%.2f°%s" 
-                #             % (first_adc_raw, last_adc_raw,
-                #                first_angle * 180.0 / math.pi, last_angle * 180.0 / math.pi, hinfo)))
-                pass  # Logging disabled
-            
-            # Calculate time difference over the buffer period
-            time_diff = last_time - first_time
-            
-            if time_diff > self.MIN_TIME_DIFF:
-                calculated_rpm = 0.0
-                
-                if is_currently_saturated:
-                    # Saturated - use Hall sensor frequency for RPM calculation
-                    if self.spindle_freq_counter:
-                        freq = self.spindle_freq_counter.get_frequency()
-                        # FrequencyCounter counts edges (both rising and falling)
-                        # For spindle_hall_ppr=1, 1 pulse = 2 edges
-                        # RPM = (freq / edges_per_rev) * 60
-                        edges_per_rev = 2 * self.spindle_hall_ppr
-                        if freq > 0:
-                            calculated_rpm = (freq / edges_per_rev) * 60.0
-                            # Apply calibration factor if needed
-                            calibration_factor = 529.0 / 300.0  # Based on previous measurement
-                            calculated_rpm *= calibration_factor
-                        else:
-                            # No Hall sensor signal - RPM is 0
-                            calculated_rpm = 0.0
-                    else:
-                        # No Hall sensor available - can't calculate RPM while saturated
-                        calculated_rpm = 0.0
-                    
-                    # For angle tracking while saturated, use Hall sensor count over buffer period
-                    # Each Hall increment = 1 full revolution = 2π radians
-                    if hall_count_delta > 0:
-                        # Hall sensor incremented during buffer period - calculate angle change
-                        angle_diff_rad = hall_count_delta * 2.0 * math.pi
-                        # Update total angle tracking
-                        if not hasattr(self, '_last_unwrapped_angle'):
-                            self._last_unwrapped_angle = 0.0
-                            self.angle_total_rad = 0.0
-                        self.angle_total_rad += angle_diff_rad
-                        self.angle_revolutions = int(self.angle_total_rad / (2.0 * math.pi))
-                    else:
-                        # No Hall increment in this period - angle didn't change
-                        angle_diff_rad = 0.0
-                else:
-                    # Not saturated - use angle sensor as before
-                    angle_diff_rad = angle_diff_rad_raw
-                    
-                    # Handle wraparound - use unwrapped angle tracking for better accuracy
-                    # Track cumulative angle to avoid wraparound issues
-                    if not hasattr(self, '_last_unwrapped_angle'):
-                        self._last_unwrapped_angle = first_angle
-                        self.angle_total_rad = first_angle
-                    
-                    # Calculate change from last unwrapped angle
-                    unwrapped_diff = last_angle - self._last_unwrapped_angle
-                    
-                    # Handle wraparound by finding shortest path
-                    if unwrapped_diff > math.pi:
-                        # Large positive jump: wraparound backward (e.g., 10° -> 350°)
-                        unwrapped_diff -= 2.0 * math.pi
-                    elif unwrapped_diff < -math.pi:
-                        # Large negative jump: wraparound forward (e.g., 350° -> 10°)
-                        unwrapped_diff += 2.0 * math.pi
-                    
-                    # Update total angle and revolutions
-                    self.angle_total_rad += unwrapped_diff
-                    # Add any saturated revolutions that occurred
-                    if hasattr(self, '_saturated_revolutions') and self._saturated_revolutions > 0:
-                        self.angle_total_rad += self._saturated_revolutions * 2.0 * math.pi
-                        self._saturated_revolutions = 0  # Reset after adding
-                    self.angle_revolutions = int(self.angle_total_rad / (2.0 * math.pi))
-                    self._last_unwrapped_angle = last_angle
-                    
-                    # Use the unwrapped difference for RPM calculation
-                    angle_diff_rad = unwrapped_diff
-                    
-                    # Calculate angular velocity (rad/s) over the buffer period
-                    angular_velocity_rad_s = angle_diff_rad / time_diff
-                    calculated_rpm = abs(angular_velocity_rad_s) * self.RAD_TO_RPM
-                
-                # Use exponential moving average to smooth RPM
-                if not hasattr(self, '_angle_smoothed_rpm'):
-                    self._angle_smoothed_rpm = calculated_rpm
-                else:
-                    alpha = 0.3  # Smoothing factor
-                    self._angle_smoothed_rpm = alpha * calculated_rpm + (1.0 - alpha) * self._angle_smoothed_rpm
-                
-                # Store angle sensor RPM separately (will be blended with Hall sensor in _update_rpm_safe)
-                # When saturated, this will be set from Hall sensor in the saturation handling code above
-                if not is_currently_saturated:
-                    # Not saturated - store angle sensor RPM
-                    self.spindle_angle_rpm = self._angle_smoothed_rpm
-                # Note: When saturated, RPM is calculated from Hall sensor frequency above,
-                # and spindle_angle_rpm will be updated in _update_rpm_safe to use Hall sensor
-                
-                # For backward compatibility, also update spindle_measured_rpm
-                # But _update_rpm_safe will blend with Hall sensor for final value
-                self.spindle_measured_rpm = self._angle_smoothed_rpm
-                
-                # Angle sensor logging DISABLED (was spamming logs)
-                # Uncomment below to enable logging every 10 seconds:
-                # if not hasattr(self, '_angle_log_count'):
-                #     self._angle_log_count = 0
-                # self._angle_log_count += 1
-                # if self._angle_log_count % 100 == 0:  # Log every 100 buffers = 10 seconds
-                #     reactor = self.printer.get_reactor()
-                #     current_angle_deg = last_angle * 180.0 / math.pi
-                #     reactor.register_async_callback(
-                #         lambda et: logging.info(
-                #             "Winder: Angle sensor - angle=%.2f°, RPM=%.1f, revs=%d" 
-                #             % (current_angle_deg, self.spindle_measured_rpm, self.angle_revolutions)))
-            
-            # Clear buffer for next 100ms period
-            self.angle_buffer = []
+        # Saturated readings are skipped - the estimator coasts on the
+        # Hall edges and unwraps the next reading against its state, which
+        # also gives the total angle
+        if not is_saturated:
+            self.spindle_estimator.update_angle(read_time, clamped_value)
+        self.angle_revolutions = int(self.spindle_estimator.get_state()[1])
         
         # Update last values for tracking (used by status commands)
         self.last_angle_value = current_angle_rad
         self.last_angle_time = read_time
     
+    def _feed_spindle_edges(self, report_time):
+        """Feed every captured spindle Hall edge to the estimator
+        Called from the counter_state callback - the MCU sends the edge
+        times before each report, so they are already queued. Edges are
+        numbered like MCU_counter counts (count & 1 == pin level); a
+        repeated level means an edge pair was lost and is skipped over.
+        """
+        count = self._edge_count
+        ppr = self.spindle_hall_ppr
+        estimator = self.spindle_estimator
+        for edge_time, level in self.spindle_edge_capture.pull_edges():
+            count += 1 if (count & 1) != level else 2
+            estimator.update_hall(edge_time, count, edge_time, ppr)
+            self.dump_hall.add(edge_time, count)
+            self._edge_time = edge_time
+        self._edge_count = count
+        if report_time > self._edge_time:
+            # No edge since the last one - lets the estimator bound the speed
+            estimator.update_hall(report_time, count, self._edge_time, ppr)
+    
     def _handle_connect(self):
         """Setup hardware after MCU connects"""
         logging.info("Winder: Setting up hardware...")
@@ -673,154 +1089,55 @@ class WinderController:
             logging.info("Winder: Motor Hall counter ready (OID=%d)" 
                         % self.motor_freq_counter._counter._oid)
         
-        # Register timers
+        # Register the spindle timer (RPM update, traverse sync and
+        # spindle trapq feed all run from this one timer)
         reactor = self.printer.get_reactor()
-        self.rpm_timer = reactor.register_timer(
+        self.spindle_timer = reactor.register_timer(
             self._update_rpm_safe,
             reactor.monotonic() + 1.0
         )
-        logging.info("Winder: Hall sensor timer registered (poll=%.3fs)" % self.hall_poll_time)
-        
-        self.sync_timer = reactor.register_timer(
-            self._sync_traverse_to_spindle,
-            reactor.monotonic() + 1.0 + self.hall_poll_time
-        )
-        logging.info("Winder: Sync timer registered (rate=%.1f Hz)" % self.sync_update_rate)
+        logging.info("Winder: Spindle timer registered (poll=%.3fs, sync=%.1f Hz)"
+                     % (self.hall_poll_time, self.sync_update_rate))
     
     def _handle_ready(self):
         """Initialize pin states once printer is ready"""
         logging.info("Winder: Printer ready - pins will be initialized on first use")
     
     def _update_rpm_safe(self, eventtime):
-        """Periodic callback to update RPM from Hall sensors
-        For precise wire layering (43AWG on 12mm bobbin), RPM accuracy is critical.
-        Strategy:
-        - Hall sensor: PRIMARY (1 pulse/rev = accurate RPM, no saturation)
-        - Angle sensor: SECONDARY (fine-tune when not saturated, better resolution)
-        - Blend both sources for best accuracy
+        """Periodic callback to update RPM from the spindle estimator
+        The estimator fuses the Hall edge times (continuous, 1 pulse/rev)
+        with the ADC angle (fine resolution, but has a saturation gap) as
+        the measurements arrive; this only samples the result.
+        
+        The same timer then feeds the spindle trapq (geared wind) or runs
+        the velocity sync, so the traverse always sees the fresh RPM.
         """
         try:
             state_msg, state = self.printer.get_state_message()
             if state != 'ready':
                 return eventtime + 0.5
             
-            # For critical sync applications, use Hall sensor as PRIMARY
-            # Hall sensor: 1 pulse/rev = accurate RPM, no saturation issues
-            # Angle sensor: Better resolution but has saturation gap
-            # Blend both sources when angle sensor is not saturated
-            
-            hall_rpm = None
-            angle_rpm = None
-            
-            # Get Hall sensor RPM (PRIMARY - reliable, no saturation)
-            # For 43AWG wire layering, Hall sensor is MORE reliable than angle sensor
-            # because: 1 pulse/rev = accurate RPM, no saturation issues
+            # Spindle speed comes from the shared estimator (Hall edge times
+            # fused with the ADC angle); the raw Hall frequency is only
+            # kept for diagnostics
             if self.spindle_freq_counter:
                 freq = self.spindle_freq_counter.get_frequency()
                 # FrequencyCounter counts edges (both rising and falling)
-                # For spindle_hall_ppr=1, 1 pulse = 2 edges
-                # RPM = (freq / edges_per_rev) * 60
                 edges_per_rev = 2 * self.spindle_hall_ppr
-                
-                if freq > 0:
-                    calculated_rpm = (freq / edges_per_rev) * 60.0
-                    # Apply calibration: if measured 10 Hz gives 300 RPM but real is 529 RPM
-                    # Calibration factor = 529 / 300 = 1.763
-                    calibration_factor = 529.0 / 300.0  # Based on previous measurement
-                    hall_rpm = calculated_rpm * calibration_factor
-                    
-                    # Use exponential moving average to smooth RPM and reduce flickering
-                    # Alpha = 0.3 means 30% new value, 70% old value (smoother)
-                    if not hasattr(self, '_hall_smoothed_rpm'):
-                        self._hall_smoothed_rpm = hall_rpm
-                    else:
-                        alpha = 0.3  # Smoothing factor (0.0-1.0, lower = smoother)
-                        self._hall_smoothed_rpm = alpha * hall_rpm + (1.0 - alpha) * self._hall_smoothed_rpm
-                    
-                    hall_rpm = self._hall_smoothed_rpm
-                    # Reset zero count when we get valid readings
-                    if hasattr(self, '_spindle_zero_count'):
-                        self._spindle_zero_count = 0
-                else:
-                    # If freq is 0, keep last known RPM for a short time to avoid flickering
-                    # Only set to 0 if we've had no edges for a while
-                    if not hasattr(self, '_spindle_zero_count'):
-                        self._spindle_zero_count = 0
-                        if hasattr(self, '_hall_smoothed_rpm'):
-                            hall_rpm = self._hall_smoothed_rpm
-                        else:
-                            hall_rpm = 0.0
-                    else:
-                        self._spindle_zero_count += 1
-                        # After 10 consecutive zero readings (~1 second), set to 0
-                        if self._spindle_zero_count > 10:
-                            hall_rpm = 0.0
-                            if hasattr(self, '_hall_smoothed_rpm'):
-                                self._hall_smoothed_rpm = 0.0
-                        else:
-                            # Keep last value
-                            if hasattr(self, '_hall_smoothed_rpm'):
-                                hall_rpm = self._hall_smoothed_rpm
-                            else:
-                                hall_rpm = 0.0
-                
-                # Log RPM occasionally or when it changes significantly
-                if not hasattr(self, '_rpm_log_count'):
-                    self._rpm_log_count = 0
-                    self._last_logged_rpm = 0.0
-                self._rpm_log_count += 1
-                # Log every 50 updates or when RPM changes by more than 10
-                if self._rpm_log_count % 50 == 0 or (hall_rpm is not None and abs(hall_rpm - self._last_logged_rpm) > 10):
-                    logging.info("Winder: Spindle Hall - freq=%.3f Hz, RPM=%.1f" 
-                                % (freq, hall_rpm if hall_rpm is not None else 0.0))
-                    if hall_rpm is not None:
-                        self._last_logged_rpm = hall_rpm
-            
-            # Store Hall sensor RPM (PRIMARY)
-            if hall_rpm is not None:
-                self.spindle_hall_rpm = hall_rpm
-            
-            # Get angle sensor RPM (SECONDARY - fine-tune when not saturated)
-            # Angle sensor RPM is calculated in _angle_sensor_callback
-            # It's stored in self.spindle_measured_rpm, but we need to track it separately
-            # to blend with Hall sensor properly
-            if self.angle_sensor_adc:
-                # Angle sensor RPM is updated in callback
-                # Check if it was recently calculated (not saturated)
-                # The callback sets self.spindle_measured_rpm when not saturated
-                # When saturated, callback uses Hall sensor RPM
-                angle_rpm = self.spindle_measured_rpm
-                # Check if angle sensor is currently saturated
-                is_angle_saturated = hasattr(self, '_was_saturated') and self._was_saturated
-                if not is_angle_saturated and angle_rpm > 0:
-                    # Angle sensor not saturated - use its RPM
-                    self.spindle_angle_rpm = angle_rpm
-                else:
-                    # Angle sensor saturated - it's using Hall sensor RPM, so use Hall directly
-                    self.spindle_angle_rpm = hall_rpm if hall_rpm is not None else self.spindle_angle_rpm
-            
-            # Blend Hall sensor (PRIMARY) with angle sensor (SECONDARY) for best accuracy
-            # For critical sync applications (43AWG wire), prioritize Hall sensor
-            # Hall sensor: 1 pulse/rev = accurate RPM, no saturation
-            # Angle sensor: Better resolution when not saturated, but has gaps
-            if self.spindle_hall_rpm > 0:
-                if self.spindle_angle_rpm > 0 and not (hasattr(self, '_was_saturated') and self._was_saturated):
-                    # Both available and angle sensor not saturated - blend (70% Hall, 30% Angle)
-                    # Hall sensor is PRIMARY for reliability, angle sensor fine-tunes
-                    final_rpm = 0.7 * self.spindle_hall_rpm + 0.3 * self.spindle_angle_rpm
-                else:
-                    # Angle sensor saturated or not available - use Hall sensor only (100%)
-                    # This ensures continuous accurate RPM even during saturation gaps
-                    final_rpm = self.spindle_hall_rpm
-            elif self.spindle_angle_rpm > 0:
-                # Only angle sensor available - use it (fallback, but not ideal)
-                final_rpm = self.spindle_angle_rpm
-            else:
-                # No sensors available - keep last value
-                final_rpm = self.spindle_measured_rpm if hasattr(self, 'spindle_measured_rpm') else 0.0
+                self.spindle_hall_rpm = (freq / edges_per_rev) * 60.0
+            self.spindle_measured_rpm = self.spindle_estimator.get_rpm()
             
-            # Update measured RPM (used by sync algorithm)
-            self.spindle_measured_rpm = final_rpm
+            # Log RPM occasionally or when it changes significantly
+            if not hasattr(self, '_rpm_log_count'):
+                self._rpm_log_count = 0
+                self._last_logged_rpm = 0.0
+            self._rpm_log_count += 1
+            if (self._rpm_log_count % 50 == 0
+                    or abs(self.spindle_measured_rpm - self._last_logged_rpm) > 10):
+                self.events.record(self.ev_spindle_rpm,
+                                   self.spindle_measured_rpm,
+                                   self.spindle_hall_rpm)
+                self._last_logged_rpm = self.spindle_measured_rpm
             
             if self.motor_freq_counter:
                 freq = self.motor_freq_counter.get_frequency()
@@ -835,11 +1152,34 @@ class WinderController:
                 self._motor_rpm_log_count += 1
                 # Log every 50 updates or when RPM changes by more than 10
                 if self._motor_rpm_log_count % 50 == 0 or (freq > 0 and abs(self.motor_measured_rpm - self._last_logged_motor_rpm) > 10):
-                    logging.info("Winder: Motor Hall - freq=%.3f Hz, RPM=%.1f" 
-                                % (freq, self.motor_measured_rpm))
+                    self.events.record(self.ev_motor_rpm, freq,
+                                       self.motor_measured_rpm)
                     self._last_logged_motor_rpm = self.motor_measured_rpm
             
-            return eventtime + self.hall_poll_time
+            if self.gearing_active:
+                self._gearing_feed(eventtime)
+                return eventtime + min(self.hall_poll_time, GEARING_FEED_TIME)
+            if self.wind_target_turns is not None:
+                self._check_turn_stop(eventtime)
+            if self.program is not None:
+                if self.journal is not None:
+                    self._journal_progress(eventtime)
+                if self.quality_origin is not None:
+                    self._record_quality(eventtime)
+                self._feed_winding_program(eventtime)
+            if self.sync_trigger == 'event':
+                # Sync is driven by _check_sync_event
+                if (self.program is not None
+                        or self.wind_target_turns is not None):
+                    return eventtime + PROGRAM_FEED_TIME
+                return eventtime + IDLE_UPDATE_TIME
+            if not self.is_winding:
+                return eventtime + self.hall_poll_time
+            if eventtime >= self.next_sync_time:
+                self.next_sync_time = eventtime + 1.0 / self.sync_update_rate
+                self._sync_traverse_to_spindle(eventtime)
+            return eventtime + min(self.hall_poll_time,
+                                   1.0 / self.sync_update_rate)
             
         except Exception as e:
             logging.warning("Winder: RPM update error: %s" % e)
@@ -857,18 +1197,26 @@ class WinderController:
         acts as a cap. The sync algorithm adjusts max_velocity to ensure future
         moves can use the correct speed. For continuous sync, the speed parameter
         passed to manual_move() should be updated based on measured RPM.
-        """
-        if not self.is_winding:
-            return self.printer.get_reactor().NEVER
         
+        Called from _update_rpm_safe at sync_update_rate while winding, or
+        from _handle_sync_event with sync_trigger: event.
+        """
         try:
+            toolhead = self.printer.lookup_object('toolhead')
+            if (toolhead.mcu.estimated_print_time(eventtime)
+                    < self.ramp_hold_time):
+                # The traverse is already planned along the spindle ramp
+                return
             # Use measured RPM if available (from Hall sensor or angle sensor blend)
             # Fall back to target RPM if sensors not available
             measured_rpm = self.spindle_measured_rpm if self.spindle_measured_rpm > 0 else self.spindle_rpm_target
-            required_speed = self.calculate_traverse_speed(measured_rpm, self.wire_diameter)
+            required_speed = self.calculate_traverse_speed(
+                measured_rpm, self._get_layer_pitch())
             
-            toolhead = self.printer.lookup_object('toolhead')
-            current_speed = toolhead.get_status(eventtime)['max_velocity']
+            # max_velocity is set with a margin above the required speed
+            current_speed = (toolhead.get_status(eventtime)['max_velocity']
+                             / SYNC_VELOCITY_MARGIN)
+            self.sync_speed = current_speed
             
             if required_speed > 0:
                 # Calculate speed error percentage
@@ -877,7 +1225,8 @@ class WinderController:
                 # Only update if error is significant (>5%) to reduce MCU command frequency
                 # This prevents "Timer too close" errors while maintaining sync accuracy
                 # For 43AWG wire (0.056mm), 5% error = 0.003mm/s difference (acceptable)
-                if speed_error > 0.05:  # 5% threshold
+                if speed_error > SYNC_SPEED_THRESHOLD:
+                    self.sync_speed = required_speed
                     # Use lookahead callback to properly schedule the velocity update
                     # This ensures proper timing and avoids "Timer too close" errors
                     def update_velocity_callback(print_time):
@@ -887,7 +1236,11 @@ class WinderController:
                         
                         # Update traverse max_velocity (with 10% margin for safety)
                         # This allows future manual_move() calls to use speeds up to required_speed * 1.1
-                        toolhead.set_max_velocities(required_speed * 1.1, None, None, None)
+                        toolhead.set_max_velocities(required_speed * SYNC_VELOCITY_MARGIN,
+                                                    None, None, None)
+                        self.dump_sync.add(print_time, measured_rpm,
+                                           required_speed,
+                                           required_speed - current_speed)
                     
                     toolhead.register_lookahead_callback(update_velocity_callback)
                     
@@ -895,31 +1248,172 @@ class WinderController:
                     if not hasattr(self, '_last_logged_sync_speed'):
                         self._last_logged_sync_speed = 0.0
                     if abs(required_speed - self._last_logged_sync_speed) > 0.01:  # Log if >0.01 mm/s change
-                        logging.info("Winder: Sync - Traverse speed: %.3f mm/s (RPM: %.1f, error: %.1f%%)"
-                                    % (required_speed, measured_rpm, speed_error * 100))
+                        self.events.record(self.ev_sync, required_speed,
+                                           measured_rpm, speed_error * 100)
                         self._last_logged_sync_speed = required_speed
             
-            return eventtime + (1.0 / self.sync_update_rate)
-            
         except Exception as e:
             logging.warning("Winder: Sync error: %s" % e)
-            return eventtime + 0.1
+    
+    def _check_sync_event(self, print_time, turns, velocity, accel):
+        """Spindle estimator callback (sync_trigger: event)
+        Runs in the MCU response thread on every Hall report and angle
+        sample, so it only compares the required traverse speed with the
+        last sync update and defers the actual update to the reactor.
+        """
+        rpm = abs(velocity) * 60.0
+        self.spindle_measured_rpm = rpm
+        if not self.is_winding or self.gearing_active or self.sync_pending:
+            return
+        if print_time < self.ramp_hold_time:
+            return
+        required_speed = self.calculate_traverse_speed(
+            rpm if rpm > 0 else self.spindle_rpm_target,
+            self._get_layer_pitch())
+        if abs(required_speed - self.sync_speed) <= (
+                SYNC_SPEED_THRESHOLD * required_speed):
+            return
+        self.sync_pending = True
+        self.printer.get_reactor().register_async_callback(
+            self._handle_sync_event)
+    
+    def _handle_sync_event(self, eventtime):
+        self.sync_pending = False
+        if self.is_winding and not self.gearing_active:
+            self._sync_traverse_to_spindle(eventtime)
+    
+    def _start_speed_control(self):
+        """Close the speed loop around the PWM duty just queued"""
+        if not self.speed_control or self.motor_rpm_target <= 0.0:
+            self.speed_control_active = False
+            return
+        self.speed_loop.reset()
+        self.speed_time = None
+        self.speed_control_active = True
+    
+    def _check_speed_event(self, print_time, turns, velocity, accel):
+        """Spindle estimator callback (speed_control: True)
+        Runs in the MCU response thread, so it only rate limits the loop
+        to SPEED_CONTROL_TIME of spindle estimates and defers the PI update
+        and the PWM command to the reactor.
+        """
+        if not self.speed_control_active or self.speed_pending:
+            return
+        if (self.speed_time is not None
+                and print_time - self.speed_time < SPEED_CONTROL_TIME):
+            return
+        self.speed_pending = True
+        self.printer.get_reactor().register_async_callback(
+            self._handle_speed_event)
+    
+    def _handle_speed_event(self, eventtime):
+        self.speed_pending = False
+        if not self.speed_control_active or self.motor_pwm is None:
+            return
+        try:
+            est_time, turns, velocity, accel = self.spindle_estimator.get_state()
+            dt = 0.0
+            if self.speed_time is not None:
+                dt = est_time - self.speed_time
+                if dt <= 0.0:
+                    return
+            if est_time < self.ramp_hold_time:
+                return
+            self.speed_time = est_time
+            # The map and the loop work in motor RPM
+            measured_rpm = abs(velocity) * 60.0 / self.spindle_gear_ratio
+            duty = self.speed_loop.update(self.motor_rpm_target,
+                                          measured_rpm, dt)
+            if abs(duty - self.pwm_duty) < SPEED_DUTY_DEADBAND:
+                return
+            toolhead = self.printer.lookup_object('toolhead')
+            print_time = toolhead.mcu.estimated_print_time(eventtime)
+            self._set_pwm_duty(print_time + SPEED_CONTROL_LEAD, duty)
+        except Exception as e:
+            logging.warning("Winder: Speed control error: %s" % e)
+    
+    def _set_pwm_duty(self, print_time, duty):
+        """Queue a motor PWM duty change after any already queued one"""
+        mcu = self.motor_pwm.get_mcu()
+        print_time = max(print_time, self.pwm_time + mcu.min_schedule_time())
+        self.motor_pwm.set_pwm(print_time, duty)
+        self.pwm_time = print_time
+        self.pwm_duty = duty
+        return print_time
     
     def _handle_shutdown(self):
         """Emergency shutdown handler"""
         logging.info("Winder: Shutdown - stopping motor")
+        self.gearing_active = False
+        self.speed_control_active = False
+        self.wind_target_turns = None
+        self.turn_stop = None
+        self.wind_state = 'idle'
+        if self.program is not None:
+            eventtime = self.printer.get_reactor().monotonic()
+            if self.journal is not None:
+                self._journal_shutdown(eventtime)
+            self._finish_quality(eventtime, shutdown=True)
+        self.program = None
         self.stop_motor()
         
         reactor = self.printer.get_reactor()
-        if self.rpm_timer:
-            reactor.unregister_timer(self.rpm_timer)
-        if self.sync_timer:
-            reactor.unregister_timer(self.sync_timer)
+        if self.spindle_timer:
+            reactor.unregister_timer(self.spindle_timer)
+            self.spindle_timer = None
+    
+    def _handle_disconnect(self):
+        if self.journal is not None:
+            self.journal.stop()
+        if self.quality is not None:
+            self.quality.stop()
+    
+    def is_busy(self):
+        """True until the spindle and traverse have finished a wind"""
+        return (self.is_winding or self.wind_state != 'idle'
+                or self.gearing_active or self.wind_target_turns is not None
+                or self.turn_stop is not None)
     
     def stop_motor(self):
         """Emergency stop motor"""
+        if self.is_winding:
+            self.wind_aborted = True
         self.is_winding = False
+        reactor = self.printer.get_reactor()
+        if self.stop_request_time is None and self.wind_state != 'idle':
+            toolhead = self.printer.lookup_object('toolhead')
+            self.stop_request_time = toolhead.mcu.estimated_print_time(
+                reactor.monotonic())
+        
+        if self.gearing_active:
+            # Geared wind - decelerate the spindle trajectory (and with it
+            # the traverse) instead of cutting PWM under a moving traverse
+            self.gearing_stopping = True
+            logging.info("Winder: Geared stop requested")
+            return
+        if self.wind_target_turns is not None and self.turn_stop is None:
+            # Stop now instead of at the target turn count
+            self.wind_target_turns = None
+            if self.wind_state == 'draining':
+                self._schedule_program_stop(max(
+                    self.stop_request_time + 0.3, self.program_end_time))
+            elif self.program is None:
+                self.wind_state = 'idle'
+        elif self.turn_stop is not None and self.program is None:
+            # The turn-exact stop is already queued on the MCU
+            return
+        if self.program is not None:
+            if self.wind_state == 'winding':
+                # Stop queuing program moves at the next timer event
+                self.wind_state = 'stopping'
+                reactor.update_timer(self.spindle_timer, reactor.NOW)
+                logging.info("Winder: Stop requested")
+            elif self.wind_state == 'draining' and self.stop_latency is None:
+                self.stop_latency = max(
+                    0.0, self.program_end_time - self.stop_request_time)
+            return
         
+        self.speed_control_active = False
         toolhead = self.printer.lookup_object('toolhead')
         reactor = self.printer.get_reactor()
         
@@ -933,7 +1427,7 @@ class WinderController:
                 pwm_time = print_time + 0.3
                 if self.motor_pwm:
                     if hasattr(self.motor_pwm, '_set_cmd') and self.motor_pwm._set_cmd is not None:
-                        self.motor_pwm.set_pwm(pwm_time, 0.0)
+                        self._set_pwm_duty(pwm_time, 0.0)
                         logging.info("Winder: PWM stopped")
                     else:
                         logging.warning("Winder: PWM pin not ready - cannot stop PWM")
@@ -972,7 +1466,7 @@ class WinderController:
         self.motor_rpm_target = motor_rpm
         self.spindle_rpm_target = motor_rpm * self.spindle_gear_ratio
         
-        pwm_duty = min(motor_rpm / self.max_motor_rpm, 1.0)
+        pwm_duty = self.pwm_map.get_duty(motor_rpm)
         
         toolhead = self.printer.lookup_object('toolhead')
         
@@ -1013,7 +1507,8 @@ class WinderController:
                     if not hasattr(self.motor_pwm, '_set_cmd') or self.motor_pwm._set_cmd is None:
                         logging.warning("Winder: Motor PWM pin not ready - _set_cmd not configured yet")
                         return
-                    self.motor_pwm.set_pwm(cmd_time, pwm_duty)
+                    self._set_pwm_duty(cmd_time, pwm_duty)
+                    self._start_speed_control()
                     logging.debug("Winder: PWM set - pwm_duty=%.3f (%.1f%%) at time %.3f" % (pwm_duty, pwm_duty * 100, cmd_time))
                 else:
                     logging.warning("Winder: Motor PWM pin is None")
@@ -1042,6 +1537,21 @@ class WinderController:
         except (AttributeError, Exception) as e:
             logging.warning("Winder: Motor direction pin error: %s" % e)
     
+    def _rpm_to_duty(self, spindle_rpm):
+        """Map a spindle RPM to a motor PWM duty cycle"""
+        return self.pwm_map.get_duty(spindle_rpm / self.spindle_gear_ratio)
+    
+    def _get_layer_pitch(self):
+        """Pitch of the pass being queued (layer_pitch/pitch_growth and
+        the scatter factor of that pass)"""
+        if self.program is not None:
+            # The sync limit only applies to moves queued after it, so it
+            # follows the pass the feed is queuing
+            return self.program.get_pass_pitch(self.program_pass)
+        if self.layer_schedule is None:
+            return self.wire_diameter
+        return self.layer_schedule.get_pitch(self.current_layer)
+    
     def calculate_traverse_speed(self, spindle_rpm, wire_diameter):
         """Calculate traverse speed to match spindle RPM"""
         if spindle_rpm <= 0:
@@ -1050,8 +1560,55 @@ class WinderController:
         traverse_speed = revs_per_second * wire_diameter
         return traverse_speed
     
-    def start_winding(self, spindle_rpm, layers=1):
-        """Start winding operation"""
+    def _make_scatter(self, pattern=None, seed=None):
+        """ScatterPattern for a new coil (None for a uniform coil)"""
+        if pattern is None:
+            pattern = self.scatter_pattern
+        if pattern == 'none':
+            return None
+        if pattern == 'table' and not self.scatter_table:
+            raise ValueError("No scatter_table configured")
+        if seed is None:
+            seed = self.scatter_seed
+        if seed is None:
+            seed = random.randrange(1 << 31)
+        return ScatterPattern(pattern, self.scatter_amount, seed,
+                              self.scatter_period, self.scatter_table)
+    
+    def compile_program(self, spindle_rpm, layers=1, reversal_dwell=None,
+                        turns=None, pattern=None, seed=None):
+        """Compile a velocity mode coil (one layer = forward + back)
+        Only reads the configuration, so [winder_jobs] compiles the next
+        coil while the current one winds. Raises ValueError.
+        """
+        start_y = self.start_position + self.flange_offset
+        end_y = self.start_position + self.bobbin_width - self.flange_offset
+        if reversal_dwell is None:
+            reversal_dwell = self.reversal_dwell
+        schedule = LayerSchedule(
+            start_y, end_y, self.wire_diameter, self.layer_pitch,
+            self.pitch_growth, self.flange_shrink, layers, turns)
+        scatter = self._make_scatter(pattern, seed)
+        traverse_speed = self.calculate_traverse_speed(spindle_rpm,
+                                                       self.wire_diameter)
+        return WindingProgram(start_y, end_y, self.wire_diameter,
+                              schedule.turns, traverse_speed, reversal_dwell,
+                              ramp=self.spindle_ramp, schedule=schedule,
+                              scatter=scatter)
+    
+    def start_winding(self, spindle_rpm, layers=1, reversal_dwell=None,
+                      turns=None, pattern=None, seed=None, program=None,
+                      resume_index=0, resume_turns=None):
+        """Start winding operation
+        With turns set the coil is that many turns instead of full layers,
+        and the spindle stops on the count (geared: on the trajectory,
+        velocity mode: _check_turn_stop). pattern/seed override the
+        configured scatter pattern (velocity mode). program is the coil
+        from compile_program() with the same arguments, if already
+        compiled. resume_index continues the coil at that program move
+        (WINDER_RESUME), and resume_turns (coil turns already wound) part
+        way into it.
+        """
         if spindle_rpm < self.min_spindle_rpm:
             raise ValueError("RPM too low (min: %.1f)" % self.min_spindle_rpm)
         if spindle_rpm > self.max_spindle_rpm:
@@ -1068,6 +1625,8 @@ class WinderController:
         
         # Set winding flag FIRST so status shows correctly
         self.is_winding = True
+        self.wind_aborted = False
+        self.speed_control_active = False
         self.current_layer = 0
         
         required_motor_rpm = spindle_rpm / self.spindle_gear_ratio
@@ -1076,15 +1635,111 @@ class WinderController:
         
         traverse_speed = self.calculate_traverse_speed(self.spindle_rpm_target, self.wire_diameter)
         
-        start_y = self.start_position
-        end_y = self.start_position + self.bobbin_width
+        start_y = self.start_position + self.flange_offset
+        end_y = self.start_position + self.bobbin_width - self.flange_offset
+        self.layer_schedule = self.scatter = None
+        # The requested count is journaled as given, even once the
+        # program's own ramp down takes over the stop
+        target_turns = turns
+        if turns is None:
+            turns = 2.0 * layers * (end_y - start_y) / self.wire_diameter
+        self.wind_target_turns = target_turns
+        self.wind_origin_turns = self.spindle_estimator.get_state()[1]
+        self.turn_stop = self.turn_error = None
+        
+        if self.sync_mode == 'gearing':
+            self.wind_target_turns = None
+            try:
+                self._start_gearing(toolhead, start_y, end_y, turns)
+            except Exception:
+                self.is_winding = False
+                raise
+            return
+        
+        # Compile the whole coil up front, unless it still matches the
+        # current wire and bobbin
+        if reversal_dwell is None:
+            reversal_dwell = self.reversal_dwell
+        try:
+            if (program is None or program.pitch != self.wire_diameter
+                    or program.start_y != start_y
+                    or program.speed != traverse_speed):
+                program = self.compile_program(
+                    spindle_rpm, layers, reversal_dwell,
+                    self.wind_target_turns, pattern, seed)
+            if program.scatter is not None:
+                logging.info("Winder: Scatter pattern %s, seed %d"
+                             % (program.scatter.pattern, program.scatter.seed))
+            if resume_index >= len(program.moves):
+                raise ValueError("Nothing left to wind")
+        except ValueError:
+            self.is_winding = False
+            self.wind_target_turns = None
+            raise
+        
+        done_turns = 0.0
+        if resume_index:
+            done_turns = program.move_turns[resume_index - 1]
+        if resume_turns is not None:
+            done_turns = min(max(done_turns, resume_turns),
+                             program.move_turns[resume_index])
+        resuming = done_turns > 0.0
+        if resuming:
+            resume_pass = bisect.bisect_left(program.pass_ends, resume_index)
+            if program.cruise_rps is not None:
+                # The program's ramp down ends on the count
+                self.wind_target_turns = None
+            elif self.wind_target_turns is not None:
+                self.wind_target_turns -= done_turns
+            logging.info("Winder: Resuming at move %d, %.1f turns"
+                         % (resume_index, done_turns))
+        if self.journal is not None:
+            scatter = program.scatter
+            self.journal.log_start({
+                'rpm': spindle_rpm, 'dwell': reversal_dwell,
+                'layers': layers, 'turns': target_turns,
+                'pattern': scatter.pattern if scatter is not None else 'none',
+                'seed': scatter.seed if scatter is not None else None,
+                'wire_diameter': self.wire_diameter,
+                'start_position': self.start_position,
+                'flange_offset': self.flange_offset}, resume=resuming)
+            if resuming:
+                # Keep the resume point if the resumed wind fails at once
+                self.journal.log_progress(
+                    0.0, resume_index, resume_pass, resume_pass // 2,
+                    program.get_move_position(resume_index, done_turns),
+                    done_turns)
         
         toolhead.wait_moves()
         
         reactor = self.printer.get_reactor()
+        homed_axes = toolhead.get_status(reactor.monotonic())['homed_axes']
+        if (program.cruise_rps is not None and 'y' in homed_axes
+                and not resuming):
+            # The program ramps the spindle along with the traverse and
+            # ends on the turn count, so there is no separate start or stop
+            self.wind_target_turns = None
+            self.spindle_rpm_target = program.cruise_rps * 60.0
+            self.motor_rpm_target = (self.spindle_rpm_target
+                                     / self.spindle_gear_ratio)
+            self.sync_speed = 0.0
+            print_time = toolhead.get_last_move_time()
+            if self.motor_dir:
+                self.motor_dir.set_digital(print_time, 0)
+            if self.motor_brake:
+                self.motor_brake.set_digital(print_time, 0)
+            logging.info("Winder: Starting - S-curve ramp to %.1f RPM"
+                         " (%.2fs), %.1f turns"
+                         % (self.spindle_rpm_target,
+                            self.spindle_ramp.get_time(program.cruise_rps),
+                            turns))
+            self._begin_winding_program(toolhead, program)
+            return
         
-        # Start sync timer
-        reactor.update_timer(self.sync_timer, reactor.monotonic() + (1.0 / self.sync_update_rate))
+        # Sync runs from the spindle timer, first update after one sync period
+        # (or on the first spindle measurement with sync_trigger: event)
+        self.next_sync_time = reactor.monotonic() + (1.0 / self.sync_update_rate)
+        self.sync_speed = 0.0
         
         logging.info("Winder: Starting - Motor=%.1f RPM, Spindle=%.1f RPM, Traverse=%.3f mm/s, Layers=%d" 
                     % (self.motor_rpm_target, self.spindle_rpm_target, traverse_speed, layers))
@@ -1123,8 +1778,8 @@ class WinderController:
         def set_pwm_callback(eventtime):
             """Set PWM speed (REQUIRED - this is what actually starts the motor)"""
             try:
-                # Calculate PWM duty cycle
-                pwm_duty_raw = required_motor_rpm / self.max_motor_rpm
+                # Calculate PWM duty cycle (calibrated map feed-forward)
+                pwm_duty_raw = self.pwm_map.get_duty(required_motor_rpm)
                 # Apply minimum PWM threshold (some motors need minimum duty to start)
                 min_pwm_duty = 0.05  # 5% minimum duty cycle
                 pwm_duty = max(min_pwm_duty, min(pwm_duty_raw, 1.0))
@@ -1153,7 +1808,8 @@ class WinderController:
                     
                     # PWM pin is ready - set PWM
                     logging.info("Winder: PWM pin ready - _set_cmd exists, setting PWM at time %.3f" % print_time)
-                    self.motor_pwm.set_pwm(print_time, pwm_duty)
+                    self._set_pwm_duty(print_time, pwm_duty)
+                    self._start_speed_control()
                     logging.info("Winder: ✓ Motor started - PWM duty: %.4f (%.2f%%)" % (pwm_duty, pwm_duty * 100))
                     # Keep is_winding = True (already set earlier)
                 else:
@@ -1175,7 +1831,8 @@ class WinderController:
                 homed_axes = status.get('homed_axes', '')
                 
                 if 'y' in homed_axes:
-                    self._start_winding_layer(toolhead, start_y, end_y, traverse_speed, layers)
+                    self._begin_winding_program(toolhead, program,
+                                                resume_index, done_turns)
                     logging.info("Winder: Traverse motion started")
                 else:
                     logging.warning("Winder: Traverse not homed - motor running but traverse motion skipped")
@@ -1191,48 +1848,803 @@ class WinderController:
         reactor.register_callback(set_pwm_callback, reactor.monotonic() + 0.8)
         reactor.register_callback(start_traverse_callback, reactor.monotonic() + 1.2)
     
-    def _start_winding_layer(self, toolhead, start_y, end_y, speed, layers):
-        """Generate continuous back-and-forth motion with dynamic speed sync
-        The sync algorithm (_sync_traverse_to_spindle) adjusts max_velocity in real-time
-        based on measured spindle RPM. This ensures traverse speed matches spindle speed
-        for accurate wire layering (critical for 43AWG wire).
+    def _begin_winding_program(self, toolhead, program, start_index=0,
+                               start_turns=0.0):
+        """Hand a compiled winding program to the winding state machine
+        The coil continues start_turns into move start_index (resume)."""
+        if not self.is_winding:
+            # Stopped while the motor was still starting
+            return
+        start_y = program.get_move_position(start_index, start_turns)
+        toolhead.set_max_velocities(self.travel_speed, None, None, None)
+        toolhead.manual_move([None, start_y, None, None], self.travel_speed)
+        toolhead.set_max_velocities(program.max_speed * 1.1, None, None, None)
+        self.program = program
+        self.layer_schedule = program.schedule
+        self.scatter = program.scatter
+        self.program_index = start_index
+        self.program_pass = bisect.bisect_left(program.pass_ends, start_index)
+        self.current_layer = self.program_pass // 2
+        self.program_done.clear()
+        self.journal_index = start_index
+        # Coil turns count from the estimator state when the traverse starts
+        self.program_origin = (self.spindle_estimator.get_state()[1]
+                               - start_turns)
+        self.program_queued_turns = start_turns
+        self.program_dwells = []
+        if self.quality is not None:
+            self._start_quality(program, start_turns)
+        self.program_queue_time = toolhead.get_last_move_time()
+        self.program_rps = None
+        self.index_pending = self.reversal_angle is not None
+        self.stop_request_time = self.stop_latency = None
+        self.wind_state = 'winding'
+        reactor = self.printer.get_reactor()
+        reactor.update_timer(self.spindle_timer, reactor.NOW)
+    
+    def _feed_winding_program(self, eventtime):
+        """Advance the winding state machine (called from the spindle timer)
+        While winding, moves are queued until the traverse is
+        WIND_BUFFER_TIME ahead of the MCU, without wait_moves(), so gcode
+        and webhooks stay responsive and a stop request is acted on at the
+        next timer event. The sync algorithm (_sync_traverse_to_spindle)
+        adjusts max_velocity, which applies to segments queued afterwards.
+        With spindle_ramp the PWM of every ramp step is queued with the step
+        (_queue_ramp_pwm). With reversal_angle the feed holds at each pass
+        start until it is INDEX_LEAD_TIME ahead, then queues the index
+        dwell (_queue_index_dwell). While a turn-exact stop is pending, moves
+        are only queued up to the turn its ramp starts at (_turn_stop_turns).
         """
-        # Set initial max_velocity to allow sync algorithm to work
-        # Sync algorithm will adjust this dynamically based on measured RPM
-        toolhead.set_max_velocities(speed * 1.1, None, None, None)
-        
-        for layer in range(layers):
-            if not self.is_winding:
+        toolhead = self.printer.lookup_object('toolhead')
+        est_print_time = toolhead.mcu.estimated_print_time(eventtime)
+        if self.wind_state == 'stopping':
+            # Queue nothing more - the traverse stops after the queued moves
+            end_time = toolhead.get_last_move_time()
+            self.stop_latency = max(0.0, end_time - self.stop_request_time)
+            self._schedule_program_stop(end_time)
+            self.wind_state = 'draining'
+            logging.info("Winder: Winding stopped - traverse stops %.3fs after request"
+                         % self.stop_latency)
+            return
+        if self.wind_state == 'draining':
+            if (est_print_time >= self.program_end_time
+                    and self.wind_target_turns is None):
+                self.wind_state = 'idle'
+                # stop_motor() has already cleared is_winding on a stopped
+                # wind, which still ends its journal and quality record
+                self.is_winding = False
+                if self.journal is not None:
+                    # Every queued move has run
+                    self.journal_time = 0.0
+                    self._journal_progress(eventtime)
+                    self.journal.log_end(
+                        winder_journal.END_STOPPED if self.wind_aborted
+                        else winder_journal.END_COMPLETE)
+                self._finish_quality(eventtime)
+                logging.info("Winder: Winding %s - %d passes, %d layers"
+                             % ('stopped' if self.wind_aborted else 'complete',
+                                self.program_pass, self.current_layer))
+                # The last turns are recorded against the program
+                self.program = None
+            return
+        program = self.program
+        moves = program.moves
+        try:
+            if self.program_queue_time < est_print_time:
+                # Queue ran dry (host stalled) - restart from the toolhead
+                self.program_queue_time = toolhead.get_last_move_time()
+            if self.index_pending:
+                if (self.program_queue_time
+                        > est_print_time + INDEX_LEAD_TIME):
+                    return
+                self._queue_index_dwell(toolhead)
+            last_y = toolhead.get_position()[1]
+            limit_turns = None
+            if self.wind_target_turns is not None and self.turn_stop is None:
+                limit_turns = self._turn_stop_turns()[0]
+            while (self.program_index < len(moves) and self.program_queue_time
+                   < est_print_time + WIND_BUFFER_TIME
+                   and not self.index_pending):
+                y, speed, dwell, rps = moves[self.program_index]
+                move_pass = self.program_pass
+                if (limit_turns is not None and
+                        program.move_turns[self.program_index] > limit_turns):
+                    # Hold where the stop ramp starts (_queue_traverse_stop)
+                    if limit_turns > self.program_queued_turns:
+                        y = program.get_move_position(self.program_index,
+                                                      limit_turns)
+                        toolhead.manual_move([None, y, None, None], speed)
+                        self.program_queue_time += abs(y - last_y) / speed
+                        self.program_queued_turns = limit_turns
+                    break
+                move_t = abs(y - last_y) / speed
+                horizon = est_print_time + WIND_BUFFER_TIME
+                split_turns = None
+                if self.program_queue_time + move_t > horizon + WIND_SPLIT_TIME:
+                    # Queue up to the buffer horizon, the rest follows
+                    frac = (horizon - self.program_queue_time) / move_t
+                    split_turns = self.program_queued_turns + frac * (
+                        program.move_turns[self.program_index]
+                        - self.program_queued_turns)
+                    y = program.get_move_position(self.program_index,
+                                                  split_turns)
+                    move_t = abs(y - last_y) / speed
+                if rps is not None and rps != self.program_rps:
+                    self._queue_ramp_pwm(est_print_time, rps, move_t)
+                toolhead.manual_move([None, y, None, None], speed)
+                self.program_queue_time += move_t
+                if split_turns is not None:
+                    self.program_queued_turns = split_turns
+                    break
+                last_y = y
+                if self.program_index == program.pass_ends[self.program_pass]:
+                    self.program_pass += 1
+                    # Layer count reflects moves queued (up to one buffer ahead)
+                    self.current_layer = self.program_pass // 2
+                    if dwell:
+                        self._queue_program_dwell(toolhead, dwell)
+                    # A reversal plans through zero speed, so flushing the
+                    # lookahead here is free and resyncs the queue estimate
+                    self.program_queue_time = toolhead.get_last_move_time()
+                    self.index_pending = (self.reversal_angle is not None
+                                          and self.program_index + 1
+                                          < len(moves))
+                self._program_move_queued(move_pass, y)
+        except Exception as e:
+            logging.error("Winder: Error queuing traverse move: %s" % e)
+            self.stop_motor()
+            return
+        if self.program_index >= len(moves):
+            self._schedule_program_stop(toolhead.get_last_move_time())
+            self.wind_state = 'draining'
+    
+    def _program_move_queued(self, move_pass, y):
+        """Record a program move queued up to its end (ending at
+        program_queue_time) for the journal, quality record and dump"""
+        self.program_done.append((self.program_queue_time,
+                                  self.program_index, y))
+        if self.quality_origin is not None:
+            self.quality_tracker.add_move(self.program_queue_time, move_pass)
+        if self.dump_spindle.is_active():
+            self.dump_tracker.add_move(self.program_queue_time, move_pass)
+        self.program_queued_turns = self.program.move_turns[self.program_index]
+        self.program_index += 1
+    
+    def _queue_ramp_pwm(self, est_print_time, rps, move_t):
+        """Queue the spindle PWM for a program move starting at
+        program_queue_time (spindle_ramp: s_curve)
+        The duty is queued stop_lag early, so the spindle (which lags the
+        PWM by about that much) follows the traverse ramp. The speed loop
+        and the velocity sync are held off until the ramp is done.
+        """
+        start_time = self.program_queue_time
+        self._set_pwm_duty(max(start_time - self.stop_lag,
+                               est_print_time + SPEED_CONTROL_LEAD),
+                           self._rpm_to_duty(rps * 60.0))
+        if rps == self.program.cruise_rps:
+            self.ramp_hold_time = start_time + self.stop_lag
+            self._start_speed_control()
+        else:
+            self.ramp_hold_time = start_time + move_t
+            if self.program_rps is not None and rps < self.program_rps:
+                # Ramping down - the queued steps now own the PWM
+                self.speed_control_active = False
+        self.program_rps = rps
+    
+    def _queue_index_dwell(self, toolhead):
+        """Dwell until the spindle reaches reversal_angle, so the next
+        pass starts there (at most one turn)
+        The spindle angle at the pass start is predicted from the spindle
+        estimate and the dwell is queued on the toolhead, so the pass
+        starts on the MCU clock. Skipped while the spindle is stopped or the
+        program ramps it (spindle_ramp).
+        """
+        self.index_pending = False
+        program = self.program
+        rps = program.moves[self.program_index][3]
+        if rps is not None and rps != program.cruise_rps:
+            return
+        velocity = self.spindle_estimator.get_velocity()
+        if velocity < INDEX_MIN_RPS:
+            return
+        print_time = toolhead.get_last_move_time()
+        turns = self.spindle_estimator.get_turns(print_time)
+        wait = ((self.reversal_angle / 360.0 - turns) % 1.0) / velocity
+        self._queue_program_dwell(toolhead, wait)
+        self.program_queue_time = toolhead.get_last_move_time()
+    
+    def _queue_program_dwell(self, toolhead, dwell_t):
+        """Queue a traverse dwell of the program and the spindle turns
+        laid during it (at the measured speed)"""
+        start_time = toolhead.get_last_move_time()
+        velocity = max(0.0, self.spindle_estimator.get_velocity())
+        self.program_dwells.append((start_time, dwell_t, velocity * dwell_t))
+        toolhead.dwell(dwell_t)
+    
+    def _dwell_turns(self, print_time=None):
+        """Spindle turns laid in the queued program dwells, or in those
+        run by print_time"""
+        total = 0.0
+        for start_time, dwell_t, turns in self.program_dwells:
+            if print_time is not None:
+                if print_time <= start_time:
+                    break
+                turns *= min(1.0, (print_time - start_time) / dwell_t)
+            total += turns
+        return total
+    
+    def _journal_progress(self, eventtime):
+        """Journal the last program move completed on the MCU (at most
+        every journal_interval)"""
+        if eventtime < self.journal_time:
+            return
+        self.journal_time = eventtime + self.journal_interval
+        toolhead = self.printer.lookup_object('toolhead')
+        est_print_time = toolhead.mcu.estimated_print_time(eventtime)
+        done = None
+        while self.program_done and self.program_done[0][0] <= est_print_time:
+            done = self.program_done.popleft()
+        if done is None or done[1] + 1 == self.journal_index:
+            return
+        end_time, index, y = done
+        self.journal_index = index + 1
+        pass_index = bisect.bisect_left(self.program.pass_ends, index + 1)
+        self.journal.log_progress(end_time, index + 1, pass_index,
+                                  pass_index // 2, y,
+                                  self.program.move_turns[index])
+    
+    def _journal_shutdown(self, eventtime):
+        """Journal the last completed move, then the coil turns reached
+        part way into the next one, at an MCU shutdown
+        Without the second record WINDER_RESUME would restart from the last
+        progress record, up to journal_interval plus a program segment
+        behind, and lay those turns again.
+        """
+        self.journal_time = 0.0
+        self._journal_progress(eventtime)
+        if not self.program_done:
+            return
+        toolhead = self.printer.lookup_object('toolhead')
+        est_print_time = toolhead.mcu.estimated_print_time(eventtime)
+        program = self.program
+        # First move not completed by the MCU
+        index = self.program_done[0][1]
+        est_time, turns = self.spindle_estimator.get_state()[:2]
+        turns -= self.program_origin + self._dwell_turns(est_time)
+        if index:
+            turns = max(turns, program.move_turns[index - 1])
+        turns = min(turns, program.move_turns[index])
+        pass_index = bisect.bisect_left(program.pass_ends, index)
+        self.journal.log_progress(
+            est_print_time, index, pass_index, pass_index // 2,
+            program.get_move_position(index, turns), turns)
+    
+    def _start_quality(self, program, done_turns):
+        """Start the quality record of a program (quality_dir)"""
+        scatter = program.scatter
+        self.quality.start({
+            'rpm': self.spindle_rpm_target, 'turns': program.turns,
+            'wire_diameter': self.wire_diameter, 'start_y': program.start_y,
+            'end_y': program.end_y, 'resumed_at': done_turns,
+            'scatter_pattern': scatter.pattern if scatter else 'none',
+            'scatter_seed': scatter.seed if scatter else None})
+        self.quality_turns.clear()
+        self.quality_tracker.reset(self.program_origin,
+                                   int(math.floor(done_turns)) + 1)
+        self.quality_origin = self.program_origin
+    
+    def _check_quality_turn(self, print_time, turns, velocity, accel):
+        """Spindle estimator callback (quality_dir)
+        Runs in the MCU response thread, so it only queues the time of
+        each whole turn for _record_quality.
+        """
+        if self.quality_origin is not None:
+            self.quality_tracker.check_turn(self.quality_turns, print_time,
+                                            turns, velocity)
+    
+    def _record_quality(self, eventtime):
+        """Add the traverse position and pitch error of every queued turn
+        to the quality record"""
+        dtrapq = self.motion_report.dtrapqs.get('toolhead')
+        if dtrapq is None:
+            return
+        program = self.program
+        while self.quality_turns:
+            turn, turn_time, velocity = self.quality_turns.popleft()
+            y, pass_index, last = self.quality_tracker.locate_turn(
+                dtrapq, turn_time)
+            if y is None:
+                continue
+            if pass_index is None:
+                pass_index = 0
+            pitch_error = float('nan')
+            if last is not None and last[0] is not None:
+                last_y, last_pass = last
+                if last_pass == pass_index:
+                    pitch_error = (abs(y - last_y)
+                                   - program.get_pass_pitch(pass_index))
+            self.quality.add_turn(turn, turn_time, y, 1.0 / velocity,
+                                  pitch_error, pass_index)
+    
+    def _finish_quality(self, eventtime, shutdown=False):
+        if self.quality_origin is None:
+            return
+        if not shutdown:
+            self._record_quality(eventtime)
+        self.quality_origin = None
+        path = self.quality.finish(complete=not (shutdown
+                                                 or self.wind_aborted))
+        logging.info("Winder: Quality record %s" % (path,))
+    
+    def _start_dump_spindle(self):
+        """First winder/dump_spindle client - start collecting turns"""
+        self.dump_tracker.reset()
+        self.dump_direction = None
+    
+    def _check_dump_turn(self, print_time, turns, velocity, accel):
+        """Spindle estimator callback (winder/dump_spindle)
+        Runs in the MCU response thread and returns at once unless a
+        client is subscribed.
+        """
+        self.dump_tracker.check_turn(self.dump_spindle.rows, print_time,
+                                     turns, velocity)
+    
+    def _dump_spindle_rows(self, turns):
+        """Queued turns as (time, turn, rpm, traverse_pos, pitch_error)
+        rows; pitch_error is against the pass pitch of a program (the wire
+        diameter otherwise) and None across reversals"""
+        dtrapq = self.motion_report.dtrapqs.get('toolhead')
+        program = self.program
+        data = []
+        for turn, turn_time, velocity in turns:
+            y, pass_index, last = self.dump_tracker.locate_turn(
+                dtrapq, turn_time)
+            pitch = self.wire_diameter
+            if program is not None and pass_index is not None:
+                pitch = program.get_pass_pitch(pass_index)
+            pitch_error = None
+            direction = None
+            if y is not None and last is not None:
+                last_y, last_pass = last
+                if last_y is not None and y != last_y:
+                    direction = y > last_y
+                    if (last_pass == pass_index
+                            and self.dump_direction in (None, direction)):
+                        pitch_error = abs(y - last_y) - pitch
+            self.dump_direction = direction
+            data.append((turn_time, turn, velocity * 60.0, y, pitch_error))
+        return data
+    
+    def _schedule_program_stop(self, end_time):
+        """Stop the spindle once the last queued traverse move ends"""
+        self.program_end_time = end_time
+        if self.wind_target_turns is not None or self.turn_stop is not None:
+            # The spindle stops at the target turn count (_check_turn_stop)
+            return
+        self.speed_control_active = False
+        if self.motor_pwm:
+            self._set_pwm_duty(end_time, 0.0)
+        if self.motor_brake:
+            # Same 300ms spacing as stop_motor()
+            self.motor_brake.set_digital(end_time + 0.3, 1)
+    
+    def _check_turn_stop(self, eventtime):
+        """Queue the stop that lands the spindle on the target turn count
+        The ramp starts when the turns left equal the stopping distance at
+        the measured speed, v^2 / (2 * stop_decel) + v * stop_lag. The PWM
+        follows that deceleration down to zero and the brake engages at
+        the end, all at MCU print times, so the stop does not depend on
+        host timing.
+        """
+        toolhead = self.printer.lookup_object('toolhead')
+        now = toolhead.mcu.estimated_print_time(eventtime)
+        if self.turn_stop is not None:
+            if now >= self.turn_stop[1] + TURN_STOP_SETTLE:
+                self._finish_turn_stop()
+            return
+        est_time, turns, velocity, accel = self.spindle_estimator.get_state()
+        speed = abs(velocity)
+        if speed <= 0.0:
+            return
+        done = abs(turns + velocity * (now - est_time) - self.wind_origin_turns)
+        decel = self.stop_decel / 60.0
+        stop_turns = self._stop_turns(speed)
+        ramp_start = now + (self.wind_target_turns - done - stop_turns) / speed
+        if ramp_start > now + TURN_STOP_HORIZON:
+            return
+        ramp_start = max(ramp_start, now + TURN_STOP_LEAD)
+        self.speed_control_active = False
+        ramp_time = speed / decel
+        brake_time = ramp_start + ramp_time
+        if self.motor_pwm:
+            steps = max(1, int(math.ceil(ramp_time / STOP_RAMP_STEP)))
+            for i in range(steps):
+                rps = speed * (1.0 - float(i) / steps)
+                self._set_pwm_duty(ramp_start + ramp_time * i / steps,
+                                   self._rpm_to_duty(rps * 60.0))
+            brake_time = self._set_pwm_duty(brake_time, 0.0)
+        if self.motor_brake:
+            self.motor_brake.set_digital(brake_time, 1)
+        self.turn_stop = (ramp_start, brake_time, speed, stop_turns)
+        if self.wind_state == 'winding':
+            # The traverse was queued up to the ramp start; it lays the
+            # remaining turns along the ramp and stops with the spindle
+            self.stop_request_time = ramp_start
+            try:
+                self._queue_traverse_stop(toolhead, ramp_start, speed)
+            except Exception as e:
+                logging.error("Winder: Error queuing traverse stop: %s" % e)
+            self.wind_state = 'stopping'
+        logging.info("Winder: Turn stop queued - %.2f turns left at %.1f RPM,"
+                     " ramp %.3fs" % (self.wind_target_turns - done,
+                                      speed * 60.0, ramp_time))
+    
+    def _stop_turns(self, speed):
+        """Turns from the start of the stop ramp to standstill at speed
+        (rev/s): stop_lag at speed, then stop_decel down to zero"""
+        decel = self.stop_decel / 60.0
+        return speed * speed / (2.0 * decel) + speed * self.stop_lag
+    
+    def _turn_stop_turns(self):
+        """Program coil turns where the turn-exact stop ramp starts at the
+        measured speed, and where the spindle comes to rest
+        The target counts every spindle turn from wind_origin_turns (motor
+        start) while the program counts from program_origin (traverse
+        start) without the turns laid in its dwells."""
+        end_turns = min(self.wind_target_turns + self.wind_origin_turns
+                        - self.program_origin - self._dwell_turns(),
+                        self.program.move_turns[-1])
+        speed = abs(self.spindle_estimator.get_state()[2])
+        return end_turns - self._stop_turns(speed), end_turns
+    
+    def _queue_traverse_stop(self, toolhead, ramp_start, speed):
+        """Queue the rest of the program along the spindle's stop
+        The traverse starts with the PWM ramp, runs stop_lag at speed, then
+        decelerates at stop_decel, in STOP_RAMP_STEP steps. The turns left
+        are spread over that profile, so the traverse ends where the last
+        turn is laid instead of running on through queued moves."""
+        program = self.program
+        moves = program.moves
+        queue_time = toolhead.get_last_move_time()
+        if queue_time < ramp_start:
+            toolhead.dwell(ramp_start - queue_time)
+        self.program_queue_time = max(queue_time, ramp_start)
+        decel = self.stop_decel / 60.0
+        lag = self.stop_lag
+        total_time = lag + speed / decel
+        start_turns = self.program_queued_turns
+        scale = ((self._turn_stop_turns()[1] - start_turns)
+                 / (speed * lag + speed * speed / (2.0 * decel)))
+        steps = max(1, int(math.ceil(total_time / STOP_RAMP_STEP)))
+        step_t = total_time / steps
+        last_y = toolhead.get_position()[1]
+        last_turns = start_turns
+        for i in range(1, steps + 1):
+            t = total_time * i / steps
+            if t <= lag:
+                turns = speed * t
+            else:
+                t -= lag
+                turns = speed * lag + speed * t - 0.5 * decel * t * t
+            turns = start_turns + turns * scale
+            if turns <= last_turns + 0.000001:
+                toolhead.dwell(step_t)
+                self.program_queue_time += step_t
+                continue
+            # Split at move ends, so reversals stay at the flanges
+            rate = (turns - last_turns) / step_t
+            while (self.program_index < len(moves)
+                   and last_turns < turns - 0.000001):
+                index = self.program_index
+                end_turns = min(turns, program.move_turns[index])
+                y = program.get_move_position(index, end_turns)
+                move_t = (end_turns - last_turns) / rate
+                if abs(y - last_y) > 0.000001:
+                    toolhead.manual_move([None, y, None, None],
+                                         abs(y - last_y) / move_t)
+                else:
+                    toolhead.dwell(move_t)
+                self.program_queue_time += move_t
+                self.program_queued_turns = last_turns = end_turns
+                last_y = y
+                if end_turns < program.move_turns[index]:
+                    break
+                move_pass = self.program_pass
+                if index == program.pass_ends[self.program_pass]:
+                    self.program_pass += 1
+                    self.current_layer = self.program_pass // 2
+                self._program_move_queued(move_pass, y)
+            last_turns = turns
+    
+    def _finish_turn_stop(self):
+        """Read the final turn count and relearn the stop lag"""
+        ramp_start, brake_time, speed, stop_turns = self.turn_stop
+        est_time, turns = self.spindle_estimator.get_state()[:2]
+        self.turn_error = (abs(turns - self.wind_origin_turns)
+                           - self.wind_target_turns)
+        if self.wind_aborted or est_time < ramp_start:
+            # Cut short by WINDER_STOP, or the count is extrapolated from
+            # before the ramp - the error says nothing about the lag
+            logging.info("Winder: Turn stop - %.1f turns, error %+.2f turns,"
+                         " stop_lag kept at %.3fs"
+                         % (self.wind_target_turns, self.turn_error,
+                            self.stop_lag))
+        else:
+            # The ramp itself is commanded, so an error in the stopping
+            # distance is time the spindle spent following it
+            step = STOP_LAG_LEARN * self.turn_error / speed
+            step = max(-STOP_LAG_MAX_STEP, min(STOP_LAG_MAX_STEP, step))
+            self.stop_lag = max(0.0, min(STOP_LAG_MAX, self.stop_lag + step))
+            # Kept across restarts once SAVE_CONFIG is run
+            configfile = self.printer.lookup_object('configfile')
+            configfile.set(self.name, 'stop_lag', "%.4f" % (self.stop_lag,))
+            logging.info("Winder: Turn stop - %.1f turns, error %+.2f turns,"
+                         " stop_lag now %.3fs (SAVE_CONFIG to keep it)"
+                         % (self.wind_target_turns, self.turn_error,
+                            self.stop_lag))
+        self.wind_target_turns = None
+        self.turn_stop = None
+        if self.program is None:
+            self.is_winding = False
+            self.wind_state = 'idle'
+    
+    def _start_gearing(self, toolhead, start_y, end_y, turns):
+        """Start an electronically geared wind
+        The spindle trajectory is queued on self.spindle_trapq and the traverse
+        stepper is switched onto it, so kin_winder.c computes the traverse
+        position as turns * pitch (with reversals at start_y and end_y). Pitch
+        accuracy no longer depends on a host polling loop.
+        """
+        if self.gearing_active:
+            raise ValueError("Geared wind already in progress")
+        kin = toolhead.get_kinematics()
+        if not hasattr(kin, 'set_gearing'):
+            raise ValueError("sync_mode: gearing requires 'kinematics: winder'")
+        reactor = self.printer.get_reactor()
+        status = toolhead.get_status(reactor.monotonic())
+        if 'y' not in status.get('homed_axes', ''):
+            raise ValueError("Traverse not homed - run G28 Y first")
+        
+        # Move the traverse to the start of the stroke
+        toolhead.set_max_velocities(self.travel_speed, None, None, None)
+        toolhead.manual_move([None, start_y, None, None], self.travel_speed)
+        
+        # Hand the traverse stepper to the spindle trapq
+        self.gearing_width = end_y - start_y
+        if self.gearing_width <= 0.0:
+            raise ValueError("Flange offsets leave no winding width")
+        kin.set_gearing(self.spindle_trapq, self.wire_diameter,
+                        self.gearing_width, self.spindle_turns, start_y)
+        est_print_time = toolhead.mcu.estimated_print_time(reactor.monotonic())
+        self.spindle_print_time = max(
+            toolhead.get_last_move_time(), self.spindle_print_time,
+            self.motion_queuing.calc_step_gen_restart(est_print_time))
+        self.spindle_velocity = 0.0
+        self.gearing_origin_turns = self.spindle_turns
+        self.gearing_end_turns = self.spindle_turns + turns
+        self.gearing_target_rps = self.spindle_rpm_target / 60.0
+        self.gearing_stopping = False
+        self.gearing_total_correction = 0.0
+        self.gearing_slip_sample = None
+        self.gearing_slip_rate = 0.0
+        self.gearing_turn_error = 0.0
+        self.gearing_edge_ref = None
+        self.gearing_start_count = None
+        if self.gearing_feedback and self._spindle_edges is not None:
+            self.gearing_start_count = self._spindle_edges[1][1]
+        self.spindle_moves.clear()
+        self.stop_request_time = self.stop_latency = None
+        self.wind_state = 'winding'
+        self.gearing_active = True
+        
+        # Motor direction forward, brake released, at the start of the ramp
+        if self.motor_dir:
+            self.motor_dir.set_digital(self.spindle_print_time, 0)
+        if self.motor_brake:
+            self.motor_brake.set_digital(self.spindle_print_time, 0)
+        self._last_pwm_duty = None
+        
+        logging.info("Winder: Geared wind - %.1f turns, pitch=%.4f mm, width=%.2f mm"
+                     % (self.gearing_end_turns - self.gearing_origin_turns,
+                        self.wire_diameter, self.gearing_width))
+        reactor.update_timer(self.spindle_timer, reactor.NOW)
+    
+    def _append_spindle_move(self, move_t, start_v, end_v, correction=0.0):
+        """Queue one constant-acceleration spindle segment (turns/s)
+        start_v/end_v are the commanded motor speeds; the trapq segment
+        runs "correction" turns/s faster to absorb the measured turn error.
+        """
+        print_time = self.spindle_print_time
+        turns = self.spindle_turns
+        trapq_v = start_v + correction
+        accel = (end_v - start_v) / move_t
+        if end_v > start_v:
+            self.trapq_append(self.spindle_trapq, print_time,
+                              move_t, 0., 0., turns, 0., 0., 1., 0., 0.,
+                              trapq_v, end_v + correction, accel)
+        elif end_v < start_v:
+            self.trapq_append(self.spindle_trapq, print_time,
+                              0., 0., move_t, turns, 0., 0., 1., 0., 0.,
+                              trapq_v, trapq_v, -accel)
+        else:
+            self.trapq_append(self.spindle_trapq, print_time,
+                              0., move_t, 0., turns, 0., 0., 1., 0., 0.,
+                              trapq_v, trapq_v, 0.)
+        self.spindle_moves.append((print_time, move_t, trapq_v, accel, turns,
+                                   correction, self.gearing_total_correction))
+        self.gearing_total_correction += correction * move_t
+        # Feed-forward PWM for the speed reached at the end of the segment
+        duty = self._rpm_to_duty(end_v * 60.0)
+        if duty != self._last_pwm_duty and self.motor_pwm:
+            self._set_pwm_duty(print_time, duty)
+            self._last_pwm_duty = duty
+        self.spindle_turns = turns + (trapq_v + .5 * accel * move_t) * move_t
+        self.spindle_velocity = end_v
+        self.spindle_print_time = print_time + move_t
+        self.motion_queuing.note_mcu_movequeue_activity(self.spindle_print_time)
+    
+    def _plan_spindle(self, end_time, correction=0.0):
+        """Extend the spindle trajectory up to end_time"""
+        accel = self.spindle_accel / 60.0
+        while self.spindle_print_time < end_time - 0.000001:
+            v = self.spindle_velocity
+            target = self.gearing_target_rps
+            remaining = self.gearing_end_turns - self.spindle_turns
+            if self.gearing_stopping or remaining <= v * v / (2.0 * accel) + 0.000001:
+                target = 0.0
+            max_t = min(end_time - self.spindle_print_time, SPINDLE_SEGMENT_TIME)
+            if target > v:
+                move_t = min((target - v) / accel, max_t)
+                end_v = target if move_t < max_t else v + accel * move_t
+            elif target < v:
+                # Decelerate on the commanded profile so the stop lands
+                # exactly on the end of the wind
+                correction = 0.0
+                move_t = min((v - target) / accel, max_t)
+                end_v = target if move_t < max_t else v - accel * move_t
+            elif v > 0.0:
+                # Cruise until the point where deceleration must begin
+                cruise_turns = remaining - v * v / (2.0 * accel)
+                move_t = min(end_time - self.spindle_print_time,
+                             cruise_turns / (v + correction))
+                end_v = v
+            else:
                 break
-            
-            # Move forward (start_y -> end_y)
-            # Speed will be dynamically adjusted by sync algorithm via max_velocity
-            toolhead.manual_move([None, end_y, None, None], speed)
-            toolhead.wait_moves()
-            
-            if not self.is_winding:
+            self._append_spindle_move(move_t, v, end_v, correction)
+    
+    def _lookup_spindle_turns(self, print_time):
+        """Return (trapq turns, correction included so far) at print_time"""
+        for pt, move_t, start_v, accel, start_turns, corr, total_corr in self.spindle_moves:
+            if pt + move_t < print_time:
+                continue
+            if pt > print_time:
                 break
-            
-            # Move backward (end_y -> start_y)
-            # Speed will be dynamically adjusted by sync algorithm via max_velocity
-            toolhead.manual_move([None, start_y, None, None], speed)
-            toolhead.wait_moves()
-            
-            self.current_layer = layer + 1
-            logging.info("Winder: Completed layer %d of %d (RPM: %.1f, Speed: %.3f mm/s)" 
-                        % (self.current_layer, layers, self.spindle_measured_rpm, speed))
-        
-        if self.is_winding:
-            self.stop_motor()
-            logging.info("Winder: Winding complete - %d layers finished" % layers)
+            t = print_time - pt
+            return (start_turns + (start_v + .5 * accel * t) * t,
+                    total_corr + corr * t)
+        return None, None
     
-    cmd_WINDER_START_help = "Start winding operation (RPM=100 LAYERS=1)"
+    def _measure_spindle_slip(self):
+        """Measured minus commanded spindle turns at the last usable Hall edge
+        Only edges of the same polarity as the reference edge are used, as
+        the Hall pulse is not 50% duty. The first edge after the start of
+        the wind fixes the spindle phase, so this tracks accumulated slip
+        rather than the unknown magnet angle. Returns (edge_time, slip,
+        turn_error) or None when no measurement is available.
+        """
+        edges = self._spindle_edges
+        if edges is None or self.gearing_start_count is None:
+            return None
+        edges_per_rev = 2 * self.spindle_hall_ppr
+        ref = self.gearing_edge_ref
+        if ref is None:
+            count_time, count = edges[1]
+            if count == self.gearing_start_count:
+                return None
+            turns, total_corr = self._lookup_spindle_turns(count_time)
+            if turns is not None:
+                self.gearing_edge_ref = (count, turns - total_corr)
+            return None
+        for count_time, count in reversed(edges):
+            if (count - ref[0]) & 1 == 0:
+                break
+        else:
+            return None
+        turns, total_corr = self._lookup_spindle_turns(count_time)
+        if turns is None:
+            return None
+        measured = ref[1] + float(count - ref[0]) / edges_per_rev
+        return count_time, measured - (turns - total_corr), measured - turns
+    
+    def _gearing_feed(self, eventtime):
+        """Keep the spindle trapq filled one lead window ahead of the MCU
+        The commanded spindle profile is the feed-forward (it also sets
+        the motor PWM). The slip measured from the spindle Hall edge
+        timestamps is extrapolated to the end of the queued trajectory and
+        folded into the newly appended segments, so the traverse follows
+        the real spindle with one lead window of latency.
+        """
+        toolhead = self.printer.lookup_object('toolhead')
+        est_print_time = toolhead.mcu.estimated_print_time(eventtime)
+        if self.spindle_print_time < est_print_time:
+            self.events.record(self.ev_gearing_behind,
+                               est_print_time - self.spindle_print_time)
+        # Forget segments that can no longer match a Hall edge
+        while (self.spindle_moves and self.spindle_moves[0][0]
+               + self.spindle_moves[0][1] < est_print_time - GEARING_LEAD_TIME):
+            self.spindle_moves.popleft()
+        correction = 0.0
+        measurement = self._measure_spindle_slip()
+        if measurement is not None:
+            edge_time, slip, self.gearing_turn_error = measurement
+            last = self.gearing_slip_sample
+            if last is None:
+                self.gearing_slip_sample = (edge_time, slip)
+            elif edge_time - last[0] >= GEARING_LEAD_TIME:
+                rate = (slip - last[1]) / (edge_time - last[0])
+                self.gearing_slip_rate += .5 * (rate - self.gearing_slip_rate)
+                self.gearing_slip_sample = (edge_time, slip)
+            # Turn error expected at the end of the queued trajectory
+            end_error = (slip - self.gearing_total_correction
+                         + self.gearing_slip_rate
+                         * (self.spindle_print_time - edge_time))
+            max_corr = GEARING_MAX_CORRECTION * self.spindle_velocity
+            correction = max(-max_corr, min(max_corr, self.gearing_slip_rate
+                                            + end_error / GEARING_LEAD_TIME))
+        self._plan_spindle(est_print_time + GEARING_LEAD_TIME, correction)
+        if measurement is not None:
+            # Same units as the velocity sync: traverse mm/s
+            self.dump_sync.add(
+                self.spindle_print_time, self.spindle_velocity * 60.0,
+                (self.spindle_velocity + correction) * self.wire_diameter,
+                correction * self.wire_diameter)
+        # Approximate progress at the current MCU time
+        turns, total_corr = self._lookup_spindle_turns(est_print_time)
+        if turns is None:
+            turns = self.spindle_turns
+        turns = max(self.gearing_origin_turns, turns)
+        layer_turns = 2.0 * self.gearing_width / self.wire_diameter
+        self.current_layer = int((turns - self.gearing_origin_turns) / layer_turns)
+        if self.spindle_velocity <= 0.0:
+            self._finish_gearing(toolhead)
+    
+    def _finish_gearing(self, toolhead):
+        """Return the traverse to the toolhead once the spindle has stopped"""
+        end_time = self.spindle_print_time
+        if self.motor_brake:
+            self.motor_brake.set_digital(end_time, 1)
+        # Toolhead moves must not start before the geared motion ends
+        toolhead.dwell(max(0.0, end_time - toolhead.get_last_move_time()))
+        y_pos = toolhead.get_kinematics().clear_gearing()
+        self.gearing_active = False
+        self.is_winding = False
+        self.wind_state = 'idle'
+        if self.gearing_stopping and self.stop_request_time is not None:
+            self.stop_latency = max(0.0, end_time - self.stop_request_time)
+        logging.info("Winder: Geared wind finished - %.1f turns, %d layers, traverse at %.3f mm"
+                     % (self.spindle_turns - self.gearing_origin_turns,
+                        self.current_layer, y_pos))
+    
+    cmd_WINDER_START_help = ("Start winding operation (RPM=100 LAYERS=1"
+                             " [TURNS=] [DWELL=0] [PATTERN=] [SEED=])")
     def cmd_WINDER_START(self, gcmd):
         rpm = gcmd.get_float('RPM', 100.0)
         layers = gcmd.get_int('LAYERS', 1)
+        dwell = gcmd.get_float('DWELL', self.reversal_dwell, minval=0.0)
+        turns = gcmd.get_float('TURNS', None, above=0.0)
+        pattern = gcmd.get('PATTERN', None)
+        if pattern is not None:
+            pattern = pattern.lower()
+            if pattern not in ('none', 'random', 'sine', 'table'):
+                raise gcmd.error("Unknown scatter PATTERN '%s'" % (pattern,))
+        seed = gcmd.get_int('SEED', None, minval=0)
         try:
-            self.start_winding(rpm, layers)
-            gcmd.respond_info("Winding started: %.1f RPM, %d layers" % (rpm, layers))
+            self.start_winding(rpm, layers, dwell, turns, pattern, seed)
+            if turns is not None:
+                gcmd.respond_info("Winding started: %.1f RPM, %.1f turns"
+                                  % (rpm, turns))
+            else:
+                gcmd.respond_info("Winding started: %.1f RPM, %d layers" % (rpm, layers))
         except Exception as e:
             raise gcmd.error("Error: %s" % e)
     
@@ -1241,6 +2653,47 @@ class WinderController:
         self.stop_motor()
         gcmd.respond_info("Winding stopped")
     
+    cmd_WINDER_RESUME_help = ("Rehome and continue the last journaled wind"
+                              " after a shutdown or stop")
+    def cmd_WINDER_RESUME(self, gcmd):
+        if self.journal is None:
+            raise gcmd.error("WINDER_RESUME requires journal_path in [%s]"
+                             % (self.name,))
+        if self.sync_mode != 'velocity':
+            raise gcmd.error("WINDER_RESUME requires sync_mode: velocity")
+        if self.is_busy():
+            raise gcmd.error("Winder is busy")
+        record = winder_journal.read_journal(self.journal.path)
+        if record is None:
+            raise gcmd.error("No journaled wind to resume")
+        spec, progress, end = record
+        if end == winder_journal.END_COMPLETE:
+            raise gcmd.error("The last journaled wind is complete")
+        if (spec['wire_diameter'] != self.wire_diameter
+                or spec['start_position'] != self.start_position
+                or spec['flange_offset'] != self.flange_offset):
+            raise gcmd.error("Wire or bobbin changed since the journaled"
+                             " wind (wire %.4f, start %.3f, flange %.3f)"
+                             % (spec['wire_diameter'], spec['start_position'],
+                                spec['flange_offset']))
+        resume_index = 0
+        resume_turns = None
+        if progress is not None:
+            resume_index = progress['move_index']
+            resume_turns = progress['turns']
+            gcmd.respond_info("Resuming at layer %d, %.1f turns, Y=%.3f"
+                              % (progress['layer'], progress['turns'],
+                                 progress['y']))
+        gcmd.respond_info("Homing traverse")
+        self.printer.lookup_object('gcode').run_script_from_command("G28 Y")
+        try:
+            self.start_winding(spec['rpm'], spec['layers'], spec['dwell'],
+                               spec['turns'], spec['pattern'], spec['seed'],
+                               resume_index=resume_index,
+                               resume_turns=resume_turns)
+        except Exception as e:
+            raise gcmd.error("Error: %s" % e)
+    
     cmd_WINDER_STATUS_help = "Report winder status"
     def cmd_WINDER_STATUS(self, gcmd):
         motor_status = "%.1f RPM" % self.motor_measured_rpm if self.motor_freq_counter else "N/A"
@@ -1277,6 +2730,72 @@ class WinderController:
         self.set_motor_speed(motor_rpm)
         gcmd.respond_info("Motor: %.1f RPM, Spindle: %.1f RPM" % (motor_rpm, spindle_rpm))
     
+    cmd_WINDER_CALIBRATE_PWM_help = "Measure spindle speed over a PWM duty sweep"
+    def cmd_WINDER_CALIBRATE_PWM(self, gcmd):
+        """Learn the RPM -> PWM duty map
+        Steps the motor PWM from MIN_DUTY to MAX_DUTY, waits SETTLE_TIME
+        at each step and measures the mean spindle speed from the
+        estimator over SAMPLE_TIME. The map is stored as pwm_map (motor
+        RPM) by SAVE_CONFIG.
+        """
+        min_duty = gcmd.get_float('MIN_DUTY', 0.05, minval=0.0, below=1.0)
+        max_duty = gcmd.get_float('MAX_DUTY', 1.0, above=min_duty, maxval=1.0)
+        steps = gcmd.get_int('STEPS', 10, minval=2)
+        settle_time = gcmd.get_float('SETTLE_TIME', 1.0, minval=0.1)
+        sample_time = gcmd.get_float('SAMPLE_TIME', 1.0, minval=0.1)
+        if self.is_winding or self.wind_state != 'idle':
+            raise gcmd.error("Stop winding before calibrating the PWM map")
+        if self.motor_pwm is None:
+            raise gcmd.error("Motor PWM pin not configured")
+        self.speed_control_active = False
+        toolhead = self.printer.lookup_object('toolhead')
+        print_time = toolhead.get_last_move_time()
+        if self.motor_dir:
+            self.motor_dir.set_digital(print_time, 0)  # Forward
+        if self.motor_brake:
+            self.motor_brake.set_digital(print_time, 0)  # Brake released
+        points = []
+        try:
+            for i in range(steps):
+                duty = min_duty + (max_duty - min_duty) * i / (steps - 1)
+                self._set_pwm_duty(toolhead.get_last_move_time(), duty)
+                toolhead.dwell(settle_time)
+                toolhead.wait_moves()
+                start_time, start_turns = self.spindle_estimator.get_state()[:2]
+                toolhead.dwell(sample_time)
+                toolhead.wait_moves()
+                end_time, end_turns = self.spindle_estimator.get_state()[:2]
+                spindle_rpm = 0.0
+                if end_time > start_time:
+                    spindle_rpm = (abs(end_turns - start_turns)
+                                   / (end_time - start_time) * 60.0)
+                motor_rpm = spindle_rpm / self.spindle_gear_ratio
+                points.append((duty, motor_rpm))
+                gcmd.respond_info("PWM %.1f%%: spindle %.1f RPM (motor %.1f RPM)"
+                                  % (duty * 100.0, spindle_rpm, motor_rpm))
+        finally:
+            print_time = self._set_pwm_duty(toolhead.get_last_move_time(), 0.0)
+            if self.motor_brake:
+                # Same 300ms spacing as stop_motor()
+                self.motor_brake.set_digital(print_time + 0.3, 1)
+        # Keep the highest duty that did not turn the spindle as the
+        # start of the map
+        moving = [p for p in points if p[1] > 0.0]
+        if not moving:
+            raise gcmd.error("Spindle did not turn during PWM calibration")
+        stalled = [p for p in points if p[0] < moving[0][0]]
+        self.pwm_map.set_points(stalled[-1:] + moving)
+        table = self.pwm_map.get_points()
+        logging.info("Winder: PWM map calibrated: %s" % (table,))
+        configfile = self.printer.lookup_object('configfile')
+        configfile.set(self.name, 'pwm_map',
+                       spindle_speed.format_pwm_map(table))
+        gcmd.respond_info(
+            "PWM map: %d points, %.1f-%.1f motor RPM\n"
+            "The SAVE_CONFIG command will update the printer config file\n"
+            "with this map and restart the printer."
+            % (len(table), table[0][1], table[-1][1]))
+    
     cmd_SET_WIRE_DIAMETER_help = "Set wire diameter (mm)"
     def cmd_SET_WIRE_DIAMETER(self, gcmd):
         diameter = gcmd.get_float('DIAMETER')
@@ -1413,8 +2932,25 @@ class WinderController:
             'spindle_rpm_measured': self.spindle_measured_rpm,
             'gear_ratio': self.spindle_gear_ratio,
             'wire_diameter': self.wire_diameter,
+            'layer_pitch': self._get_layer_pitch(),
+            'scatter_pattern': (self.scatter.pattern
+                                if self.scatter is not None else 'none'),
+            'scatter_seed': (self.scatter.seed
+                             if self.scatter is not None else None),
             'current_layer': self.current_layer,
             'start_position': self.start_position,
+            'sync_mode': self.sync_mode,
+            'spindle_turns': self.spindle_turns - self.gearing_origin_turns,
+            'spindle_turn_error': self.gearing_turn_error,
+            'wind_state': self.wind_state,
+            'stop_latency': self.stop_latency,
+            'reversal_angle': self.reversal_angle,
+            'wind_aborted': self.wind_aborted,
+            'target_turns': self.wind_target_turns,
+            'turn_error': self.turn_error,
+            'stop_lag': self.stop_lag,
+            'pwm_duty': self.pwm_duty,
+            'speed_control': self.speed_control_active,
         }
 
 def load_config(config):
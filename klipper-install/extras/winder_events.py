@@ -0,0 +1,102 @@
+# Rate limited winder event log, formatted by the background log thread
+#
+# Copyright (C) 2024
+#
+# This file may be distributed under the terms of the GNU GPLv3 license.
+import collections, logging
+import queuelogger
+
+# Pending events are handed to the log thread this often, which is also
+# the period of each category's budget
+EVENT_DRAIN_TIME = 1.0
+# Logged events waiting for the next drain (all categories)
+EVENT_PENDING_SIZE = 256
+# Last events of each category kept for the shutdown dump
+EVENT_HISTORY_SIZE = 50
+# Formats in the log thread; only in this repo's klippy/queuelogger.py, so
+# a stock Klipper install formats the drained events on the reactor
+LOG_DEFERRED = getattr(queuelogger, 'log_deferred', None)
+
+class EventCategory:
+    """One kind of event: a format string for its values, the number of
+    events logged per EVENT_DRAIN_TIME (0 = only kept for the shutdown
+    dump) and a ring of its last events"""
+    def __init__(self, name, fmt, budget, history):
+        self.name = name
+        self.fmt = fmt
+        self.budget = budget
+        self.history = collections.deque([], history)
+        self.used = self.dropped = 0
+    def format_event(self, event):
+        eventtime, category, values = event
+        try:
+            msg = self.fmt % values
+        except (TypeError, ValueError):
+            msg = "%s %s" % (self.name, values)
+        return "Winder: %s (t=%.3f)" % (msg, eventtime)
+
+class EventLog:
+    """Typed winder events, cheap enough to record from MCU callbacks
+    record() stores the category and the raw values in bounded deques;
+    nothing is formatted there. Once per EVENT_DRAIN_TIME the reactor
+    hands the pending events to the queuelogger thread, which formats
+    them into one log message (on stock Klipper, the reactor does).
+    Events over a category's budget are only counted in that message,
+    and the history rings are dumped on an MCU shutdown.
+    """
+    def __init__(self, printer):
+        self.printer = printer
+        self.reactor = printer.get_reactor()
+        self.categories = []
+        self.pending = collections.deque([], EVENT_PENDING_SIZE)
+        self.reactor.register_timer(self._drain_events, self.reactor.NOW)
+        printer.register_event_handler("klippy:analyze_shutdown",
+                                       self._handle_analyze_shutdown)
+    def add_category(self, name, fmt, budget=1, history=EVENT_HISTORY_SIZE):
+        category = EventCategory(name, fmt, budget, history)
+        self.categories.append(category)
+        return category
+    def record(self, category, *values):
+        """Record an event (any thread)"""
+        event = (self.reactor.monotonic(), category, values)
+        category.history.append(event)
+        if category.used < category.budget:
+            category.used += 1
+            self.pending.append(event)
+        elif category.budget:
+            category.dropped += 1
+    def _drain_events(self, eventtime):
+        dropped = []
+        for category in self.categories:
+            if category.dropped:
+                dropped.append((category.name, category.dropped))
+            category.used = category.dropped = 0
+        if self.pending or dropped:
+            count = len(self.pending)
+            format_cb = lambda: self._format_pending(count, dropped)
+            if LOG_DEFERRED is not None:
+                LOG_DEFERRED(format_cb)
+            else:
+                logging.info(format_cb())
+        return eventtime + EVENT_DRAIN_TIME
+    def _format_pending(self, count, dropped):
+        # Runs in the log thread (or the reactor); only takes the events
+        # queued before the drain, later ones go to the next message
+        pending = self.pending
+        lines = []
+        for i in range(min(count, len(pending))):
+            event = pending.popleft()
+            lines.append(event[1].format_event(event))
+        if dropped:
+            lines.append("Winder: Events over budget: %s" % (
+                ", ".join(["%s=%d" % d for d in dropped]),))
+        return "\n".join(lines)
+    def _handle_analyze_shutdown(self, msg, details):
+        events = []
+        for category in self.categories:
+            events.extend(category.history)
+        events.sort(key=lambda e: e[0])
+        out = ["Dumping %d winder events" % (len(events),)]
+        for event in events:
+            out.append(event[1].format_event(event))
+        logging.info("\n".join(out))
@@ -0,0 +1,272 @@
+# Production job queue for back-to-back coil runs
+#
+# Copyright (C) 2024
+#
+# This file may be distributed under the terms of the GNU GPLv3 license.
+import collections, logging
+
+# The runner checks the current wind for completion this often
+JOB_POLL_TIME = 0.1
+# Finished jobs kept for get_status and the webhook
+JOB_HISTORY = 20
+SCATTER_PATTERNS = ('none', 'random', 'sine', 'table')
+
+class WinderJobs:
+    """Queue of coils wound back to back
+    Every job runs load_gcode, homes the traverse (home_each_job), winds
+    the coil with WINDER_START semantics and runs unload_gcode. While a
+    coil winds, the next job's winding program is already compiled, so
+    only the load/home gcode separates two coils. A WINDER_STOP during a
+    job stops the queue after that job.
+    """
+    def __init__(self, config):
+        self.printer = config.get_printer()
+        self.reactor = self.printer.get_reactor()
+        gcode_macro = self.printer.load_object(config, 'gcode_macro')
+        self.load_gcode = gcode_macro.load_template(config, 'load_gcode', '')
+        self.unload_gcode = gcode_macro.load_template(config, 'unload_gcode',
+                                                      '')
+        self.home_each_job = config.getboolean('home_each_job', True)
+        self.winder = None
+        # Queued jobs, the running job and finished jobs (dicts, see
+        # _make_job)
+        self.queue = collections.deque()
+        self.current = None
+        self.history = collections.deque(maxlen=JOB_HISTORY)
+        self.next_program = None  # (job, program) compiled ahead
+        self.state = 'idle'  # idle -> running -> (stopping) -> idle
+        self.stop_requested = False
+        self.job_count = 0
+        self.last_end_time = None
+        self.job_timer = self.reactor.register_timer(self._run_jobs)
+        self.printer.register_event_handler("klippy:connect",
+                                            self._handle_connect)
+        self.gcode = self.printer.lookup_object('gcode')
+        self.gcode.register_command('WINDER_JOB_ADD', self.cmd_WINDER_JOB_ADD,
+                                    desc=self.cmd_WINDER_JOB_ADD_help)
+        self.gcode.register_command('WINDER_JOBS_START',
+                                    self.cmd_WINDER_JOBS_START,
+                                    desc=self.cmd_WINDER_JOBS_START_help)
+        self.gcode.register_command('WINDER_JOBS_STOP',
+                                    self.cmd_WINDER_JOBS_STOP,
+                                    desc=self.cmd_WINDER_JOBS_STOP_help)
+        self.gcode.register_command('WINDER_JOBS_CLEAR',
+                                    self.cmd_WINDER_JOBS_CLEAR,
+                                    desc=self.cmd_WINDER_JOBS_CLEAR_help)
+        webhooks = self.printer.lookup_object('webhooks')
+        webhooks.register_endpoint("winder_jobs/add", self._handle_add)
+        webhooks.register_endpoint("winder_jobs/status", self._handle_status)
+    def _handle_connect(self):
+        self.winder = self.printer.lookup_object('winder')
+    # Job specs
+    def _make_job(self, rpm, layers=1, turns=None, dwell=None, pattern=None,
+                  seed=None, name=None):
+        error = self.printer.command_error
+        if rpm <= 0.:
+            raise error("Invalid job RPM %.1f" % (rpm,))
+        if layers < 1:
+            raise error("Invalid job LAYERS %d" % (layers,))
+        if turns is not None and turns <= 0.:
+            raise error("Invalid job TURNS %.1f" % (turns,))
+        if dwell is not None and dwell < 0.:
+            raise error("Invalid job DWELL %.3f" % (dwell,))
+        if pattern is not None:
+            pattern = pattern.lower()
+            if pattern not in SCATTER_PATTERNS:
+                raise error("Unknown scatter PATTERN '%s'" % (pattern,))
+        if seed is not None and seed < 0:
+            raise error("Invalid job SEED %d" % (seed,))
+        self.job_count += 1
+        if name is None:
+            name = "coil%d" % (self.job_count,)
+        return {'id': self.job_count, 'name': name, 'rpm': rpm,
+                'layers': layers, 'turns': turns, 'dwell': dwell,
+                'pattern': pattern, 'seed': seed, 'state': 'queued',
+                'queued_time': self.reactor.monotonic(), 'start_time': None,
+                'wind_start_time': None, 'end_time': None, 'idle_time': None,
+                'wind_time': None, 'turn_error': None, 'error': None}
+    def _parse_web_job(self, spec):
+        error = self.printer.command_error
+        if type(spec) != dict:
+            raise error("Invalid job spec %s" % (spec,))
+        def get(key, types, default=None):
+            value = spec.get(key, default)
+            if value is not default and type(value) not in types:
+                raise error("Invalid job argument [%s]" % (key,))
+            return value
+        return self._make_job(
+            float(get('rpm', (int, float), 100.)),
+            get('layers', (int,), 1), get('turns', (int, float)),
+            get('dwell', (int, float)), get('pattern', (str,)),
+            get('seed', (int,)), get('name', (str,)))
+    def add_jobs(self, jobs, count=1):
+        for i in range(count):
+            for job in jobs:
+                if i:
+                    job = self._make_job(
+                        job['rpm'], job['layers'], job['turns'], job['dwell'],
+                        job['pattern'], job['seed'],
+                        "%s.%d" % (job['name'], i + 1))
+                self.queue.append(job)
+        if self.state == 'running' and self.next_program is None:
+            self._compile_next()
+    # Job runner
+    def start(self):
+        if self.winder is None:
+            raise self.printer.command_error("No [winder] configured")
+        if self.state != 'idle':
+            self.stop_requested = False
+            return
+        if not self.queue:
+            raise self.printer.command_error("Job queue is empty")
+        self.state = 'running'
+        self.stop_requested = False
+        self.reactor.update_timer(self.job_timer, self.reactor.NOW)
+    def _compile_next(self):
+        # Compile the next queued coil (velocity mode) while this one winds
+        self.next_program = None
+        if not self.queue or self.winder.sync_mode != 'velocity':
+            return
+        job = self.queue[0]
+        try:
+            program = self.winder.compile_program(
+                job['rpm'], job['layers'], job['dwell'], job['turns'],
+                job['pattern'], job['seed'])
+        except ValueError as e:
+            # Reported when the job starts
+            logging.info("Winder jobs: Cannot compile '%s': %s"
+                         % (job['name'], e))
+            return
+        if program.scatter is not None:
+            # Record the drawn seed, so the job is reproducible
+            job['seed'] = program.scatter.seed
+        self.next_program = (job, program)
+    def _start_job(self, eventtime):
+        job = self.queue.popleft()
+        program = None
+        if self.next_program is not None and self.next_program[0] is job:
+            program = self.next_program[1]
+        self.next_program = None
+        self.current = job
+        job['state'] = 'running'
+        job['start_time'] = eventtime
+        if self.last_end_time is not None:
+            job['idle_time'] = eventtime - self.last_end_time
+        context = self.load_gcode.create_template_context()
+        context['job'] = dict(job)
+        self.gcode.run_script(self.load_gcode.render(context))
+        if self.home_each_job:
+            self.gcode.run_script("G28 Y")
+        job['wind_start_time'] = self.reactor.monotonic()
+        self.winder.start_winding(job['rpm'], job['layers'], job['dwell'],
+                                  job['turns'], job['pattern'], job['seed'],
+                                  program)
+        if self.winder.scatter is not None:
+            job['seed'] = self.winder.scatter.seed
+        logging.info("Winder jobs: Started '%s' (%d queued)"
+                     % (job['name'], len(self.queue)))
+        self._compile_next()
+    def _finish_job(self, eventtime, error=None):
+        job = self.current
+        self.current = None
+        job['end_time'] = self.last_end_time = eventtime
+        if job['wind_start_time'] is not None:
+            job['wind_time'] = eventtime - job['wind_start_time']
+        if error is not None:
+            job['state'] = 'error'
+            job['error'] = str(error)
+        elif self.winder.wind_aborted:
+            job['state'] = 'stopped'
+        else:
+            job['state'] = 'done'
+            job['turn_error'] = self.winder.turn_error
+        self.history.append(job)
+        logging.info("Winder jobs: '%s' %s (wind %.1fs, idle before %s)"
+                     % (job['name'], job['state'], job['wind_time'] or 0.,
+                        "%.2fs" % (job['idle_time'],)
+                        if job['idle_time'] is not None else "-"))
+        if job['state'] != 'done':
+            self.stop_requested = True
+            self.gcode.respond_info("Winder jobs: '%s' %s, queue stopped"
+                                    % (job['name'], job['state']))
+            return
+        context = self.unload_gcode.create_template_context()
+        context['job'] = dict(job)
+        self.gcode.run_script(self.unload_gcode.render(context))
+    def _run_jobs(self, eventtime):
+        if self.current is not None:
+            if self.winder.is_busy():
+                return eventtime + JOB_POLL_TIME
+            try:
+                self._finish_job(eventtime)
+            except self.printer.command_error as e:
+                self.stop_requested = True
+                self.gcode.respond_info("Winder jobs: unload failed: %s"
+                                        % (e,))
+        if self.stop_requested or not self.queue:
+            self.state = 'idle'
+            self.stop_requested = False
+            self.next_program = None
+            return self.reactor.NEVER
+        try:
+            self._start_job(eventtime)
+        except Exception as e:
+            if self.winder.is_busy():
+                self.winder.stop_motor()
+            self._finish_job(self.reactor.monotonic(), e)
+            self.state = 'idle'
+            self.stop_requested = False
+            return self.reactor.NEVER
+        return self.reactor.monotonic() + JOB_POLL_TIME
+    # Commands and status
+    cmd_WINDER_JOB_ADD_help = ("Queue a coil (RPM= [LAYERS=1] [TURNS=]"
+                               " [DWELL=] [PATTERN=] [SEED=] [NAME=]"
+                               " [COUNT=1])")
+    def cmd_WINDER_JOB_ADD(self, gcmd):
+        job = self._make_job(
+            gcmd.get_float('RPM', above=0.), gcmd.get_int('LAYERS', 1),
+            gcmd.get_float('TURNS', None), gcmd.get_float('DWELL', None),
+            gcmd.get('PATTERN', None), gcmd.get_int('SEED', None),
+            gcmd.get('NAME', None))
+        self.add_jobs([job], gcmd.get_int('COUNT', 1, minval=1))
+        gcmd.respond_info("Winder jobs: %d queued" % (len(self.queue),))
+    cmd_WINDER_JOBS_START_help = "Wind the queued coils back to back"
+    def cmd_WINDER_JOBS_START(self, gcmd):
+        self.start()
+    cmd_WINDER_JOBS_STOP_help = "Stop the job queue after the current coil"
+    def cmd_WINDER_JOBS_STOP(self, gcmd):
+        if self.state == 'running':
+            self.stop_requested = True
+            gcmd.respond_info("Winder jobs: stopping after the current coil")
+    cmd_WINDER_JOBS_CLEAR_help = "Remove all queued (not running) coils"
+    def cmd_WINDER_JOBS_CLEAR(self, gcmd):
+        self.queue.clear()
+        self.next_program = None
+    def _handle_add(self, web_request):
+        jobs = web_request.get('jobs')
+        if type(jobs) != list:
+            raise self.printer.command_error("Invalid Argument [jobs]")
+        count = web_request.get_int('count', 1)
+        if count < 1:
+            raise self.printer.command_error("Invalid Argument [count]")
+        self.add_jobs([self._parse_web_job(spec) for spec in jobs], count)
+        if web_request.get('start', False):
+            self.start()
+        web_request.send(self.get_status(self.reactor.monotonic()))
+    def _handle_status(self, web_request):
+        web_request.send(self.get_status(self.reactor.monotonic()))
+    def get_status(self, eventtime):
+        current = None
+        if self.current is not None:
+            current = dict(self.current)
+            current['elapsed'] = eventtime - current['start_time']
+        return {
+            'state': 'stopping' if self.stop_requested else self.state,
+            'current': current,
+            'queued': [dict(job) for job in self.queue],
+            'finished': [dict(job) for job in self.history],
+            'next_compiled': self.next_program is not None,
+        }
+
+def load_config(config):
+    return WinderJobs(config)
@@ -0,0 +1,147 @@
+# Crash-safe wind journal: append-only progress records for WINDER_RESUME
+#
+# Copyright (C) 2024
+#
+# This file may be distributed under the terms of the GNU GPLv3 license.
+import logging, math, os, queue, struct, threading, zlib
+
+# Every record is a type byte, a fixed payload and the CRC32 of both, so a
+# record torn by a power loss is detected and ignored on reading.
+#   'S' wind start: rpm, reversal dwell, layers, turns (NaN = full
+#       layers), wire diameter, scatter pattern, scatter seed (-1 = none),
+#       start position, flange offset
+#   'P' progress: print time, next program move, pass, layer, traverse
+#       position and coil turns at the end of the last completed move (or,
+#       at an MCU shutdown, part way into that next move)
+#   'E' wind end: 0 = complete, 1 = stopped
+JOURNAL_START = struct.Struct('<ddIdd8sqdd')
+JOURNAL_PROGRESS = struct.Struct('<dIIIdd')
+JOURNAL_END = struct.Struct('<B')
+JOURNAL_CRC = struct.Struct('<I')
+JOURNAL_TYPES = {b'S': JOURNAL_START, b'P': JOURNAL_PROGRESS,
+                 b'E': JOURNAL_END}
+END_COMPLETE = 0
+END_STOPPED = 1
+
+def _pack(rtype, fmt, *values):
+    data = rtype + fmt.pack(*values)
+    return data + JOURNAL_CRC.pack(zlib.crc32(data) & 0xffffffff)
+
+def _scan(data):
+    """Yield (type, values, end offset) of every intact record"""
+    pos = 0
+    while pos < len(data):
+        rtype = data[pos:pos+1]
+        fmt = JOURNAL_TYPES.get(rtype)
+        if fmt is None:
+            return
+        rec_end = pos + 1 + fmt.size
+        if rec_end + JOURNAL_CRC.size > len(data):
+            return
+        crc = JOURNAL_CRC.unpack_from(data, rec_end)[0]
+        if zlib.crc32(data[pos:rec_end]) & 0xffffffff != crc:
+            # Torn tail
+            return
+        pos = rec_end + JOURNAL_CRC.size
+        yield rtype, fmt.unpack_from(data, rec_end - fmt.size), pos
+
+class WindJournal:
+    """Append-only binary journal written by a background thread
+    The reactor only packs records and queues them. The writer thread
+    appends, flushes and fsyncs, so a slow SD card never stalls the
+    reactor. A new wind truncates the file; a resumed wind appends to it,
+    after cutting off a record torn by the power loss.
+    """
+    def __init__(self, path):
+        self.path = os.path.expanduser(path)
+        self.bg_queue = queue.Queue()
+        self.bg_thread = threading.Thread(target=self._bg_thread)
+        self.bg_thread.daemon = True
+        self.bg_thread.start()
+    def _bg_thread(self):
+        fd = None
+        while 1:
+            item = self.bg_queue.get(True)
+            if item is None:
+                break
+            truncate, data = item
+            try:
+                if truncate and fd is not None:
+                    fd.close()
+                    fd = None
+                if fd is None and truncate:
+                    fd = open(self.path, 'wb')
+                elif fd is None:
+                    fd = open(self.path, 'a+b')
+                    fd.seek(0)
+                    end = 0
+                    for rtype, values, end in _scan(fd.read()):
+                        pass
+                    fd.truncate(end)
+                fd.write(data)
+                fd.flush()
+                os.fsync(fd.fileno())
+            except (IOError, OSError):
+                logging.exception("Winder: Journal write error")
+                if fd is not None:
+                    try:
+                        fd.close()
+                    except (IOError, OSError):
+                        pass
+                # Reopened (and any torn record cut off) on the next write
+                fd = None
+        if fd is not None:
+            fd.close()
+    def stop(self):
+        # Write out the queued records (klippy:disconnect)
+        self.bg_queue.put_nowait(None)
+        self.bg_thread.join()
+    def log_start(self, spec, resume=False):
+        turns = spec['turns']
+        if turns is None:
+            turns = float('nan')
+        seed = spec['seed']
+        if seed is None:
+            seed = -1
+        data = _pack(b'S', JOURNAL_START, spec['rpm'], spec['dwell'],
+                     spec['layers'], turns, spec['wire_diameter'],
+                     spec['pattern'].encode(), seed, spec['start_position'],
+                     spec['flange_offset'])
+        self.bg_queue.put_nowait((not resume, data))
+    def log_progress(self, print_time, move_index, pass_index, layer, y,
+                     turns):
+        self.bg_queue.put_nowait((False, _pack(
+            b'P', JOURNAL_PROGRESS, print_time, move_index, pass_index,
+            layer, y, turns)))
+    def log_end(self, reason):
+        self.bg_queue.put_nowait((False, _pack(b'E', JOURNAL_END, reason)))
+
+def read_journal(path):
+    """Return (spec, last progress, end reason) of the last journaled
+    wind, or None without a readable start record"""
+    try:
+        with open(os.path.expanduser(path), 'rb') as f:
+            data = f.read()
+    except (IOError, OSError):
+        return None
+    spec = progress = end = None
+    for rtype, values, pos in _scan(data):
+        if rtype == b'S':
+            (rpm, dwell, layers, turns, wire_diameter, pattern, seed,
+             start_position, flange_offset) = values
+            spec = {'rpm': rpm, 'dwell': dwell, 'layers': layers,
+                    'turns': None if math.isnan(turns) else turns,
+                    'wire_diameter': wire_diameter,
+                    'pattern': pattern.rstrip(b'\0').decode(),
+                    'seed': None if seed < 0 else seed,
+                    'start_position': start_position,
+                    'flange_offset': flange_offset}
+            progress = end = None
+        elif rtype == b'P':
+            progress = dict(zip(('print_time', 'move_index', 'pass',
+                                 'layer', 'y', 'turns'), values))
+        else:
+            end = values[0]
+    if spec is None:
+        return None
+    return spec, progress, end
@@ -0,0 +1,107 @@
+# Per-coil quality record: per-turn columns written to a compact file
+#
+# Copyright (C) 2024
+#
+# This file may be distributed under the terms of the GNU GPLv3 license.
+import array, json, logging, os, queue, struct, sys, threading, time
+
+# File layout (little endian): header, column table, JSON metadata, then
+# every column as one contiguous array, in table order
+QUALITY_MAGIC = b'WQR1'
+QUALITY_HEADER = struct.Struct('<4sIHI')  # magic, rows, columns, meta size
+QUALITY_COLUMN = struct.Struct('<16sc')  # name, array typecode
+# Recorded per turn
+QUALITY_COLUMNS = (('turn', 'I'), ('time', 'd'), ('y', 'f'),
+                   ('period', 'f'), ('pitch_error', 'f'), ('pass', 'H'))
+
+class QualityRecorder:
+    """Collects one coil's per-turn columns and writes them in bulk
+    Rows are appended to typed arrays on the reactor (a few bytes per
+    turn); at the end of the coil the arrays are handed to a background
+    thread that writes the file.
+    """
+    def __init__(self, directory):
+        self.directory = os.path.expanduser(directory)
+        self.columns = None
+        self.meta = None
+        self.bg_queue = queue.Queue()
+        self.bg_thread = threading.Thread(target=self._bg_thread)
+        self.bg_thread.daemon = True
+        self.bg_thread.start()
+    def _bg_thread(self):
+        while 1:
+            item = self.bg_queue.get(True)
+            if item is None:
+                break
+            path, meta, columns = item
+            try:
+                if not os.path.isdir(self.directory):
+                    os.makedirs(self.directory)
+                write_quality(path, meta, columns)
+            except (IOError, OSError):
+                logging.exception("Winder: Quality record write error")
+    def stop(self):
+        # Write out the queued records (klippy:disconnect)
+        self.bg_queue.put_nowait(None)
+        self.bg_thread.join()
+    def start(self, meta):
+        self.meta = dict(meta)
+        self.meta['start'] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.columns = [array.array(typecode, [])
+                        for name, typecode in QUALITY_COLUMNS]
+    def is_active(self):
+        return self.columns is not None
+    def add_turn(self, *row):
+        for col, value in zip(self.columns, row):
+            col.append(value)
+    def finish(self, **meta):
+        if self.columns is None:
+            return None
+        columns, self.columns = self.columns, None
+        self.meta.update(meta)
+        path = os.path.join(self.directory, "coil-%s.wqr" % (
+            time.strftime("%Y%m%d-%H%M%S"),))
+        self.bg_queue.put_nowait((path, self.meta, columns))
+        return path
+
+def write_quality(path, meta, columns):
+    meta_data = json.dumps(meta, sort_keys=True).encode()
+    rows = len(columns[0]) if columns else 0
+    with open(path + '.tmp', 'wb') as f:
+        f.write(QUALITY_HEADER.pack(QUALITY_MAGIC, rows, len(columns),
+                                    len(meta_data)))
+        for (name, typecode), col in zip(QUALITY_COLUMNS, columns):
+            f.write(QUALITY_COLUMN.pack(name.encode(), typecode.encode()))
+        f.write(meta_data)
+        for col in columns:
+            if sys.byteorder != 'little':
+                col = array.array(col.typecode, col)
+                col.byteswap()
+            f.write(col.tobytes())
+    os.rename(path + '.tmp', path)
+
+def read_quality(path):
+    """Return (metadata, {column name: array}) of a quality record"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, rows, count, meta_size = QUALITY_HEADER.unpack_from(data, 0)
+    if magic != QUALITY_MAGIC:
+        raise ValueError("%s is not a winder quality record" % (path,))
+    pos = QUALITY_HEADER.size
+    table = []
+    for i in range(count):
+        name, typecode = QUALITY_COLUMN.unpack_from(data, pos)
+        table.append((name.rstrip(b'\0').decode(), typecode.decode()))
+        pos += QUALITY_COLUMN.size
+    meta = json.loads(data[pos:pos+meta_size].decode())
+    pos += meta_size
+    columns = {}
+    for name, typecode in table:
+        col = array.array(typecode)
+        size = rows * col.itemsize
+        col.frombytes(data[pos:pos+size])
+        if sys.byteorder != 'little':
+            col.byteswap()
+        columns[name] = col
+        pos += size
+    return meta, columns
@@ -0,0 +1,508 @@
+# Hardware-free winder plant: simulated BLDC spindle, Hall sensors and
+# ratiometric angle sensor
+#
+# Copyright (C) 2024
+#
+# This file may be distributed under the terms of the GNU GPLv3 license.
+import logging, math, random, struct, time
+import pins
+
+# The plant is integrated in steps of SIM_STEP_TIME of print time, caught
+# up to the MCU clock every SIM_TIMER_TIME
+SIM_STEP_TIME = 0.0005
+SIM_TIMER_TIME = 0.01
+# Captured Hall edges per sensor_bulk_data message (4 bytes per edge)
+EDGES_PER_MESSAGE = 12
+# Traverse travel per true spindle turn below this is a reversal dwell
+PITCH_MIN_TRAVEL = 0.000001
+# WINDER_SIM_WAIT checks for the end of the wind this often
+SIM_WAIT_TIME = 0.1
+
+class WinderSim:
+    """Simulated winder spindle registered as the 'winder_sim' pin chip
+    Point the [winder] pins at it (motor_pwm_pin: winder_sim:motor_pwm,
+    spindle_hall_pin: winder_sim:spindle_hall, ...) and the winder runs
+    unchanged against the model: PWM, direction and brake commands are
+    applied at their print times, and the Hall counters and angle ADC
+    report like MCU sensors on the main MCU clock. Counters are configured
+    from the config_counter/query_counter commands MCU_counter sends, so
+    the usual pulse_counter code (and MCU_counter_edges) reads them.
+    """
+    def __init__(self, config):
+        self.printer = config.get_printer()
+        self.reactor = self.printer.get_reactor()
+        self.name = config.get_name()
+        # BLDC and spindle: motor speed at full duty, first order response
+        # (inertia) with current limited acceleration, speed lost to the
+        # load, speed ripple once per spindle turn, and the brake
+        self.motor_max_rpm = config.getfloat('motor_max_rpm', 3000.0,
+                                             above=0.0)
+        self.gear_ratio = config.getfloat('gear_ratio', 0.667, above=0.0)
+        self.time_constant = config.getfloat('time_constant', 0.2,
+                                             above=0.0)
+        self.max_accel = config.getfloat('max_accel', 3000.0,
+                                         above=0.0) / 60.0
+        self.load_droop = config.getfloat('load_droop', 0.05, minval=0.0,
+                                          below=1.0)
+        self.speed_ripple = config.getfloat('speed_ripple', 0.005,
+                                            minval=0.0, below=1.0)
+        self.brake_decel = config.getfloat('brake_decel', 6000.0,
+                                           above=0.0) / 60.0
+        # Hall sensors: pulses per revolution, pulse width (fraction of a
+        # pulse period, Hall pulses are not 50% duty) and edge time noise
+        self.spindle_hall_ppr = config.getint('spindle_hall_ppr', 1,
+                                              minval=1)
+        self.motor_hall_ppr = config.getint('motor_hall_ppr', 8, minval=1)
+        self.hall_duty = config.getfloat('hall_duty', 0.3, above=0.0,
+                                         below=1.0)
+        self.hall_jitter = config.getfloat('hall_jitter', 0.00002,
+                                           minval=0.0)
+        # Angle sensor: the output rises from 0 to full scale over the turn
+        # and saturates for the last angle_gap of it; noise is a fraction
+        # of full scale, angle_offset the sensor zero after the Hall edge
+        self.angle_gap = config.getfloat('angle_gap', 0.08, minval=0.0,
+                                         below=1.0)
+        self.angle_noise = config.getfloat('angle_noise', 0.002, minval=0.0)
+        self.angle_offset = config.getfloat('angle_offset', 0.0)
+        self.adc_max = float((1 << config.getint('adc_bits', 12, minval=1))
+                             - 1)
+        self.random = random.Random(config.getint('seed', 0, minval=0))
+        # Plant state and queued pin changes (print_time, attribute, value)
+        self.sim_time = None
+        self.turns = self.rps = 0.0
+        self.duty = 0.0
+        self.reverse = self.brake = False
+        self.pin_queue = []
+        self.mcu = self.printer.lookup_object('mcu')
+        # A batch run (-o) reports a print time of 0 for ever, which would
+        # stop the plant and the winder's lookahead; there the simulated
+        # MCU clock follows the reactor clock instead (_handle_connect)
+        self.clock_start = self.reactor.monotonic()
+        if self.mcu.is_fileoutput():
+            self.mcu.estimated_print_time = self._batch_print_time
+            self.printer.register_event_handler("klippy:connect",
+                                                self._handle_connect)
+        self.oid_count = 0
+        self.config_callbacks = []
+        self.responses = {}
+        self.counters = {}
+        self.adcs = []
+        # Benchmark: true turn crossings, traverse pitch per pass and host
+        # CPU time (less the simulator's own)
+        self.motion_report = None
+        self.reset_stats()
+        ppins = self.printer.lookup_object('pins')
+        ppins.register_chip('winder_sim', self)
+        self.sim_timer = self.reactor.register_timer(self._sim_event)
+        self.printer.register_event_handler("klippy:mcu_identify",
+                                            self._handle_mcu_identify)
+        self.printer.register_event_handler("klippy:ready",
+                                            self._handle_ready)
+        gcode = self.printer.lookup_object('gcode')
+        gcode.register_command('WINDER_SIM_STATS', self.cmd_WINDER_SIM_STATS,
+                               desc=self.cmd_WINDER_SIM_STATS_help)
+        gcode.register_command('WINDER_SIM_WAIT', self.cmd_WINDER_SIM_WAIT,
+                               desc=self.cmd_WINDER_SIM_WAIT_help)
+    # Pin chip
+    def setup_pin(self, pin_type, pin_params):
+        pin = pin_params['pin']
+        if pin_type == 'pwm' and pin == 'motor_pwm':
+            return SimPWM(self, pin_params)
+        if pin_type == 'digital_out' and pin in ('motor_dir', 'motor_brake'):
+            return SimDigitalOut(self, pin_params)
+        if pin_type == 'adc' and pin == 'angle':
+            adc = SimADC(self)
+            self.adcs.append(adc)
+            return adc
+        raise pins.error("winder_sim has no %s pin '%s'" % (pin_type, pin))
+    # MCU interface used by MCU_counter and MCU_counter_edges
+    def create_oid(self):
+        self.oid_count += 1
+        return self.oid_count - 1
+    def register_config_callback(self, cb):
+        self.config_callbacks.append(cb)
+    def add_config_cmd(self, cmd, is_init=False, on_restart=False):
+        parts = cmd.split()
+        args = dict(p.split('=', 1) for p in parts[1:])
+        if parts[0] == 'config_counter':
+            if args['pin'] not in ('spindle_hall', 'motor_hall'):
+                raise pins.error("winder_sim has no counter pin '%s'"
+                                 % (args['pin'],))
+            oid = int(args['oid'])
+            self.counters[oid] = SimCounter(self, oid, args['pin'])
+        elif parts[0] == 'query_counter':
+            counter = self.counters[int(args['oid'])]
+            freq = float(self.mcu.seconds_to_clock(1.0))
+            counter.setup(int(args['poll_ticks']) / freq,
+                          int(args['sample_ticks']) / freq)
+        elif parts[0] == 'config_counter_edges':
+            counter = self.counters[int(args['counter_oid'])]
+            counter.edge_oid = int(args['oid'])
+        elif parts[0] != 'query_counter_edges':
+            raise self.printer.config_error(
+                "winder_sim does not simulate '%s'" % (parts[0],))
+    def get_query_slot(self, oid):
+        return 0
+    def seconds_to_clock(self, time):
+        return self.mcu.seconds_to_clock(time)
+    def register_response(self, cb, msg, oid=None):
+        self.responses[(msg, oid)] = cb
+    def clock32_to_clock64(self, clock32):
+        return self.mcu.clock32_to_clock64(clock32)
+    def clock_to_print_time(self, clock):
+        return self.mcu.clock_to_print_time(clock)
+    def print_time_to_clock(self, print_time):
+        return self.mcu.print_time_to_clock(print_time)
+    def estimated_print_time(self, eventtime):
+        return self.mcu.estimated_print_time(eventtime)
+    def _batch_print_time(self, eventtime):
+        return eventtime - self.clock_start
+    def _handle_connect(self):
+        # Batch mode also generates the steps of every queued move at once,
+        # so the lookahead runs out (and restarts late) after each move;
+        # queue against the reactor clock like with a real MCU instead
+        toolhead = self.printer.lookup_object('toolhead')
+        toolhead.can_pause = True
+        motion_queuing = self.printer.lookup_object('motion_queuing')
+        motion_queuing.can_pause = True
+        self.reactor.unregister_timer(motion_queuing.flush_timer)
+        motion_queuing.flush_timer = self.reactor.register_timer(
+            motion_queuing._flush_handler, self.reactor.NOW)
+    def get_printer(self):
+        return self.printer
+    def get_name(self):
+        return 'winder_sim'
+    def _handle_mcu_identify(self):
+        for cb in self.config_callbacks:
+            cb()
+    def _handle_ready(self):
+        self.motion_report = self.printer.lookup_object('motion_report')
+        self.sim_time = self.mcu.estimated_print_time(self.reactor.monotonic())
+        for sensor in self._sensors():
+            sensor.start(self.sim_time)
+        self.reactor.update_timer(self.sim_timer, self.reactor.NOW)
+        logging.info("Winder sim: %d counters, %d ADC pins simulated"
+                     % (len(self.counters), len(self.adcs)))
+    def _sensors(self):
+        return list(self.counters.values()) + self.adcs
+    def queue_pin(self, print_time, name, value):
+        self.pin_queue.append((print_time, name, value))
+        self.pin_queue.sort(key=lambda p: p[0])
+    # Plant model
+    def get_angle_value(self, turns):
+        frac = (turns - self.angle_offset) % 1.0
+        value = min(1.0, frac / (1.0 - self.angle_gap))
+        value += self.random.gauss(0.0, self.angle_noise)
+        value = min(1.0, max(0.0, value))
+        return round(value * self.adc_max) / self.adc_max
+    def _step_plant(self, dt):
+        rps = self.rps
+        if self.brake:
+            step = self.brake_decel * dt
+            rps = 0.0 if abs(rps) <= step else rps - math.copysign(step, rps)
+        else:
+            target = (self.duty * self.motor_max_rpm / 60.0 * self.gear_ratio
+                      * (1.0 - self.load_droop))
+            target *= 1.0 + self.speed_ripple * math.sin(
+                2.0 * math.pi * self.turns)
+            if self.reverse:
+                target = -target
+            accel = (target - rps) / self.time_constant
+            accel = min(self.max_accel, max(-self.max_accel, accel))
+            rps += accel * dt
+        self.turns += .5 * (self.rps + rps) * dt
+        self.rps = rps
+    def _advance(self, end_time):
+        sensors = self._sensors()
+        pin_queue = self.pin_queue
+        while self.sim_time + SIM_STEP_TIME <= end_time:
+            while pin_queue and pin_queue[0][0] <= self.sim_time:
+                print_time, name, value = pin_queue.pop(0)
+                setattr(self, name, value)
+            start_time, start_turns = self.sim_time, self.turns
+            self._step_plant(SIM_STEP_TIME)
+            self.sim_time += SIM_STEP_TIME
+            if math.floor(self.turns) > math.floor(start_turns):
+                turn = math.floor(self.turns)
+                self.turn_times.append(
+                    start_time + SIM_STEP_TIME * (turn - start_turns)
+                    / (self.turns - start_turns))
+            for sensor in sensors:
+                sensor.step(start_time, start_turns, self.sim_time, self.turns)
+    def _sim_event(self, eventtime):
+        cpu_start = time.process_time()
+        self._advance(self.mcu.estimated_print_time(eventtime))
+        self._update_pitch()
+        self.sim_cpu += time.process_time() - cpu_start
+        return eventtime + SIM_TIMER_TIME
+    def send_response(self, msg, oid, params):
+        cb = self.responses.get((msg, oid))
+        if cb is not None:
+            cb(params)
+    # Benchmark
+    def reset_stats(self):
+        self.turn_times = []
+        self.stats_turns = 0
+        self.last_turn_y = None
+        self.last_travel = 0.0
+        self.pass_n = 0
+        self.pass_sum = self.pass_sumsq = 0.0
+        self.pitch_n = 0
+        self.pitch_sum = self.pitch_dev_sq = 0.0
+        self.sim_cpu = 0.0
+        self.cpu_start = time.process_time()
+    def _end_pass(self):
+        # Pitch jitter is measured against the mean pitch of each pass, so
+        # bobbin build-up and scatter patterns do not count as error
+        n = self.pass_n
+        if n:
+            mean = self.pass_sum / n
+            self.pitch_n += n
+            self.pitch_sum += self.pass_sum
+            self.pitch_dev_sq += max(0.0, self.pass_sumsq - n * mean * mean)
+        self.pass_n = 0
+        self.pass_sum = self.pass_sumsq = 0.0
+    def _update_pitch(self):
+        turn_times = self.turn_times
+        self.turn_times = []
+        dtrapq = self.motion_report.dtrapqs.get('toolhead')
+        if dtrapq is None:
+            return
+        for turn_time in turn_times:
+            self.stats_turns += 1
+            pos, velocity = dtrapq.get_trapq_position(turn_time)
+            if pos is None:
+                self.last_turn_y = None
+                continue
+            y = pos[1]
+            if self.last_turn_y is not None:
+                travel = y - self.last_turn_y
+                if (abs(travel) < PITCH_MIN_TRAVEL
+                        or travel * self.last_travel < 0.0):
+                    # Reversal or dwell - the turn spans two passes
+                    self._end_pass()
+                else:
+                    self.pass_n += 1
+                    self.pass_sum += abs(travel)
+                    self.pass_sumsq += travel * travel
+                self.last_travel = travel
+            self.last_turn_y = y
+    def get_stats(self):
+        n = self.pitch_n + self.pass_n
+        pitch_sum = self.pitch_sum + self.pass_sum
+        dev_sq = self.pitch_dev_sq
+        if self.pass_n:
+            mean = self.pass_sum / self.pass_n
+            dev_sq += max(0.0, self.pass_sumsq - self.pass_n * mean * mean)
+        cpu = time.process_time() - self.cpu_start - self.sim_cpu
+        return {
+            'turns': self.stats_turns,
+            'pitch_turns': n,
+            'pitch_mean': pitch_sum / n if n else 0.0,
+            'pitch_rms': math.sqrt(dev_sq / n) if n else 0.0,
+            'host_cpu': cpu,
+            'sim_cpu': self.sim_cpu,
+            'cpu_per_turn': cpu / self.stats_turns if self.stats_turns
+            else 0.0,
+        }
+    cmd_WINDER_SIM_STATS_help = ("Report simulated winder sync accuracy and"
+                                 " host CPU per turn (RESET=1 restarts)")
+    def cmd_WINDER_SIM_STATS(self, gcmd):
+        stats = self.get_stats()
+        gcmd.respond_info(
+            "Winder sim: %d turns, pitch %.5f mm, jitter %.2f um rms"
+            " (%d turns), host CPU %.3fs = %.3f ms/turn (sim %.3fs)"
+            % (stats['turns'], stats['pitch_mean'], stats['pitch_rms'] * 1000.,
+               stats['pitch_turns'], stats['host_cpu'],
+               stats['cpu_per_turn'] * 1000., stats['sim_cpu']))
+        if gcmd.get_int('RESET', 0):
+            self.reset_stats()
+    cmd_WINDER_SIM_WAIT_help = ("Wait until the wind has ended and the"
+                                " spindle stopped (also as measured)")
+    def cmd_WINDER_SIM_WAIT(self, gcmd):
+        # Blocks the g-code input (not the reactor), so a batch run (-i)
+        # does not reach the end of its input while the coil winds
+        timeout = gcmd.get_float('TIMEOUT', 60., above=0.)
+        winder = self.printer.lookup_object('winder')
+        eventtime = self.reactor.monotonic()
+        end_time = eventtime + timeout
+        # The estimate settles on noise, or coasts for up to STALE_TIME
+        # when the spindle stops where the angle sensor saturates
+        estimator = winder.spindle_estimator
+        while (winder.is_winding or winder.wind_state != 'idle' or self.rps
+               or estimator.get_rpm() >= winder.min_spindle_rpm):
+            if self.printer.is_shutdown():
+                raise gcmd.error("Winder sim: shutdown while winding")
+            if eventtime > end_time:
+                raise gcmd.error("Winder sim: wind still running after %.1fs"
+                                 % (timeout,))
+            eventtime = self.reactor.pause(eventtime + SIM_WAIT_TIME)
+    def get_status(self, eventtime):
+        status = self.get_stats()
+        status.update({'rpm': self.rps * 60.0, 'spindle_turns': self.turns,
+                       'duty': self.duty, 'brake': self.brake,
+                       'reverse': self.reverse})
+        return status
+
+class SimPWM:
+    def __init__(self, sim, pin_params):
+        self._sim = sim
+        self._invert = pin_params['invert']
+        # winder.py checks _set_cmd for a configured PWM pin
+        self._set_cmd = self.set_pwm
+    def get_mcu(self):
+        return self._sim.mcu
+    def setup_max_duration(self, max_duration):
+        pass
+    def setup_cycle_time(self, cycle_time, hardware_pwm=False):
+        pass
+    def setup_start_value(self, start_value, shutdown_value):
+        pass
+    def set_pwm(self, print_time, value):
+        if self._invert:
+            value = 1.0 - value
+        self._sim.queue_pin(print_time, 'duty', max(0.0, min(1.0, value)))
+
+class SimDigitalOut:
+    def __init__(self, sim, pin_params):
+        self._sim = sim
+        self._invert = pin_params['invert']
+        self._attr = {'motor_dir': 'reverse',
+                      'motor_brake': 'brake'}[pin_params['pin']]
+    def get_mcu(self):
+        return self._sim.mcu
+    def setup_max_duration(self, max_duration):
+        pass
+    def setup_start_value(self, start_value, shutdown_value):
+        pass
+    def set_digital(self, print_time, value):
+        self._sim.queue_pin(print_time, self._attr,
+                            bool(value) != bool(self._invert))
+
+class SimCounter:
+    """Hall sensor on a counter pin: edges from the plant position, seen
+    at the pin poll every poll_ticks and reported every sample_ticks as
+    counter_state (and sensor_bulk_data edge messages when captured)"""
+    def __init__(self, sim, oid, pin):
+        self._sim = sim
+        self._oid = oid
+        if pin == 'spindle_hall':
+            self._pulses = float(sim.spindle_hall_ppr)
+        else:
+            self._pulses = sim.motor_hall_ppr / sim.gear_ratio
+        self.edge_oid = None
+        self._poll_time = self._report_time = 0.0
+        self._next_report = None
+        self._count = 0
+        self._count_time = 0.0
+        self._edges = []
+        self._sequence = 0
+    def setup(self, poll_time, report_time):
+        self._poll_time = poll_time
+        self._report_time = report_time
+    def start(self, print_time):
+        self._next_report = print_time + self._report_time
+        self._count_time = print_time
+    def _edge_positions(self, start_pos, end_pos):
+        # Rising edges at whole pulses, falling edges hall_duty later
+        low, high = min(start_pos, end_pos), max(start_pos, end_pos)
+        duty = self._sim.hall_duty
+        edges = []
+        pulse = math.floor(low)
+        while pulse <= high:
+            for pos in (pulse, pulse + duty):
+                if low < pos <= high:
+                    edges.append(pos)
+            pulse += 1
+        if end_pos < start_pos:
+            edges.reverse()
+        return edges
+    def step(self, start_time, start_turns, end_time, end_turns):
+        start_pos = start_turns * self._pulses
+        end_pos = end_turns * self._pulses
+        if start_pos != end_pos:
+            sim = self._sim
+            dt = end_time - start_time
+            for pos in self._edge_positions(start_pos, end_pos):
+                edge_time = start_time + dt * (pos - start_pos) / (
+                    end_pos - start_pos)
+                edge_time += sim.random.gauss(0.0, sim.hall_jitter)
+                # The MCU sees the edge at its next pin poll
+                edge_time = (math.ceil(edge_time / self._poll_time)
+                             * self._poll_time)
+                self._count += 1
+                self._count_time = max(self._count_time, edge_time)
+                if self.edge_oid is not None:
+                    self._edges.append((edge_time, self._count & 1))
+        while end_time >= self._next_report:
+            self._report(self._next_report)
+            self._next_report += self._report_time
+    def _report(self, report_time):
+        sim = self._sim
+        if self._edges:
+            # Edge times go out before the report, like the MCU sends them
+            edges = self._edges
+            self._edges = []
+            for i in range(0, len(edges), EDGES_PER_MESSAGE):
+                data = b''.join(
+                    struct.pack('<I', (sim.print_time_to_clock(t) & ~1 | level)
+                                & 0xffffffff)
+                    for t, level in edges[i:i+EDGES_PER_MESSAGE])
+                sim.send_response("sensor_bulk_data", self.edge_oid,
+                                  {'sequence': self._sequence & 0xffff,
+                                   'data': data})
+                self._sequence += 1
+        next_clock = sim.print_time_to_clock(report_time + self._poll_time)
+        count_clock = sim.print_time_to_clock(self._count_time)
+        sim.send_response("counter_state", self._oid, {
+            'next_clock': next_clock & 0xffffffff,
+            'count': self._count & 0xffffffff,
+            'count_clock': count_clock & 0xffffffff})
+
+class SimADC:
+    """Ratiometric angle sensor on an ADC pin, averaged over sample_count
+    samples and reported every report_time like MCU_adc"""
+    def __init__(self, sim):
+        self._sim = sim
+        self._sample_time = 0.001
+        self._sample_count = 1
+        self._report_time = 0.01
+        self._callback = None
+        self._next_report = None
+        self._samples = []
+        self._last_state = (0.0, 0.0)
+    def get_mcu(self):
+        return self._sim.mcu
+    def setup_adc_sample(self, sample_time, sample_count,
+                         minval=0., maxval=1., range_check_count=0):
+        self._sample_time = sample_time
+        self._sample_count = sample_count
+    def setup_adc_callback(self, report_time, callback):
+        self._report_time = report_time
+        self._callback = callback
+    def get_last_value(self):
+        return self._last_state
+    def start(self, print_time):
+        self._next_report = print_time + self._report_time
+    def step(self, start_time, start_turns, end_time, end_turns):
+        if end_time < self._next_report:
+            return
+        report_time = self._next_report
+        self._next_report += self._report_time
+        dt = end_time - start_time
+        sim = self._sim
+        total = 0.0
+        for i in range(self._sample_count):
+            sample_time = report_time - i * self._sample_time
+            # Interpolate within the current step (older samples reuse the
+            # current speed - the sample window is only a few ms)
+            turns = start_turns + (end_turns - start_turns) * (
+                sample_time - start_time) / dt
+            total += sim.get_angle_value(turns)
+        value = total / self._sample_count
+        self._last_state = (value, report_time)
+        if self._callback is not None:
+            self._callback(report_time, value)
+
+def load_config(config):
+    return WinderSim(config)
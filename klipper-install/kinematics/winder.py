@@ -6,6 +6,7 @@
 # This file may be distributed under the terms of the GNU GPLv3 license.
 import logging
 import stepper
+import chelper
 
 class WinderKinematics:
     def __init__(self, toolhead, config):
@@ -17,8 +18,8 @@ class WinderKinematics:
         
         # Get position range
         position_min, position_max = self.rail.get_range()
-        self.axes_min = toolhead.Coord((0., position_min, 0., 0.))
-        self.axes_max = toolhead.Coord((0., position_max, 0., 0.))
+        self.axes_min = toolhead.Coord(0., position_min, 0., e=0.)
+        self.axes_max = toolhead.Coord(0., position_max, 0., e=0.)
         
         # Setup limits (Y-axis only)
         self.limits = [(1.0, -1.0), (1.0, -1.0), (1.0, -1.0)]  # X, Y, Z
@@ -92,6 +93,42 @@ class WinderKinematics:
         if move.axes_d[0] or move.axes_d[2]:
             raise move.move_error("X and Z axes not supported in winder kinematics")
     
+    def set_gearing(self, trapq, pitch, width, origin_turns, origin_pos):
+        """Drive the traverse from a spindle trapq (electronic gearing)
+
+        The spindle trapq coordinate is spindle turns. The traverse
+        position is computed from it in kin_winder.c, so the wire pitch
+        no longer depends on host-side speed corrections.
+        """
+        toolhead = self.printer.lookup_object('toolhead')
+        toolhead.flush_step_generation()
+        ffi_main, ffi_lib = chelper.get_ffi()
+        for s in self.rail.get_steppers():
+            ffi_lib.winder_stepper_set_gearing(s.get_stepper_kinematics(),
+                                               pitch, width, origin_turns,
+                                               origin_pos)
+            s.set_trapq(trapq)
+            s.set_position([origin_turns, 0., 0.])
+        motion_queuing = self.printer.lookup_object('motion_queuing')
+        motion_queuing.check_step_generation_scan_windows()
+    
+    def clear_gearing(self):
+        """Return the traverse to toolhead control at its geared position"""
+        toolhead = self.printer.lookup_object('toolhead')
+        toolhead.flush_step_generation()
+        y_pos = self.rail.get_commanded_position()
+        ffi_main, ffi_lib = chelper.get_ffi()
+        for s in self.rail.get_steppers():
+            ffi_lib.winder_stepper_set_gearing(s.get_stepper_kinematics(),
+                                               0., 0., 0., 0.)
+        self.rail.set_trapq(toolhead.get_trapq())
+        newpos = toolhead.get_position()
+        newpos[1] = y_pos
+        toolhead.set_position(newpos)
+        motion_queuing = self.printer.lookup_object('motion_queuing')
+        motion_queuing.check_step_generation_scan_windows()
+        return y_pos
+    
     def get_status(self, eventtime):
         axes = []
         if self.limits[1][0] <= self.limits[1][1]:
@@ -80,6 +80,7 @@ echo -e "${GREEN}Step 3: Copying custom scripts...${NC}"
 # Custom scripts (optional - only if they don't exist in Klipper)
 CUSTOM_SCRIPTS=(
     "scripts/klipper_interface.py"
+    "scripts/klipper_async.py"
     "scripts/simple_stepper_test.py"
     "scripts/check_traverse_status.py"
     "scripts/diagnose_everything.py"
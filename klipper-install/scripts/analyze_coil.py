@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Analyze Coil - Pitch error statistics and layer maps from winder quality
+records (quality_dir in [winder], one .wqr file per coil)
+"""
+import math
+import os
+import sys
+
+# winder_quality.py reads the record format
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'extras'))
+
+from winder_quality import read_quality
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return float('nan')
+    index = min(len(values) - 1, max(0, int(math.ceil(fraction * len(values))) - 1))
+    return values[index]
+
+
+def pitch_stats(columns):
+    """Pitch error statistics per pass and for the whole coil"""
+    passes = {}
+    for pass_index, error in zip(columns['pass'], columns['pitch_error']):
+        if not math.isnan(error):
+            passes.setdefault(pass_index, []).append(error)
+    rows = []
+    all_errors = []
+    for pass_index in sorted(passes):
+        errors = passes[pass_index]
+        all_errors.extend(errors)
+        rows.append((pass_index, summarize(errors)))
+    return rows, summarize(all_errors)
+
+
+def summarize(errors):
+    if not errors:
+        return None
+    count = len(errors)
+    mean = sum(errors) / count
+    rms = math.sqrt(sum(e * e for e in errors) / count)
+    abs_sorted = sorted(abs(e) for e in errors)
+    return {'count': count, 'mean': mean, 'rms': rms,
+            'p95': percentile(abs_sorted, 0.95), 'max': abs_sorted[-1]}
+
+
+def print_report(path, meta, columns):
+    wire = meta.get('wire_diameter', 0.0)
+    rows, total = pitch_stats(columns)
+    print("\n" + "=" * 60)
+    print(f"COIL {os.path.basename(path)}")
+    print("=" * 60)
+    print(f"  Started:  {meta.get('start')}  complete: {meta.get('complete')}")
+    print(f"  Spindle:  {meta.get('rpm', 0):.1f} RPM, {len(columns['turn'])} turns recorded"
+          f" of {meta.get('turns', 0):.1f}")
+    print(f"  Wire:     {wire:.4f} mm, scatter {meta.get('scatter_pattern')}"
+          f" (seed {meta.get('scatter_seed')})")
+    periods = [p for p in columns['period'] if p > 0.0]
+    if periods:
+        print(f"  Period:   mean {1000.0 * sum(periods) / len(periods):.2f} ms,"
+              f" min {1000.0 * min(periods):.2f} ms, max {1000.0 * max(periods):.2f} ms")
+    if total is None:
+        print("  No pitch error data")
+        return
+    print(f"  Pitch error (um): mean {1000.0 * total['mean']:+.2f}  rms {1000.0 * total['rms']:.2f}"
+          f"  p95 {1000.0 * total['p95']:.2f}  max {1000.0 * total['max']:.2f}")
+    print("\n  Pass  Turns   Mean um   RMS um   Max um")
+    for pass_index, stats in rows:
+        print(f"  {pass_index:4d}  {stats['count']:5d}  {1000.0 * stats['mean']:+8.2f}"
+              f"  {1000.0 * stats['rms']:7.2f}  {1000.0 * stats['max']:7.2f}")
+
+
+def plot_layer_map(path, meta, columns, output=None):
+    """Pitch error over the traverse position, one row per pass"""
+    try:
+        import matplotlib
+        if output:
+            matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("ERROR: matplotlib is required for --plot")
+        return False
+    xs, ys, cs = [], [], []
+    for y, pass_index, error in zip(columns['y'], columns['pass'],
+                                    columns['pitch_error']):
+        if not math.isnan(error):
+            xs.append(y)
+            ys.append(pass_index)
+            cs.append(1000.0 * error)
+    fig, ax = plt.subplots(figsize=(10, 6))
+    limit = max([abs(c) for c in cs] or [1.0])
+    points = ax.scatter(xs, ys, c=cs, s=4, cmap='coolwarm',
+                        vmin=-limit, vmax=limit)
+    fig.colorbar(points, ax=ax, label='Pitch error (um)')
+    ax.set_xlabel('Traverse position (mm)')
+    ax.set_ylabel('Pass')
+    ax.set_title(os.path.basename(path))
+    if output:
+        fig.savefig(output, dpi=150)
+        print(f"Layer map written to {output}")
+    else:
+        plt.show()
+    return True
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Winder coil quality analysis",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Pitch error statistics of a coil
+  python3 analyze_coil.py ~/printer_data/coils/coil-20240101-120000.wqr
+
+  # Save a layer map
+  python3 analyze_coil.py coil.wqr --plot --output coil.png
+        """
+    )
+    parser.add_argument('files', nargs='+', help='Quality record (.wqr) files')
+    parser.add_argument('--plot', action='store_true',
+                        help='Plot the layer map (needs matplotlib)')
+    parser.add_argument('-o', '--output', default=None,
+                        help='Save the plot to this file instead of showing it')
+    args = parser.parse_args()
+
+    for path in args.files:
+        try:
+            meta, columns = read_quality(path)
+        except (IOError, OSError, ValueError) as e:
+            print(f"ERROR: {path}: {e}")
+            return 1
+        print_report(path, meta, columns)
+        if args.plot:
+            output = args.output
+            if output and len(args.files) > 1:
+                root, ext = os.path.splitext(output)
+                output = f"{root}-{os.path.splitext(os.path.basename(path))[0]}{ext}"
+            if not plot_layer_map(path, meta, columns, output):
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
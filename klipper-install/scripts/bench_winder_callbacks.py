@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+"""
+Winder Callback Benchmark - Per-call latency and allocations of the winder's
+reactor hot paths (_angle_sensor_callback, _update_rpm_safe,
+_sync_traverse_to_spindle), replaying synthetic or recorded spindle streams
+
+The real WinderController (from the [winder] section of printer.cfg) runs
+with the real pins, pulse_counter and spindle_estimator code against the
+[winder_sim] plant. Only the reactor, the MCU clock and the toolhead are
+stand-ins, on a virtual clock, so a run replays faster than real time.
+Run it with the klippy Python environment (klippy-env) on the CM4 for
+numbers that compare with motion_queuing's flush timer.
+
+The wind runs in plain velocity sync with no winding program queued, so
+the program feed (_feed_winding_program) and the geared trapq feed are
+not measured.
+"""
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CONFIG = os.path.join(SCRIPT_DIR, '..', 'config', 'printer.cfg')
+DEFAULT_KLIPPY = os.path.expanduser('~/klipper/klippy')
+WINDER_EXTRAS = os.path.join(SCRIPT_DIR, '..', 'extras')
+
+# Winder pins pointed at the simulated spindle
+SIM_PINS = {
+    'motor_pwm_pin': 'winder_sim:motor_pwm',
+    'motor_dir_pin': 'winder_sim:motor_dir',
+    'motor_brake_pin': 'winder_sim:motor_brake',
+    'motor_hall_pin': 'winder_sim:motor_hall',
+    'spindle_hall_pin': '^winder_sim:spindle_hall',
+    'angle_sensor_pin': 'winder_sim:angle',
+}
+CALLBACKS = ('_angle_sensor_callback', '_update_rpm_safe',
+             '_sync_traverse_to_spindle')
+MCU_FREQ = 64000000.0
+# Written by --write-thresholds (any summary key can be used as a limit)
+THRESHOLD_KEYS = ('p99_us', 'peak_bytes', 'cpu_percent')
+# Synthetic 'steps' profile: the RPM target changes this often
+STEP_TIME = 2.0
+
+
+class BenchReactor:
+    """Virtual-time reactor: timers run in order of their wake time"""
+    NOW = 0.
+    NEVER = 9999999999999999.
+
+    def __init__(self):
+        self.now = 0.
+        self.timers = []
+        self.async_queue = []
+
+    def monotonic(self):
+        return self.now
+
+    def register_timer(self, callback, waketime=NEVER):
+        timer = [waketime, callback]
+        self.timers.append(timer)
+        return timer
+
+    def update_timer(self, timer, waketime):
+        timer[0] = waketime
+
+    def unregister_timer(self, timer):
+        timer[0] = self.NEVER
+
+    def register_callback(self, callback, waketime=NOW):
+        def one_shot(eventtime):
+            callback(eventtime)
+            return self.NEVER
+        self.register_timer(one_shot, waketime)
+
+    def register_async_callback(self, callback, waketime=NOW):
+        self.async_queue.append(callback)
+
+    def run_until(self, end_time):
+        while 1:
+            while self.async_queue:
+                self.async_queue.pop(0)(self.now)
+            timer = min(self.timers, key=lambda t: t[0])
+            if timer[0] > end_time:
+                self.now = end_time
+                return
+            self.now = max(self.now, timer[0])
+            timer[0] = timer[1](self.now)
+
+
+class BenchMCU:
+    """Main MCU clock: print time equals reactor time"""
+    def __init__(self, reactor):
+        self.reactor = reactor
+
+    def seconds_to_clock(self, t):
+        return int(t * MCU_FREQ)
+
+    def print_time_to_clock(self, print_time):
+        return int(print_time * MCU_FREQ)
+
+    def clock_to_print_time(self, clock):
+        return clock / MCU_FREQ
+
+    def clock32_to_clock64(self, clock32):
+        last = self.print_time_to_clock(self.reactor.monotonic())
+        clock_diff = (clock32 - last) & 0xffffffff
+        clock_diff -= (clock_diff & 0x80000000) << 1
+        return last + clock_diff
+
+    def estimated_print_time(self, eventtime):
+        return eventtime
+
+    def min_schedule_time(self):
+        return 0.100
+
+    def is_fileoutput(self):
+        return False
+
+
+class BenchToolhead:
+    """Traverse stand-in for the velocity sync (max_velocity updates)"""
+    def __init__(self, mcu):
+        self.mcu = mcu
+        self.max_velocity = 10.0
+        self.velocity_updates = 0
+
+    def get_status(self, eventtime):
+        return {'max_velocity': self.max_velocity, 'homed_axes': ''}
+
+    def get_last_move_time(self):
+        return self.mcu.reactor.monotonic() + 0.25
+
+    def register_lookahead_callback(self, callback):
+        callback(self.get_last_move_time())
+
+    def set_max_velocities(self, max_velocity, max_accel, square_corner,
+                           min_cruise_ratio):
+        self.max_velocity = max_velocity
+        self.velocity_updates += 1
+
+    def wait_moves(self):
+        pass
+
+
+class BenchGcode:
+    def register_command(self, cmd, func, desc=None):
+        pass
+
+    def respond_info(self, msg, log=True):
+        pass
+
+
+class BenchStub:
+    """motion_queuing/motion_report/webhooks - not on the measured paths"""
+    def __init__(self):
+        self.dtrapqs = {}
+
+    def allocate_trapq(self):
+        return None
+
+    def lookup_trapq_append(self):
+        return lambda *args: None
+
+    def register_trapq(self, name, trapq):
+        pass
+
+    def register_endpoint(self, path, callback):
+        pass
+
+    def register_mux_endpoint(self, path, key, value, callback):
+        pass
+
+
+class BenchPrinter:
+    def __init__(self, fileconfig, configfile, pins):
+        self.reactor = BenchReactor()
+        self.fileconfig = fileconfig
+        self.configfile = configfile
+        self.command_error = self.config_error = Exception
+        self.event_handlers = {}
+        self.mcu = BenchMCU(self.reactor)
+        stub = BenchStub()
+        self.objects = {'mcu': self.mcu, 'pins': pins.PrinterPins(),
+                        'gcode': BenchGcode(),
+                        'toolhead': BenchToolhead(self.mcu),
+                        'motion_queuing': stub, 'motion_report': stub,
+                        'webhooks': stub}
+
+    def get_reactor(self):
+        return self.reactor
+
+    def add_object(self, name, obj):
+        self.objects[name] = obj
+
+    def lookup_object(self, name, default=Exception):
+        if name in self.objects:
+            return self.objects[name]
+        if default is Exception:
+            raise self.config_error("Unknown object '%s'" % (name,))
+        return default
+
+    def load_object(self, config, section, default=None):
+        import importlib
+        if section not in self.objects:
+            mod = importlib.import_module('extras.' + section)
+            self.objects[section] = mod.load_config(self.get_config(section))
+        return self.objects[section]
+
+    def get_config(self, section):
+        if not self.fileconfig.has_section(section):
+            self.fileconfig.add_section(section)
+        return self.configfile.ConfigWrapper(self, self.fileconfig, {},
+                                             section)
+
+    def register_event_handler(self, event, callback):
+        self.event_handlers.setdefault(event, []).append(callback)
+
+    def send_event(self, event, *params):
+        return [cb(*params) for cb in self.event_handlers.get(event, [])]
+
+    def get_state_message(self):
+        return "Printer is ready", 'ready'
+
+    def is_shutdown(self):
+        return False
+
+
+class CallStats:
+    """Per-call wall time (ns) and, in the allocation pass, traced peak
+    bytes allocated during the call"""
+    def __init__(self, name):
+        self.name = name
+        self.times = []
+        self.peaks = []
+        self.trace = False
+
+    def wrap(self, func):
+        self.func = func
+        perf_counter_ns = time.perf_counter_ns
+
+        def timed(*args):
+            if self.trace:
+                before = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                try:
+                    return func(*args)
+                finally:
+                    self.peaks.append(tracemalloc.get_traced_memory()[1]
+                                      - before)
+            start = perf_counter_ns()
+            try:
+                return func(*args)
+            finally:
+                self.times.append(perf_counter_ns() - start)
+        return timed
+
+    def summary(self, duration):
+        times = sorted(self.times)
+        peaks = sorted(self.peaks)
+        if not times:
+            # Allocation pass (no timing)
+            return {'calls': len(peaks),
+                    'peak_bytes': percentile(peaks, .99) if peaks else 0,
+                    'max_peak_bytes': peaks[-1] if peaks else 0}
+        return {
+            'calls': len(times),
+            'mean_us': sum(times) / len(times) / 1000.,
+            'p50_us': percentile(times, .50) / 1000.,
+            'p90_us': percentile(times, .90) / 1000.,
+            'p99_us': percentile(times, .99) / 1000.,
+            'p999_us': percentile(times, .999) / 1000.,
+            'max_us': times[-1] / 1000.,
+            'peak_bytes': 0,
+            'max_peak_bytes': 0,
+            'cpu_percent': 100. * sum(times) / 1e9 / duration,
+        }
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    index = min(len(values) - 1,
+                max(0, int(math.ceil(fraction * len(values))) - 1))
+    return values[index]
+
+
+def load_klippy(klippy_dir):
+    sys.path.insert(0, klippy_dir)
+    import configfile
+    import extras
+    import pins
+    # The winder modules under test take precedence over installed copies
+    extras.__path__.insert(0, os.path.abspath(WINDER_EXTRAS))
+    return configfile, pins
+
+
+def read_config(config_path):
+    import configparser
+    fileconfig = configparser.RawConfigParser(
+        strict=False, inline_comment_prefixes=(';', '#'))
+    fileconfig.read(config_path)
+    if not fileconfig.has_section('winder'):
+        raise ValueError("%s has no [winder] section" % (config_path,))
+    for option, pin in SIM_PINS.items():
+        fileconfig.set('winder', option, pin)
+    # No journal or quality files from a benchmark; the simulator has no
+    # bulk ADC stream, so the angle sensor runs on the adc pin path
+    for option in ('journal_path', 'quality_dir', 'angle_sample_rate'):
+        fileconfig.remove_option('winder', option)
+    return fileconfig
+
+
+def load_replay(path):
+    """(time, turns) samples of a quality record, from zero"""
+    from winder_quality import read_quality
+    meta, columns = read_quality(path)
+    times, turns = columns['time'], columns['turn']
+    if len(times) < 2:
+        raise ValueError("%s has too few turns to replay" % (path,))
+    return [(t - times[0], float(n - turns[0])) for t, n in zip(times, turns)]
+
+
+def replay_plant(sim, samples, start_time):
+    """Drive the simulated spindle along recorded (time, turns) samples
+    (the sensor models still add their noise)"""
+    state = {'index': 0}
+
+    def step_plant(dt):
+        t = sim.sim_time + dt - start_time
+        i = state['index']
+        while i + 2 < len(samples) and samples[i + 1][0] <= t:
+            i += 1
+        state['index'] = i
+        (t0, n0), (t1, n1) = samples[i], samples[i + 1]
+        rps = (n1 - n0) / (t1 - t0)
+        if t < 0. or t > samples[-1][0]:
+            rps = 0.
+            turns = sim.turns
+        else:
+            turns = n0 + rps * (t - t0)
+        sim.rps = rps
+        sim.turns = turns
+    sim._step_plant = step_plant
+    return samples[-1][0]
+
+
+def run_bench(args, configfile, pins, trace):
+    fileconfig = read_config(args.config)
+    for setting in args.set:
+        option, value = setting.split('=', 1)
+        fileconfig.set('winder', option.strip(), value.strip())
+    printer = BenchPrinter(fileconfig, configfile, pins)
+    # Wrap on the class (as loaded by klippy), so the timer, the ADC and
+    # the nested sync call all go through the timed methods
+    import extras.winder
+    cls = extras.winder.WinderController
+    stats = {}
+    for name in CALLBACKS:
+        stats[name] = CallStats(name)
+        stats[name].trace = trace
+        setattr(cls, name, stats[name].wrap(cls.__dict__[name]))
+    try:
+        duration = simulate(args, printer)
+    finally:
+        for name in CALLBACKS:
+            setattr(cls, name, stats[name].func)
+    return printer, {name: s.summary(duration)
+                     for name, s in stats.items()}, duration
+
+
+def simulate(args, printer):
+    """Spin the spindle up and wind (velocity sync, no program queued)"""
+    sim = printer.load_object(None, 'winder_sim')
+    winder = printer.load_object(None, 'winder')
+    printer.send_event("klippy:mcu_identify")
+    printer.send_event("klippy:connect")
+    printer.send_event("klippy:ready")
+    reactor = printer.reactor
+    duration = args.duration
+    if args.replay:
+        duration = min(duration, replay_plant(
+            sim, load_replay(args.replay), 1.0) + 1.0)
+    winder.is_winding = True
+    winder.spindle_rpm_target = args.rpm
+    winder.motor_rpm_target = args.rpm / winder.spindle_gear_ratio
+    start = 1.0
+    while start < duration:
+        rpm = args.rpm
+        if args.profile == 'steps' and int(start / STEP_TIME) % 2:
+            rpm *= 1.0 - args.step
+        winder._set_pwm_duty(start, winder._rpm_to_duty(rpm))
+        reactor.run_until(min(duration, start + STEP_TIME))
+        start += STEP_TIME
+    return duration
+
+
+def print_results(results, duration, toolhead):
+    print("\n" + "=" * 78)
+    print(f"WINDER CALLBACKS - {duration:.1f}s simulated,"
+          f" {toolhead.velocity_updates} max_velocity updates")
+    print("=" * 78)
+    print(f"  {'Callback':28s} {'Calls':>6s} {'p50':>7s} {'p90':>7s}"
+          f" {'p99':>7s} {'p99.9':>7s} {'max':>8s} {'bytes':>7s} {'cpu%':>6s}")
+    for name, r in results.items():
+        if not r['calls']:
+            print(f"  {name:28s} {0:6d}  (not called)")
+            continue
+        print(f"  {name:28s} {r['calls']:6d} {r['p50_us']:7.1f}"
+              f" {r['p90_us']:7.1f} {r['p99_us']:7.1f} {r['p999_us']:7.1f}"
+              f" {r['max_us']:8.1f} {r['peak_bytes']:7d}"
+              f" {r['cpu_percent']:6.3f}")
+    print("\n  Times in microseconds (_update_rpm_safe includes the sync);"
+          " bytes = p99 traced peak allocation per call")
+
+
+def check_thresholds(results, thresholds):
+    failures = []
+    for name, limits in thresholds.items():
+        result = results.get(name)
+        if result is None or not result['calls']:
+            continue
+        for key, limit in limits.items():
+            if result.get(key, 0) > limit:
+                failures.append(f"{name} {key} {result[key]:.3f} > {limit}")
+    return failures
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Winder reactor callback benchmark",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # 30s synthetic run at 1500 RPM with the CM4's printer.cfg
+  ~/klippy-env/bin/python bench_winder_callbacks.py --rpm 1500
+
+  # Replay a recorded coil and check against saved thresholds
+  ~/klippy-env/bin/python bench_winder_callbacks.py \\
+      --replay ~/printer_data/coils/coil-20240101-120000.wqr \\
+      --thresholds bench_thresholds.json
+
+  # Save the current numbers (times 2) as thresholds
+  ~/klippy-env/bin/python bench_winder_callbacks.py --write-thresholds \\
+      bench_thresholds.json
+        """
+    )
+    parser.add_argument('--config', default=DEFAULT_CONFIG,
+                        help='printer.cfg with the [winder] section')
+    parser.add_argument('--klippy', default=DEFAULT_KLIPPY,
+                        help='klippy directory (default: ~/klipper/klippy)')
+    parser.add_argument('--duration', type=float, default=30.0,
+                        help='Simulated seconds (default: 30)')
+    parser.add_argument('--rpm', type=float, default=1500.0,
+                        help='Spindle RPM of the synthetic run')
+    parser.add_argument('--profile', choices=('steady', 'steps'),
+                        default='steps',
+                        help='steps: drop the RPM by --step every'
+                             f' {STEP_TIME:.0f}s to exercise the sync')
+    parser.add_argument('--step', type=float, default=0.1,
+                        help='RPM step of the steps profile (fraction)')
+    parser.add_argument('--replay', default=None,
+                        help='Replay the spindle of a quality record (.wqr)')
+    parser.add_argument('--set', action='append', default=[],
+                        metavar='OPTION=VALUE',
+                        help='Override a [winder] option (repeatable),'
+                             ' e.g. --set sync_trigger=event')
+    parser.add_argument('--thresholds', default=None,
+                        help='JSON limits per callback (exit 1 if exceeded)')
+    parser.add_argument('--write-thresholds', default=None,
+                        help='Write this run times --margin as thresholds')
+    parser.add_argument('--margin', type=float, default=2.0,
+                        help='Threshold margin for --write-thresholds')
+    parser.add_argument('--json', action='store_true',
+                        help='Print the results as JSON')
+    args = parser.parse_args()
+
+    sys.path.insert(0, WINDER_EXTRAS)
+    configfile, pins = load_klippy(args.klippy)
+    import logging
+    logging.basicConfig(level=logging.ERROR)
+    # Timing pass, then the same run again with tracemalloc for allocations
+    printer, results, duration = run_bench(args, configfile, pins, False)
+    tracemalloc.start()
+    alloc_results = run_bench(args, configfile, pins, True)[1]
+    tracemalloc.stop()
+    for name, result in results.items():
+        if result['calls']:
+            result['peak_bytes'] = alloc_results[name].get('peak_bytes', 0)
+            result['max_peak_bytes'] = alloc_results[name].get(
+                'max_peak_bytes', 0)
+    if args.json:
+        print(json.dumps(results, indent=2, sort_keys=True))
+    else:
+        print_results(results, duration, printer.lookup_object('toolhead'))
+
+    if args.write_thresholds:
+        thresholds = {}
+        for name, result in results.items():
+            if result['calls']:
+                # One run's tail (max, p99.9) is too noisy to gate on
+                thresholds[name] = {
+                    key: round(result[key] * args.margin, 3)
+                    for key in THRESHOLD_KEYS}
+        with open(args.write_thresholds, 'w') as f:
+            json.dump(thresholds, f, indent=2, sort_keys=True)
+        print(f"\nThresholds written to {args.write_thresholds}")
+    if args.thresholds:
+        with open(args.thresholds) as f:
+            failures = check_thresholds(results, json.load(f))
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        if failures:
+            return 1
+        print("\nAll callbacks within thresholds")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
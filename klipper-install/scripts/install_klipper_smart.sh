@@ -230,6 +230,13 @@ if [ "$KEEP_PULSE_COUNTER" = true ]; then
     echo "Copying pulse counter files..."
     cp "$INSTALL_DIR/src/pulse_counter.c" "$TARGET_DIR/src/" 2>/dev/null || true
     cp "$INSTALL_DIR/src/pulse_counter.h" "$TARGET_DIR/src/" 2>/dev/null || true
+    # Edge capture streams through sensor_bulk
+    cp "$INSTALL_DIR/src/sensor_bulk.c" "$TARGET_DIR/src/" 2>/dev/null || true
+    cp "$INSTALL_DIR/src/sensor_bulk.h" "$TARGET_DIR/src/" 2>/dev/null || true
+    # Replace the stock counter with the edge capture version
+    "$PROJECT_ROOT/scripts/patch_pulse_counter.sh" "$TARGET_DIR" || true
+    # Bulk ADC streaming for angle_sample_rate
+    "$PROJECT_ROOT/scripts/patch_adc_bulk.sh" "$TARGET_DIR" || true
 fi
 
 # Copy SPI/I2C if needed (for TMC2209)
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Klipper Async Interface - asyncio webhooks client
+Same /tmp/klippy_uds protocol as klipper_interface.py, but any number of
+requests can be in flight on one connection: replies are matched to
+requests by "id", subscription notifications are routed to async
+iterators, and batches of requests are pipelined in a single write.
+"""
+import asyncio
+import itertools
+import json
+import sys
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Largest message accepted from Klipper (objects/list, gcode/help, ...)
+READ_LIMIT = 16 * 1024 * 1024
+# Notifications buffered per subscription before the oldest are dropped
+SUBSCRIPTION_QUEUE = 256
+
+
+class KlipperError(Exception):
+    """Error reply from a webhooks endpoint"""
+    def __init__(self, method: str, error: Any):
+        self.method = method
+        self.error = error
+        message = error.get("message", str(error)) \
+            if isinstance(error, dict) else str(error)
+        super().__init__(f"{method}: {message}")
+
+
+class Subscription:
+    """
+    Async iterator over the notifications of one subscription.
+    Yields the notification "params" ({"eventtime", "status"} for
+    objects/subscribe, {"response"} for gcode/subscribe_output) and ends
+    when the subscription is replaced or the connection closes.
+    """
+
+    def __init__(self, client: "AsyncKlipperInterface", key: str,
+                 method: str):
+        self.client = client
+        self.key = key
+        self.method = method
+        self.initial: Optional[Dict] = None
+        self.dropped = 0
+        self._queue: asyncio.Queue = asyncio.Queue(SUBSCRIPTION_QUEUE)
+        self._closed = False
+
+    def _push(self, params: Any):
+        if self._closed:
+            return
+        if self._queue.full():
+            # A slow consumer loses the oldest updates, never the reader
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(params)
+
+    def close(self):
+        """Stop iterating (Klipper keeps sending until it is replaced)"""
+        if self._closed:
+            return
+        self._closed = True
+        self.client.subscriptions.pop(self.key, None)
+        if self._queue.full():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Any:
+        if self._closed and self._queue.empty():
+            raise StopAsyncIteration
+        params = await self._queue.get()
+        if params is None:
+            raise StopAsyncIteration
+        return params
+
+
+class AsyncKlipperInterface:
+    """
+    asyncio interface to Klipper via Unix domain socket.
+    Implements the webhooks protocol from klippy/webhooks.py: requests are
+    {"id", "method", "params"} messages terminated by \\x03, replies carry
+    the request id, notifications carry the request's response_template.
+    """
+
+    def __init__(self, uds_path: str = "/tmp/klippy_uds"):
+        self.uds_path = uds_path
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.read_task: Optional[asyncio.Task] = None
+        self.request_ids = itertools.count(1)
+        self.pending: Dict[int, Tuple[str, asyncio.Future]] = {}
+        self.subscriptions: Dict[str, Subscription] = {}
+        # Klipper keeps one objects/subscribe per connection
+        self.status_subscription: Optional[Subscription] = None
+
+    async def connect(self, timeout: float = 10.0):
+        """Connect to Klipper's Unix socket, retrying until it is up"""
+        loop = asyncio.get_running_loop()
+        end_time = loop.time() + timeout
+        while 1:
+            try:
+                self.reader, self.writer = await asyncio.open_unix_connection(
+                    self.uds_path, limit=READ_LIMIT)
+                break
+            except (ConnectionRefusedError, FileNotFoundError):
+                if loop.time() >= end_time:
+                    raise
+                await asyncio.sleep(0.1)
+        self.read_task = loop.create_task(self._read_loop())
+
+    async def close(self):
+        """Close the connection; pending requests fail with ConnectionError"""
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+            self.writer = None
+        if self.read_task is not None:
+            self.read_task.cancel()
+            try:
+                await self.read_task
+            except asyncio.CancelledError:
+                pass
+            self.read_task = None
+        self._fail_all("Connection closed")
+
+    async def __aenter__(self) -> "AsyncKlipperInterface":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _fail_all(self, reason: str):
+        pending, self.pending = self.pending, {}
+        for method, fut in pending.values():
+            if not fut.done():
+                fut.set_exception(ConnectionError(f"{method}: {reason}"))
+        for sub in list(self.subscriptions.values()):
+            sub.close()
+
+    async def _read_loop(self):
+        reason = "Socket closed by server"
+        try:
+            while 1:
+                try:
+                    data = await self.reader.readuntil(b'\x03')
+                except asyncio.IncompleteReadError:
+                    break
+                try:
+                    msg = json.loads(data[:-1])
+                except ValueError as e:
+                    print(f"JSON decode error: {e}")
+                    continue
+                self._dispatch(msg)
+        except (ConnectionError, OSError, asyncio.LimitOverrunError) as e:
+            reason = str(e)
+        finally:
+            self._fail_all(reason)
+
+    def _dispatch(self, msg: Dict):
+        if not isinstance(msg, dict):
+            return
+        req_id = msg.get("id")
+        if req_id is not None:
+            entry = self.pending.pop(req_id, None)
+            if entry is None:
+                # Reply to a request that already timed out
+                return
+            method, fut = entry
+            if fut.done():
+                return
+            if "error" in msg:
+                fut.set_exception(KlipperError(method, msg["error"]))
+            else:
+                fut.set_result(msg.get("result"))
+            return
+        sub = self.subscriptions.get(msg.get("key"))
+        if sub is not None:
+            sub._push(msg.get("params"))
+
+    def submit(self, method: str, params: Optional[Dict] = None
+               ) -> asyncio.Future:
+        """
+        Queue a request without waiting for the socket or the reply.
+        Returns a future for the "result" (KlipperError on an "error"
+        reply). Requests submitted back to back go out in one write.
+        """
+        if self.writer is None or self.writer.is_closing():
+            raise ConnectionError(f"{method}: Not connected")
+        req_id = next(self.request_ids)
+        fut = asyncio.get_running_loop().create_future()
+        self.pending[req_id] = (method, fut)
+        request = {"id": req_id, "method": method, "params": params or {}}
+        self.writer.write(json.dumps(request, separators=(',', ':')).encode()
+                          + b'\x03')
+        fut.add_done_callback(lambda f, i=req_id: self.pending.pop(i, None))
+        return fut
+
+    async def request(self, method: str, params: Optional[Dict] = None,
+                      timeout: Optional[float] = 5.0) -> Any:
+        """Send one request and wait for its result"""
+        fut = self.submit(method, params)
+        await self.writer.drain()
+        return await asyncio.wait_for(fut, timeout)
+
+    async def batch(self, requests: Sequence[Tuple[str, Optional[Dict]]],
+                    timeout: Optional[float] = 5.0) -> List[Any]:
+        """
+        Pipeline several (method, params) requests: all are written
+        before the first reply is awaited. Returns the results in request
+        order, with a KlipperError in place of any failed request.
+        """
+        futs = [self.submit(method, params) for method, params in requests]
+        await self.writer.drain()
+        return await asyncio.wait_for(
+            asyncio.gather(*futs, return_exceptions=True), timeout)
+
+    async def _subscribe(self, method: str, params: Dict,
+                         timeout: Optional[float]) -> Subscription:
+        key = f"sub{next(self.request_ids)}"
+        sub = Subscription(self, key, method)
+        # Register first: notifications may follow the reply immediately
+        self.subscriptions[key] = sub
+        params = dict(params, response_template={"key": key})
+        try:
+            sub.initial = await self.request(method, params, timeout)
+        except BaseException:
+            sub.close()
+            raise
+        return sub
+
+    async def subscribe(self, objects: Dict[str, Optional[list]],
+                        timeout: Optional[float] = 5.0) -> Subscription:
+        """
+        Subscribe to printer object status (objects/subscribe).
+        sub.initial holds the full first status; iterating yields the
+        changed fields. Replaces (and ends) any previous subscription on
+        this connection, as Klipper does.
+        """
+        sub = await self._subscribe("objects/subscribe",
+                                    {"objects": objects}, timeout)
+        if self.status_subscription is not None:
+            self.status_subscription.close()
+        self.status_subscription = sub
+        return sub
+
+    async def subscribe_output(self, timeout: Optional[float] = 5.0
+                               ) -> Subscription:
+        """Subscribe to G-code responses (gcode/subscribe_output)"""
+        return await self._subscribe("gcode/subscribe_output", {}, timeout)
+
+    async def dump_spindle(self, timeout: Optional[float] = 5.0
+                           ) -> Subscription:
+        """
+        Stream the winder's spindle turns (winder/dump_spindle).
+        sub.initial["header"] names the row fields; iterating yields
+        {"data": [[time, turn, rpm, traverse_pos, pitch_error], ...]}
+        batches.
+        """
+        return await self._subscribe("winder/dump_spindle", {}, timeout)
+
+    async def send_gcode(self, gcode: str, timeout: float = 30.0):
+        """Run G-code; raises KlipperError if Klipper reports an error"""
+        if "G28" in gcode.upper():
+            timeout = max(timeout, 60.0)
+        await self.request("gcode/script", {"script": gcode}, timeout)
+
+    async def query_objects(self, objects: Dict[str, Optional[list]],
+                            timeout: float = 5.0) -> Dict:
+        """Query printer object status (objects/query)"""
+        result = await self.request("objects/query", {"objects": objects},
+                                    timeout)
+        return result.get("status", result)
+
+    async def get_printer_info(self) -> Dict:
+        return await self.request("info", {})
+
+    async def get_objects_list(self) -> List[str]:
+        result = await self.request("objects/list")
+        return result.get("objects", [])
+
+    async def emergency_stop(self):
+        await self.request("emergency_stop")
+
+
+async def query_machines(clients: Sequence[AsyncKlipperInterface],
+                         objects: Dict[str, Optional[list]],
+                         timeout: float = 5.0) -> List[Any]:
+    """Query the same objects on several machines concurrently"""
+    return await asyncio.gather(
+        *[c.query_objects(objects, timeout) for c in clients],
+        return_exceptions=True)
+
+
+async def run(args) -> int:
+    clients = [AsyncKlipperInterface(path) for path in args.socket]
+    try:
+        await asyncio.gather(*[c.connect(args.timeout) for c in clients])
+    except OSError as e:
+        print(f"Failed to connect to Klipper: {e}")
+        return 1
+    objects = {name: None for name in args.query or []}
+    try:
+        if args.gcode:
+            # One pipelined batch per machine, all machines at once
+            batch = [("gcode/script", {"script": g}) for g in args.gcode]
+            results = await asyncio.gather(
+                *[c.batch(batch, timeout=60.0) for c in clients])
+            for client, replies in zip(clients, results):
+                for gcode, reply in zip(args.gcode, replies):
+                    ok = not isinstance(reply, Exception)
+                    print(f"{client.uds_path}: {gcode}: "
+                          f"{'ok' if ok else reply}")
+        if objects and not args.watch:
+            results = await query_machines(clients, objects, args.timeout)
+            for client, status in zip(clients, results):
+                print(f"{client.uds_path}:")
+                print(json.dumps(status if not isinstance(status, Exception)
+                                 else str(status), indent=2))
+        if args.dump_spindle:
+            subs = await asyncio.gather(*[c.dump_spindle() for c in clients])
+
+            async def dump(client, sub):
+                print(f"{client.uds_path}: {' '.join(sub.initial['header'])}")
+                async for params in sub:
+                    for row in params["data"]:
+                        print(f"{client.uds_path}: "
+                              + " ".join("-" if v is None else f"{v:.6g}"
+                                         for v in row))
+            await asyncio.gather(*[dump(c, s) for c, s in zip(clients, subs)])
+        if objects and args.watch:
+            subs = await asyncio.gather(*[c.subscribe(objects)
+                                          for c in clients])
+
+            async def watch(client, sub):
+                print(f"{client.uds_path}: {json.dumps(sub.initial)}")
+                async for params in sub:
+                    print(f"{client.uds_path}: {json.dumps(params)}")
+            await asyncio.gather(*[watch(c, s)
+                                   for c, s in zip(clients, subs)])
+    except (KlipperError, ConnectionError, asyncio.TimeoutError) as e:
+        print(f"Error: {e}")
+        return 1
+    finally:
+        await asyncio.gather(*[c.close() for c in clients])
+    return 0
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Klipper Async Interface - Query several winders at once",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Query the winder on two machines (sockets forwarded over SSH)
+  python3 klipper_async.py -s /tmp/winder1_uds -s /tmp/winder2_uds \\
+      --query winder --query toolhead
+
+  # Watch winder status changes
+  python3 klipper_async.py --query winder --watch
+
+  # Watch every spindle turn
+  python3 klipper_async.py --dump-spindle
+
+  # Pipeline several G-code commands
+  python3 klipper_async.py -g "G28 Y" -g "G1 Y50 F1000" -g M400
+        """
+    )
+    parser.add_argument('-s', '--socket', action='append',
+                        help='Unix socket path, repeat for several machines'
+                             ' (default: /tmp/klippy_uds)')
+    parser.add_argument('--query', metavar='OBJECT', action='append',
+                        help='Query object status (can be used multiple'
+                             ' times)')
+    parser.add_argument('--watch', action='store_true',
+                        help='Subscribe to the --query objects and print'
+                             ' updates')
+    parser.add_argument('--dump-spindle', action='store_true',
+                        help='Stream every spindle turn (time, turn, rpm,'
+                             ' traverse_pos, pitch_error)')
+    parser.add_argument('-g', '--gcode', action='append',
+                        help='Send G-code command (can be used multiple'
+                             ' times, pipelined)')
+    parser.add_argument('--timeout', type=float, default=5.0,
+                        help='Connect and query timeout (default: 5)')
+    args = parser.parse_args()
+    if not args.socket:
+        args.socket = ['/tmp/klippy_uds']
+    if not (args.query or args.gcode or args.dump_spindle):
+        parser.print_help()
+        return 0
+    try:
+        return asyncio.run(run(args))
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+#!/bin/bash
+# Patch Klipper for fixed rate ADC streaming (angle_sample_rate)
+#
+# Stock Klipper only reports analog inputs with analog_in_state. This
+# script installs the bulk ADC mode used by the angle sensor:
+#   1. Copy src/adc_bulk.c (config_adc_bulk/query_adc_bulk)
+#   2. Add adc_bulk.c to src/Makefile under CONFIG_WANT_ADC_BULK
+#   3. Add WANT_ADC_BULK to src/Kconfig and let it select NEED_SENSOR_BULK
+# The MCU firmware must be rebuilt and flashed afterwards.
+#
+# Usage: ./patch_adc_bulk.sh [KLIPPER_DIR]
+#   KLIPPER_DIR: Path to Klipper source directory (default: ~/klipper)
+
+set -e
+
+KLIPPER_DIR="${1:-~/klipper}"
+KLIPPER_DIR="${KLIPPER_DIR/#\~/$HOME}"  # Expand ~
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+PROJECT_ROOT="$(cd "$SCRIPT_DIR/.." && pwd)"
+
+# Colors
+GREEN='\033[0;32m'
+YELLOW='\033[1;33m'
+RED='\033[0;31m'
+NC='\033[0m'
+
+echo "=========================================="
+echo "Patching Klipper for Bulk ADC Streaming"
+echo "=========================================="
+echo "Klipper directory: $KLIPPER_DIR"
+echo ""
+
+if [ ! -d "$KLIPPER_DIR/src" ]; then
+    echo -e "${RED}ERROR: Not a Klipper source directory: $KLIPPER_DIR${NC}"
+    exit 1
+fi
+
+echo -e "${GREEN}Copying bulk ADC source...${NC}"
+cp "$PROJECT_ROOT/src/adc_bulk.c" "$KLIPPER_DIR/src/adc_bulk.c"
+echo "  ✓ src/adc_bulk.c"
+
+if [ ! -f "$KLIPPER_DIR/src/Makefile" ] || [ ! -f "$KLIPPER_DIR/src/Kconfig" ]; then
+    echo -e "${YELLOW}  ⚠ src/Makefile or src/Kconfig not found - add WANT_ADC_BULK by hand${NC}"
+    exit 0
+fi
+
+echo -e "${GREEN}Patching src/Makefile and src/Kconfig...${NC}"
+python3 - "$KLIPPER_DIR/src/Makefile" "$KLIPPER_DIR/src/Kconfig" << 'PYTHON_SCRIPT'
+import sys
+
+makefile_path, kconfig_path = sys.argv[1:3]
+
+def read_lines(path):
+    with open(path, 'r') as f:
+        return f.read().split('\n')
+
+def write_lines(path, lines):
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines))
+
+# src/Makefile: build adc_bulk.c next to adccmds.c
+lines = read_lines(makefile_path)
+build_line = 'src-$(CONFIG_WANT_ADC_BULK) += adc_bulk.c'
+if build_line in lines:
+    print("  ✓ src/Makefile already builds adc_bulk.c")
+else:
+    try:
+        i = lines.index('src-$(CONFIG_WANT_ADC) += adccmds.c')
+    except ValueError:
+        print("  ⚠ adccmds.c build line not found in src/Makefile")
+        sys.exit(1)
+    lines.insert(i + 1, build_line)
+    write_lines(makefile_path, lines)
+    print("  ✓ src/Makefile now builds adc_bulk.c")
+
+# src/Kconfig: default entry, menu entry and NEED_SENSOR_BULK dependency
+lines = read_lines(kconfig_path)
+if 'config WANT_ADC_BULK' in lines:
+    print("  ✓ WANT_ADC_BULK already in src/Kconfig")
+else:
+    try:
+        i = lines.index('config WANT_ADXL345')
+        j = lines.index('comment "LCD chips"')
+    except ValueError:
+        print("  ⚠ WANT_ADXL345 or LCD chips menu not found in src/Kconfig")
+        sys.exit(1)
+    lines[j:j] = ['config WANT_ADC_BULK',
+                  '    bool "Support fixed rate ADC streaming'
+                  ' (eg, spindle angle sensor)"',
+                  '    depends on WANT_ADC']
+    lines[i:i] = ['config WANT_ADC_BULK',
+                  '    bool',
+                  '    depends on WANT_ADC',
+                  '    default y']
+    print("  ✓ WANT_ADC_BULK added to src/Kconfig")
+try:
+    start = lines.index('config NEED_SENSOR_BULK')
+except ValueError:
+    print("  ⚠ NEED_SENSOR_BULK not found in src/Kconfig")
+    sys.exit(1)
+i = start + 1
+while not lines[i].strip().startswith('depends on'):
+    i += 1
+end = i
+while lines[end].rstrip().endswith('\\'):
+    end += 1
+if 'WANT_ADC_BULK' in ' '.join(lines[i:end + 1]):
+    print("  ✓ WANT_ADC_BULK already selects NEED_SENSOR_BULK")
+else:
+    lines[end] = lines[end].rstrip() + ' \\'
+    lines.insert(end + 1, '        || WANT_ADC_BULK')
+    print("  ✓ WANT_ADC_BULK now selects NEED_SENSOR_BULK")
+write_lines(kconfig_path, lines)
+PYTHON_SCRIPT
+
+echo ""
+echo -e "${GREEN}=========================================="
+echo "Patch complete!"
+echo "==========================================${NC}"
+echo ""
+echo -e "${YELLOW}Rebuild and flash the MCU firmware (make) to use angle_sample_rate${NC}"
@@ -114,6 +114,9 @@ pattern = r'(defs_kin_generic_cartesian = """[^"]*""")'
 replacement = r'''\1
 defs_kin_winder = """
     struct stepper_kinematics *winder_stepper_alloc(char axis);
+    void winder_stepper_set_gearing(struct stepper_kinematics *sk
+        , double pitch, double width, double origin_turns
+        , double origin_pos);
 """'''
 
 new_content = re.sub(pattern, replacement, content, flags=re.DOTALL)
@@ -0,0 +1,84 @@
+#!/bin/bash
+# Patch Klipper for Hall edge capture (hall_edge_capture)
+#
+# Stock Klipper's pulse counter only reports edge counts. This script
+# installs the counter with an edge time stream:
+#   1. Copy src/pulse_counter.c (config_counter_edges/query_counter_edges)
+#   2. Copy klippy/extras/pulse_counter.py (MCU_counter_edges)
+#   3. Let WANT_PULSE_COUNTER select NEED_SENSOR_BULK in src/Kconfig
+# The MCU firmware must be rebuilt and flashed afterwards. The files are
+# kept only here; the repository's src/ and klippy/extras/ link to them.
+#
+# Usage: ./patch_pulse_counter.sh [KLIPPER_DIR]
+#   KLIPPER_DIR: Path to Klipper source directory (default: ~/klipper)
+
+set -e
+
+KLIPPER_DIR="${1:-~/klipper}"
+KLIPPER_DIR="${KLIPPER_DIR/#\~/$HOME}"  # Expand ~
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+PROJECT_ROOT="$(cd "$SCRIPT_DIR/.." && pwd)"
+
+# Colors
+GREEN='\033[0;32m'
+YELLOW='\033[1;33m'
+RED='\033[0;31m'
+NC='\033[0m'
+
+echo "=========================================="
+echo "Patching Klipper for Hall Edge Capture"
+echo "=========================================="
+echo "Klipper directory: $KLIPPER_DIR"
+echo ""
+
+if [ ! -d "$KLIPPER_DIR/src" ] || [ ! -d "$KLIPPER_DIR/klippy/extras" ]; then
+    echo -e "${RED}ERROR: Not a Klipper source directory: $KLIPPER_DIR${NC}"
+    exit 1
+fi
+
+echo -e "${GREEN}Copying pulse counter files...${NC}"
+cp "$PROJECT_ROOT/src/pulse_counter.c" "$KLIPPER_DIR/src/pulse_counter.c"
+echo "  ✓ src/pulse_counter.c"
+cp "$PROJECT_ROOT/extras/pulse_counter.py" "$KLIPPER_DIR/klippy/extras/pulse_counter.py"
+echo "  ✓ klippy/extras/pulse_counter.py"
+
+echo -e "${GREEN}Patching src/Kconfig...${NC}"
+if [ ! -f "$KLIPPER_DIR/src/Kconfig" ]; then
+    echo -e "${YELLOW}  ⚠ src/Kconfig not found - enable NEED_SENSOR_BULK for WANT_PULSE_COUNTER by hand${NC}"
+    exit 0
+fi
+python3 - "$KLIPPER_DIR/src/Kconfig" << 'PYTHON_SCRIPT'
+import sys
+
+file_path = sys.argv[1]
+with open(file_path, 'r') as f:
+    lines = f.read().split('\n')
+
+# Find the 'depends on' lines of NEED_SENSOR_BULK (with continuations)
+try:
+    start = lines.index('config NEED_SENSOR_BULK')
+except ValueError:
+    print("  ⚠ NEED_SENSOR_BULK not found in src/Kconfig")
+    sys.exit(1)
+i = start + 1
+while not lines[i].strip().startswith('depends on'):
+    i += 1
+end = i
+while lines[end].rstrip().endswith('\\'):
+    end += 1
+if 'WANT_PULSE_COUNTER' in ' '.join(lines[i:end + 1]):
+    print("  ✓ WANT_PULSE_COUNTER already selects NEED_SENSOR_BULK")
+    sys.exit(0)
+lines[end] = lines[end].rstrip() + ' \\'
+lines.insert(end + 1, '        || WANT_PULSE_COUNTER')
+with open(file_path, 'w') as f:
+    f.write('\n'.join(lines))
+print("  ✓ WANT_PULSE_COUNTER now selects NEED_SENSOR_BULK")
+PYTHON_SCRIPT
+
+echo ""
+echo -e "${GREEN}=========================================="
+echo "Patch complete!"
+echo "==========================================${NC}"
+echo ""
+echo -e "${YELLOW}Rebuild and flash the MCU firmware (make) to use hall_edge_capture${NC}"
@@ -12,6 +12,73 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from klipper_interface import KlipperInterface
 
+# Batched winding sends the coil as gcode/script chunks of about this many
+# seconds of motion; each reply returns once the chunk's moves are queued,
+# so waiting for it keeps the toolhead fed without flooding it. A chunk
+# holds the G-code mutex, so this also bounds how long WINDER_STOP waits
+# (0 = the whole coil in one request)
+BATCH_CHUNK_TIME = 60.0
+# Traverse acceleration for time estimates ([printer] max_accel, mm/s^2)
+DEFAULT_ACCEL = 300.0
+# Dwell for the spindle to reach speed before the first pass
+SPINUP_TIME = 0.5
+# Feedrate of the move to the start position (mm/min)
+POSITION_FEEDRATE = 1000
+
+
+def move_time(distance, feedrate, accel=DEFAULT_ACCEL):
+    """Time of a trapezoidal move from and to a standstill"""
+    distance = abs(distance)
+    velocity = feedrate / 60.0
+    if velocity <= 0.0 or distance == 0.0:
+        return 0.0
+    if distance < velocity * velocity / accel:
+        # Triangle profile - never reaches the feedrate
+        return 2.0 * (distance / accel) ** 0.5
+    return distance / velocity + velocity / accel
+
+
+def compile_coil(layers=10, start_y=38.0, end_y=50.0, rpm=100,
+                 wire_diameter=0.056, pause_between_layers=0.5,
+                 feedrate=None, accel=DEFAULT_ACCEL):
+    """
+    The G-code of a whole coil after homing, as (line, estimated seconds)
+    pairs - the same moves wind_coil() sends one request at a time
+    """
+    if feedrate is None:
+        feedrate = (rpm / 60.0) * wire_diameter * 60.0
+    # The move to the start position comes from the homed (Y0) position
+    lines = [(f"G1 Y{start_y} F{POSITION_FEEDRATE}",
+              move_time(start_y, POSITION_FEEDRATE, accel)),
+             (f"SET_WIRE_DIAMETER DIAMETER={wire_diameter}", 0.0),
+             (f"SET_SPINDLE_SPEED RPM={rpm}", 0.0),
+             (f"G4 P{SPINUP_TIME * 1000.0:.0f}", SPINUP_TIME)]
+    pass_time = move_time(end_y - start_y, feedrate, accel)
+    for layer in range(layers):
+        lines.append((f"G1 Y{end_y} F{feedrate:.3f}", pass_time))
+        lines.append((f"G1 Y{start_y} F{feedrate:.3f}", pass_time))
+        if layer < layers - 1 and pause_between_layers > 0.0:
+            lines.append((f"G4 P{pause_between_layers * 1000.0:.0f}",
+                          pause_between_layers))
+    # Final reply only once the last pass has finished
+    lines.append(("M400", 0.0))
+    return lines
+
+
+def chunk_script(lines, chunk_time=BATCH_CHUNK_TIME):
+    """Group compiled lines into (script, estimated seconds) chunks"""
+    chunks = []
+    script, est = [], 0.0
+    for line, t in lines:
+        if script and chunk_time > 0.0 and est + t > chunk_time:
+            chunks.append(("\n".join(script), est))
+            script, est = [], 0.0
+        script.append(line)
+        est += t
+    if script:
+        chunks.append(("\n".join(script), est))
+    return chunks
+
 
 class WindingSequence:
     """High-level winding sequence controller"""
@@ -169,6 +236,53 @@ class WindingSequence:
         print("Winding complete!")
         return True
     
+    def wind_coil_batch(self, layers=10, start_y=38.0, end_y=50.0, rpm=100,
+                        wire_diameter=0.056, pause_between_layers=0.5,
+                        chunk_time=BATCH_CHUNK_TIME, accel=DEFAULT_ACCEL):
+        """
+        Wind a complete coil as a few large gcode/script requests
+        
+        The coil is compiled up front and sent in chunks of about
+        chunk_time seconds of motion, each waiting for the previous
+        reply. Klipper replies once a chunk's moves are in the lookahead
+        queue, so the next chunk arrives while the traverse is still
+        moving - no fixed sleeps and no per-move round trips.
+        
+        Args: as wind_coil(), plus
+            chunk_time: Estimated seconds of motion per request
+            accel: Traverse acceleration used for the reply timeouts
+        """
+        if not self.connected:
+            print("ERROR: Not connected to Klipper")
+            return False
+        
+        chunks = chunk_script(
+            compile_coil(layers, start_y, end_y, rpm, wire_diameter,
+                         pause_between_layers, accel=accel), chunk_time)
+        total = sum(est for script, est in chunks)
+        print(f"Winding coil: {layers} layers, {start_y}mm to {end_y}mm, {rpm} RPM"
+              f" ({len(chunks)} requests, ~{format_duration(total)})")
+        
+        print("Homing traverse...")
+        if not self.home_traverse():
+            print("ERROR: Homing failed")
+            return False
+        
+        start_time = time.time()
+        done = 0.0
+        for i, (script, est) in enumerate(chunks):
+            # The reply can lag the estimate by up to the lookahead time
+            if not self.klipper.send_gcode(script, timeout=est + 30.0):
+                print(f"ERROR: Request {i + 1}/{len(chunks)} failed:"
+                      f" {self.klipper.last_error}")
+                return False
+            done += est
+            print(f"  {i + 1}/{len(chunks)} queued, {100.0 * done / total:.0f}%"
+                  f" ({format_duration(time.time() - start_time)} elapsed)")
+        
+        print("Winding complete!")
+        return True
+    
     def get_motor_status(self):
         """Get motor/spindle status"""
         status = self.get_status()
@@ -185,6 +299,37 @@ class WindingSequence:
         return None
 
 
+def format_duration(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m{seconds:02d}s"
+    return f"{minutes}m{seconds:02d}s"
+
+
+def print_dry_run(args):
+    """Report the batched coil without connecting to Klipper"""
+    lines = compile_coil(args.layers, args.start_y, args.end_y, args.rpm,
+                         args.wire_diameter, accel=args.accel)
+    chunks = chunk_script(lines, args.chunk_time)
+    feedrate = (args.rpm / 60.0) * args.wire_diameter * 60.0
+    pass_time = move_time(args.end_y - args.start_y, feedrate, args.accel)
+    total = sum(t for line, t in lines)
+    print("Dry run (not connected, homing not included):")
+    print(f"  Layers:        {args.layers} ({2 * args.layers} passes of"
+          f" {abs(args.end_y - args.start_y):.2f}mm)")
+    print(f"  Feedrate:      {feedrate:.3f} mm/min, {pass_time:.1f}s per pass")
+    print(f"  G-code lines:  {len(lines)}")
+    # wind_coil(): home, start move, wire diameter, then 3 per layer
+    print(f"  Requests:      {1 + len(chunks)} (per-move path:"
+          f" {3 + 3 * args.layers})")
+    print(f"  Wind time:     ~{format_duration(total)}")
+    if args.save_gcode:
+        with open(args.save_gcode, 'w') as f:
+            f.write("\n".join(line for line, t in lines) + "\n")
+        print(f"  G-code written to {args.save_gcode}")
+
+
 def main():
     import argparse
     
@@ -201,6 +346,12 @@ Examples:
   
   # Get status
   python3 winding_sequence.py --status
+  
+  # Wind 40 layers as a few large requests
+  python3 winding_sequence.py --wind --batch --layers 40
+  
+  # Estimated wind time and request count, without connecting
+  python3 winding_sequence.py --dry-run --layers 40 --rpm 1000
         """
     )
     
@@ -224,9 +375,24 @@ Examples:
                        help='Test motor at specified RPM')
     parser.add_argument('--stop', action='store_true',
                        help='Stop winding/motor')
+    parser.add_argument('--batch', action='store_true',
+                       help='With --wind: send the coil as a few large scripts')
+    parser.add_argument('--chunk-time', type=float, default=BATCH_CHUNK_TIME,
+                       help='Seconds of motion per batched request'
+                            ' (0 = one request)')
+    parser.add_argument('--accel', type=float, default=DEFAULT_ACCEL,
+                       help='Traverse acceleration for estimates (mm/s^2)')
+    parser.add_argument('--dry-run', action='store_true',
+                       help='Report the batched coil and wind time, no connection')
+    parser.add_argument('--save-gcode', metavar='FILE',
+                       help='With --dry-run: write the compiled G-code')
     
     args = parser.parse_args()
     
+    if args.dry_run:
+        print_dry_run(args)
+        return 0
+    
     # Create sequence controller
     seq = WindingSequence(args.socket)
     
@@ -264,7 +430,11 @@ Examples:
             print("Stopping...")
             seq.stop_winding()
         
-        if args.wind:
+        if args.wind and args.batch:
+            seq.wind_coil_batch(args.layers, args.start_y, args.end_y,
+                               args.rpm, args.wire_diameter,
+                               chunk_time=args.chunk_time, accel=args.accel)
+        elif args.wind:
             seq.wind_coil(args.layers, args.start_y, args.end_y, 
                          args.rpm, args.wire_diameter)
         
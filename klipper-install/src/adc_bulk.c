@@ -0,0 +1,157 @@
+// Fixed rate analog input sampling reported via sensor_bulk_data
+//
+// Copyright (C) 2024
+//
+// This file may be distributed under the terms of the GNU GPLv3 license.
+
+#include "basecmd.h" // oid_alloc
+#include "board/gpio.h" // struct gpio_adc
+#include "board/irq.h" // irq_disable
+#include "board/misc.h" // timer_read_time
+#include "command.h" // DECL_COMMAND
+#include "sched.h" // DECL_TASK
+#include "sensor_bulk.h" // sensor_bulk_report
+
+#define SAMPLE_BUFFER 32
+#define BYTES_PER_SAMPLE 2
+
+struct adc_bulk {
+    struct timer timer;
+    uint32_t rest_ticks, next_begin_time;
+    struct gpio_adc pin;
+    uint8_t flags, head, tail;
+    uint16_t samples[SAMPLE_BUFFER];
+    struct sensor_bulk sb;
+};
+
+enum {
+    AB_RUNNING = 1<<0,
+};
+
+static struct task_wake adc_bulk_wake;
+
+// Number of samples taken but not yet moved to the sensor_bulk buffer
+static uint_fast8_t
+adc_bulk_pending(struct adc_bulk *ab)
+{
+    return (uint8_t)(ab->head - ab->tail) % SAMPLE_BUFFER;
+}
+
+static uint_fast8_t
+adc_bulk_event(struct timer *timer)
+{
+    struct adc_bulk *ab = container_of(timer, struct adc_bulk, timer);
+    uint32_t sample_delay = gpio_adc_sample(ab->pin);
+    if (sample_delay) {
+        ab->timer.waketime += sample_delay;
+        return SF_RESCHEDULE;
+    }
+    uint16_t value = gpio_adc_read(ab->pin);
+    uint8_t next = (ab->head + 1) % SAMPLE_BUFFER;
+    if (next == ab->tail) {
+        ab->sb.possible_overflows++;
+    } else {
+        ab->samples[ab->head] = value;
+        ab->head = next;
+    }
+    sched_wake_task(&adc_bulk_wake);
+    ab->next_begin_time += ab->rest_ticks;
+    ab->timer.waketime = ab->next_begin_time;
+    return SF_RESCHEDULE;
+}
+
+void
+command_config_adc_bulk(uint32_t *args)
+{
+    struct gpio_adc pin = gpio_adc_setup(args[1]);
+    struct adc_bulk *ab = oid_alloc(args[0], command_config_adc_bulk
+                                    , sizeof(*ab));
+    ab->timer.func = adc_bulk_event;
+    ab->pin = pin;
+}
+DECL_COMMAND(command_config_adc_bulk, "config_adc_bulk oid=%c pin=%u");
+
+// Start/stop capturing samples
+void
+command_query_adc_bulk(uint32_t *args)
+{
+    struct adc_bulk *ab = oid_lookup(args[0], command_config_adc_bulk);
+
+    sched_del_timer(&ab->timer);
+    gpio_adc_cancel_sample(ab->pin);
+    ab->flags = 0;
+    ab->head = ab->tail = 0;
+    if (!args[1])
+        // End measurements
+        return;
+
+    // Start new measurements query
+    ab->rest_ticks = args[1];
+    sensor_bulk_reset(&ab->sb);
+    irq_disable();
+    ab->next_begin_time = timer_read_time() + ab->rest_ticks;
+    ab->timer.waketime = ab->next_begin_time;
+    ab->flags = AB_RUNNING;
+    sched_add_timer(&ab->timer);
+    irq_enable();
+}
+DECL_COMMAND(command_query_adc_bulk, "query_adc_bulk oid=%c rest_ticks=%u");
+
+void
+command_query_adc_bulk_status(uint32_t *args)
+{
+    uint8_t oid = args[0];
+    struct adc_bulk *ab = oid_lookup(oid, command_config_adc_bulk);
+    irq_disable();
+    uint32_t time1 = timer_read_time();
+    uint_fast8_t pending = adc_bulk_pending(ab);
+    irq_enable();
+    uint32_t time2 = timer_read_time();
+    sensor_bulk_status(&ab->sb, oid, time1, time2 - time1
+                       , pending * BYTES_PER_SAMPLE);
+}
+DECL_COMMAND(command_query_adc_bulk_status, "query_adc_bulk_status oid=%c");
+
+// Move taken samples into sensor_bulk_data messages
+void
+adc_bulk_task(void)
+{
+    if (!sched_check_wake(&adc_bulk_wake))
+        return;
+    uint8_t oid;
+    struct adc_bulk *ab;
+    foreach_oid(oid, ab, command_config_adc_bulk) {
+        if (!(ab->flags & AB_RUNNING))
+            continue;
+        for (;;) {
+            irq_disable();
+            uint8_t tail = ab->tail;
+            if (tail == ab->head) {
+                irq_enable();
+                break;
+            }
+            uint16_t value = ab->samples[tail];
+            ab->tail = (tail + 1) % SAMPLE_BUFFER;
+            irq_enable();
+            uint8_t *d = &ab->sb.data[ab->sb.data_count];
+            d[0] = value;
+            d[1] = value >> 8;
+            ab->sb.data_count += BYTES_PER_SAMPLE;
+            if (ab->sb.data_count + BYTES_PER_SAMPLE > ARRAY_SIZE(ab->sb.data))
+                sensor_bulk_report(&ab->sb, oid);
+        }
+    }
+}
+DECL_TASK(adc_bulk_task);
+
+void
+adc_bulk_shutdown(void)
+{
+    uint8_t oid;
+    struct adc_bulk *ab;
+    foreach_oid(oid, ab, command_config_adc_bulk) {
+        gpio_adc_cancel_sample(ab->pin);
+        ab->flags = 0;
+    }
+}
+DECL_SHUTDOWN(adc_bulk_shutdown);
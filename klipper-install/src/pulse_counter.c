@@ -0,0 +1,199 @@
+// Commands for counting edges on GPIO input pins
+//
+// Copyright (C) 2021  Adrian Keet <arkeet@gmail.com>
+//
+// This file may be distributed under the terms of the GNU GPLv3 license.
+
+#include "basecmd.h" // oid_alloc
+#include "board/gpio.h" // struct gpio_in
+#include "board/irq.h" // irq_disable
+#include "board/misc.h" // timer_read_time
+#include "command.h" // DECL_COMMAND
+#include "sched.h" // DECL_TASK
+#include "sensor_bulk.h" // sensor_bulk_report
+
+struct counter {
+    struct timer timer;
+    uint32_t poll_ticks;
+    uint32_t sample_ticks, next_sample_time;
+    uint32_t count, last_count_time;
+    uint8_t flags;
+    struct gpio_in pin;
+    struct counter_edges *edges;
+};
+
+// Optional capture of every edge time, reported via sensor_bulk_data
+#define BYTES_PER_EDGE 4
+
+struct counter_edges {
+    struct sensor_bulk sb;
+    uint8_t oid;
+    uint16_t size, head, tail;
+    uint32_t times[];
+};
+
+enum {
+    CF_PENDING = 1, CF_EDGES = 2,
+};
+
+static struct task_wake counter_wake;
+
+// Store an edge time (the low bit holds the new pin level)
+static void
+counter_edge_store(struct counter *c, uint32_t time, uint8_t value)
+{
+    struct counter_edges *ce = c->edges;
+    uint16_t next = ce->head + 1;
+    if (next >= ce->size)
+        next = 0;
+    if (next == ce->tail) {
+        ce->sb.possible_overflows++;
+        return;
+    }
+    ce->times[ce->head] = (time & ~1) | value;
+    ce->head = next;
+}
+
+static uint_fast8_t
+counter_event(struct timer *timer)
+{
+    struct counter *c = container_of(timer, struct counter, timer);
+
+    uint32_t time = c->timer.waketime;
+    uint8_t last_value = c->count & 1;
+    uint8_t value = gpio_in_read(c->pin);
+    if (last_value != value) {
+        c->count++;
+        c->last_count_time = time;
+        if (c->flags & CF_EDGES)
+            counter_edge_store(c, time, value);
+    }
+    // useful invariant: c->count & 1 == value
+
+    if (timer_is_before(c->next_sample_time, time)) {
+        c->flags |= CF_PENDING;
+        c->next_sample_time = time + c->sample_ticks;
+        sched_wake_task(&counter_wake);
+    }
+
+    c->timer.waketime += c->poll_ticks;
+    return SF_RESCHEDULE;
+}
+
+void
+command_config_counter(uint32_t *args)
+{
+    struct counter *c = oid_alloc(
+        args[0], command_config_counter, sizeof(*c));
+    c->pin = gpio_in_setup(args[1], args[2]);
+    c->timer.func = counter_event;
+}
+DECL_COMMAND(command_config_counter,
+             "config_counter oid=%c pin=%u pull_up=%c");
+
+void
+command_query_counter(uint32_t *args)
+{
+    struct counter *c = oid_lookup(args[0], command_config_counter);
+    sched_del_timer(&c->timer);
+    c->timer.waketime = args[1];
+    c->poll_ticks = args[2];
+    c->sample_ticks = args[3];
+    c->next_sample_time = c->timer.waketime; // sample immediately
+    sched_add_timer(&c->timer);
+}
+DECL_COMMAND(command_query_counter,
+             "query_counter oid=%c clock=%u poll_ticks=%u sample_ticks=%u");
+
+void
+command_config_counter_edges(uint32_t *args)
+{
+    // The host sizes the ring for every edge of one counter_state period
+    uint16_t size = args[2];
+    if (size < 2)
+        shutdown("Invalid counter edge buffer size");
+    struct counter_edges *ce = oid_alloc(
+        args[0], command_config_counter_edges
+        , sizeof(*ce) + size * sizeof(ce->times[0]));
+    struct counter *c = oid_lookup(args[1], command_config_counter);
+    ce->oid = args[0];
+    ce->size = size;
+    c->edges = ce;
+}
+DECL_COMMAND(command_config_counter_edges,
+             "config_counter_edges oid=%c counter_oid=%c size=%hu");
+
+void
+command_query_counter_edges(uint32_t *args)
+{
+    struct counter_edges *ce = oid_lookup(args[0]
+                                          , command_config_counter_edges);
+    uint8_t oid;
+    struct counter *c;
+    foreach_oid(oid, c, command_config_counter) {
+        if (c->edges != ce)
+            continue;
+        irq_disable();
+        c->flags &= ~CF_EDGES;
+        ce->head = ce->tail = 0;
+        sensor_bulk_reset(&ce->sb);
+        if (args[1])
+            c->flags |= CF_EDGES;
+        irq_enable();
+    }
+}
+DECL_COMMAND(command_query_counter_edges,
+             "query_counter_edges oid=%c enable=%c");
+
+// Move captured edge times into sensor_bulk_data messages
+static void
+counter_edges_flush(struct counter_edges *ce)
+{
+    for (;;) {
+        irq_disable();
+        uint16_t tail = ce->tail;
+        if (tail == ce->head) {
+            irq_enable();
+            break;
+        }
+        uint32_t time = ce->times[tail];
+        ce->tail = tail + 1 < ce->size ? tail + 1 : 0;
+        irq_enable();
+        uint8_t *d = &ce->sb.data[ce->sb.data_count];
+        d[0] = time;
+        d[1] = time >> 8;
+        d[2] = time >> 16;
+        d[3] = time >> 24;
+        ce->sb.data_count += BYTES_PER_EDGE;
+        if (ce->sb.data_count + BYTES_PER_EDGE > ARRAY_SIZE(ce->sb.data))
+            sensor_bulk_report(&ce->sb, ce->oid);
+    }
+    if (ce->sb.data_count)
+        sensor_bulk_report(&ce->sb, ce->oid);
+}
+
+void
+counter_task(void)
+{
+    if (!sched_check_wake(&counter_wake))
+        return;
+
+    uint8_t oid;
+    struct counter *c;
+    foreach_oid(oid, c, command_config_counter) {
+        if (!(c->flags & CF_PENDING))
+            continue;
+        irq_disable();
+        uint32_t waketime = c->timer.waketime;
+        uint32_t count = c->count;
+        uint32_t count_time = c->last_count_time;
+        c->flags &= ~CF_PENDING;
+        irq_enable();
+        if (c->flags & CF_EDGES)
+            // Send the edges first so the host has them with the report
+            counter_edges_flush(c->edges);
+        sendf("counter_state oid=%c next_clock=%u count=%u count_clock=%u",
+              oid, waketime, count, count_time);
+    }
+}
+DECL_TASK(counter_task);
@@ -124,6 +124,9 @@ defs_kin_generic_cartesian = """
 """
 defs_kin_winder = """
     struct stepper_kinematics *winder_stepper_alloc(char axis);
+    void winder_stepper_set_gearing(struct stepper_kinematics *sk
+        , double pitch, double width, double origin_turns
+        , double origin_pos);
 """
 
 defs_kin_corexy = """
@@ -7,8 +7,10 @@
 // Winder kinematics for CNC Guitar Pickup Winder:
 // - Y-axis (traverse) stepper synchronized with spindle rotation
 // - Accounts for gear ratios, wire diameter, and layer calculations
-// - Future: Real-time spindle RPM feedback for dynamic synchronization
+// - Electronic gearing: traverse position derived from spindle turns
 
+#include <math.h> // fmod
+#include <stddef.h> // offsetof
 #include <stdlib.h> // malloc
 #include <string.h> // memset
 #include "compiler.h" // __visible
@@ -18,29 +20,79 @@
 
 struct winder_stepper {
     struct stepper_kinematics sk;
-    // Future: Add spindle sync parameters
-    // double gear_ratio;           // Motor:Spindle gear ratio (e.g., 0.667 for 40:60)
-    // double wire_diameter;         // Wire diameter in mm (e.g., 0.056 for 43AWG)
-    // double bobbin_diameter;        // Current bobbin diameter (changes with layers)
-    // double current_layer;         // Current layer number
+    // Electronic gearing parameters (pitch == 0 when disabled)
+    double pitch;                   // Traverse travel per spindle turn (mm)
+    double width;                   // Traverse stroke between reversals (mm)
+    double origin_turns;            // Spindle turns at the start of the wind
+    double origin_pos;              // Traverse position at origin_turns
 };
 
 static double
 winder_stepper_y_calc_position(struct stepper_kinematics *sk, struct move *m
                                , double move_time)
 {
-    // For now, this is identical to cartesian Y-axis calculation
-    // The synchronization happens at the Python level when creating moves
-    // Future: Could add real-time spindle RPM feedback here for tighter sync
+    // Traverse driven by toolhead moves (homing, positioning, velocity sync)
     return move_get_coord(m, move_time).y;
 }
 
+// Map spindle turns to a traverse position.  The traverse moves
+// "pitch" mm per spindle turn and reverses direction every "width" mm,
+// so the resulting position is a triangle wave of the spindle angle:
+//     dist = (turns - origin_turns) * |pitch|
+//     pos = origin_pos + sign(pitch) * fold(dist, width)
+static double
+winder_gear_position(struct winder_stepper *ws, double turns)
+{
+    double dist = (turns - ws->origin_turns) * fabs(ws->pitch);
+    if (dist <= 0.)
+        // Spindle has not reached the start of the wind yet
+        return ws->origin_pos;
+    double width = ws->width;
+    if (width > 0.) {
+        dist = fmod(dist, 2. * width);
+        if (dist > width)
+            dist = 2. * width - dist;
+    }
+    return ws->pitch < 0. ? ws->origin_pos - dist : ws->origin_pos + dist;
+}
+
+static double
+winder_stepper_gear_calc_position(struct stepper_kinematics *sk, struct move *m
+                                  , double move_time)
+{
+    // Traverse driven by the spindle trapq (coordinate x is spindle turns)
+    struct winder_stepper *ws = container_of(sk, struct winder_stepper, sk);
+    return winder_gear_position(ws, move_get_coord(m, move_time).x);
+}
+
+// Enable (pitch != 0) or disable (pitch == 0) electronic gearing.  The
+// caller must flush step generation and switch the stepper to the
+// spindle trapq (or back to the toolhead trapq) around this call.
+void __visible
+winder_stepper_set_gearing(struct stepper_kinematics *sk, double pitch
+                           , double width, double origin_turns
+                           , double origin_pos)
+{
+    struct winder_stepper *ws = container_of(sk, struct winder_stepper, sk);
+    ws->pitch = pitch;
+    ws->width = width;
+    ws->origin_turns = origin_turns;
+    ws->origin_pos = origin_pos;
+    if (pitch) {
+        ws->sk.calc_position_cb = winder_stepper_gear_calc_position;
+        ws->sk.active_flags = AF_X;
+    } else {
+        ws->sk.calc_position_cb = winder_stepper_y_calc_position;
+        ws->sk.active_flags = AF_Y;
+    }
+}
+
 struct stepper_kinematics * __visible
 winder_stepper_alloc(char axis)
 {
     struct winder_stepper *ws = malloc(sizeof(*ws));
     memset(ws, 0, sizeof(*ws));
-    
+
     if (axis == 'y') {
         ws->sk.calc_position_cb = winder_stepper_y_calc_position;
         ws->sk.active_flags = AF_Y;
@@ -50,7 +102,6 @@ winder_stepper_alloc(char axis)
         free(ws);
         return NULL;
     }
-    
+
     return &ws->sk;
 }
-
@@ -162,6 +162,9 @@ class PrinterMotionReport:
     def register_stepper(self, config, mcu_stepper):
         ds = DumpStepper(self.printer, mcu_stepper)
         self.steppers[mcu_stepper.get_name()] = ds
+    def register_trapq(self, name, trapq):
+        # Report an additional trapq (eg, a module owned auxiliary axis)
+        self.dtrapqs[name] = DumpTrapQ(self.printer, name, trapq)
     def _connect(self):
         # Lookup toolhead trapq
         toolhead = self.printer.lookup_object("toolhead")
@@ -0,0 +1 @@
+../../klipper-install/extras/pulse_counter.py
\ No newline at end of file
@@ -3,7 +3,7 @@
 # Copyright (C) 2016-2019  Kevin O'Connor <kevin@koconnor.net>
 #
 # This file may be distributed under the terms of the GNU GPLv3 license.
-import logging, logging.handlers, threading, queue, time
+import logging, logging.handlers, threading, queue, time, traceback
 
 # Class to forward all messages through a queue to a background thread
 class QueueHandler(logging.Handler):
@@ -20,6 +20,11 @@ class QueueHandler(logging.Handler):
         except Exception:
             self.handleError(record)
 
+# Message that is only built (by calling format_cb) in the background thread
+class DeferredRecord:
+    def __init__(self, format_cb):
+        self.format_cb = format_cb
+
 # Class to poll a queue in a background thread and log each message
 class QueueListener(logging.handlers.TimedRotatingFileHandler):
     def __init__(self, filename):
@@ -34,7 +39,21 @@ class QueueListener(logging.handlers.TimedRotatingFileHandler):
             record = self.bg_queue.get(True)
             if record is None:
                 break
+            if isinstance(record, DeferredRecord):
+                record = self._build_record(record)
+                if record is None:
+                    continue
             self.handle(record)
+    def _build_record(self, deferred):
+        try:
+            msg = deferred.format_cb()
+        except Exception:
+            msg = "Exception in deferred log message\n%s" % (
+                traceback.format_exc(),)
+        if not msg:
+            return None
+        return logging.makeLogRecord({'msg': msg, 'levelno': logging.INFO,
+                                      'levelname': 'INFO'})
     def stop(self):
         self.bg_queue.put_nowait(None)
         self.bg_thread.join()
@@ -66,6 +85,15 @@ def setup_bg_logging(filename, debuglevel):
     root.setLevel(debuglevel)
     return ql
 
+# Log the message returned by format_cb() without formatting it here
+def log_deferred(format_cb):
+    if MainQueueHandler is None:
+        msg = format_cb()
+        if msg:
+            logging.info(msg)
+        return
+    MainQueueHandler.queue.put_nowait(DeferredRecord(format_cb))
+
 def clear_bg_logging():
     global MainQueueHandler
     if MainQueueHandler is not None:
@@ -166,6 +166,11 @@ class DataLogger:
                 driver = ' '.join(cfgname.split()[1:])
                 self.send_subscribe("stallguard:" + driver,
                                     "tmc/stallguard_dump", {"name": driver})
+        # Subscribe to winder spindle turns, Hall edges and sync updates
+        if "winder" in config:
+            for stream in ["spindle", "hall", "sync"]:
+                self.send_subscribe("winder_" + stream,
+                                    "winder/dump_" + stream, {})
     def handle_dump(self, msg, raw_msg):
         msg_id = msg["id"]
         if "result" not in msg:
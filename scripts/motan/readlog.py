@@ -562,6 +562,189 @@ class HandleEddyCurrent:
             self.data_pos += 1
 LogHandlers["ldc1612"] = HandleEddyCurrent
 
+# Extract winder spindle speed and angle from its turn crossings
+WINDER_TURN_GAP = 1.0
+class HandleWinderSpindle:
+    SubscriptionIdParts = 1
+    ParametersMin = ParametersMax = 1
+    DataSets = [
+        ('winder_spindle(rpm)', 'Winder spindle speed'),
+        ('winder_spindle(angle)', 'Winder spindle angle (0-360)'),
+        ('winder_spindle(turns)', 'Winder spindle turn count'),
+        ('winder_spindle(traverse_pos)', 'Traverse position at each turn'),
+        ('winder_spindle(pitch_error)', 'Traverse travel per turn minus'
+         ' the pitch'),
+    ]
+    def __init__(self, lmanager, name, name_parts):
+        self.name = name
+        self.jdispatch = lmanager.get_jdispatch()
+        self.next_turn = self.prev_turn = (0., 0, 0., None, None)
+        self.cur_data = []
+        self.data_pos = 0
+        ptypes = {
+            'rpm': ('Spindle speed', 'Speed\n(RPM)'),
+            'angle': ('Spindle angle', 'Angle\n(deg)'),
+            'turns': ('Spindle turns', 'Turns'),
+            'traverse_pos': ('Traverse position per turn', 'Position\n(mm)'),
+            'pitch_error': ('Pitch error', 'Position\n(mm)'),
+        }
+        self.datasel = name_parts[1]
+        if self.datasel not in ptypes:
+            raise error("Unknown winder_spindle selection '%s'"
+                        % (self.datasel,))
+        label, units = ptypes[self.datasel]
+        self.label = {'label': label, 'units': units}
+    def get_label(self):
+        return self.label
+    def _get_value(self, req_time):
+        prev_time, prev_turn, prev_rpm, prev_pos, prev_err = self.prev_turn
+        next_time, next_turn, next_rpm, next_pos, next_err = self.next_turn
+        datasel = self.datasel
+        if datasel == 'pitch_error':
+            # Known at the end of each turn, not in between
+            return float('nan') if next_err is None else next_err
+        if next_time - prev_time > WINDER_TURN_GAP:
+            # Spindle stopped (or not streamed) between these turns
+            if datasel == 'rpm':
+                return 0.
+            if datasel in ('turns', 'angle'):
+                next_turn = prev_turn
+            prev_time = next_time - 1.
+        if datasel in ('turns', 'angle'):
+            turns = interpolate(next_turn, prev_turn, next_time, prev_time,
+                                req_time)
+            if datasel == 'angle':
+                return (turns % 1.) * 360.
+            return turns
+        if datasel == 'rpm':
+            return interpolate(next_rpm, prev_rpm, next_time, prev_time,
+                               req_time)
+        if prev_pos is None or next_pos is None:
+            return float('nan')
+        return interpolate(next_pos, prev_pos, next_time, prev_time, req_time)
+    def pull_data(self, req_time):
+        while 1:
+            if req_time <= self.next_turn[0]:
+                return self._get_value(req_time)
+            if self.data_pos >= len(self.cur_data):
+                # Read next data block
+                jmsg = self.jdispatch.pull_msg(req_time, self.name)
+                if jmsg is None:
+                    if self.datasel == 'rpm':
+                        return 0.
+                    return self._get_value(self.next_turn[0])
+                self.cur_data = jmsg['data']
+                self.data_pos = 0
+                continue
+            self.prev_turn = self.next_turn
+            self.next_turn = self.cur_data[self.data_pos]
+            self.data_pos += 1
+LogHandlers["winder_spindle"] = HandleWinderSpindle
+
+# Extract winder spindle Hall edges
+class HandleWinderHall:
+    SubscriptionIdParts = 1
+    ParametersMin = ParametersMax = 1
+    DataSets = [
+        ('winder_hall(count)', 'Spindle Hall edge count'),
+        ('winder_hall(rpm)', 'Spindle speed from the last Hall pulse'),
+    ]
+    def __init__(self, lmanager, name, name_parts):
+        self.name = name
+        self.jdispatch = lmanager.get_jdispatch()
+        if name_parts[1] not in ('count', 'rpm'):
+            raise error("Unknown winder_hall selection '%s'"
+                        % (name_parts[1],))
+        self.report_rpm = name_parts[1] == 'rpm'
+        config = lmanager.get_initial_status()['configfile']['settings']
+        ppr = config.get('winder', {}).get('spindle_hall_ppr', 1)
+        # Edge counts include both pin levels
+        self.edges_per_rev = 2. * int(ppr)
+        self.next_edge_time = 0.
+        self.count = self.next_count = 0
+        self.rpm = self.next_rpm = 0.
+        # Last edge (time, count) of each pin level
+        self.last_edges = [None, None]
+        self.cur_data = []
+        self.data_pos = 0
+    def get_label(self):
+        if self.report_rpm:
+            return {'label': 'Spindle Hall speed', 'units': 'Speed\n(RPM)'}
+        return {'label': 'Spindle Hall edges', 'units': 'Count'}
+    def pull_data(self, req_time):
+        while 1:
+            if req_time < self.next_edge_time:
+                return self.rpm if self.report_rpm else self.count
+            self.count, self.rpm = self.next_count, self.next_rpm
+            if self.data_pos >= len(self.cur_data):
+                # Read next data block
+                jmsg = self.jdispatch.pull_msg(req_time, self.name)
+                if jmsg is None:
+                    return self.rpm if self.report_rpm else self.count
+                self.cur_data = jmsg['data']
+                self.data_pos = 0
+                continue
+            edge_time, count = self.cur_data[self.data_pos]
+            self.data_pos += 1
+            # Speed over the last whole pulse (same pin level), as the Hall
+            # duty cycle is not 50%
+            last = self.last_edges[count & 1]
+            if last is not None and edge_time > last[0]:
+                self.next_rpm = (60. * (count - last[1]) / self.edges_per_rev
+                                 / (edge_time - last[0]))
+            self.last_edges[count & 1] = (edge_time, count)
+            self.next_edge_time = edge_time
+            self.next_count = count
+LogHandlers["winder_hall"] = HandleWinderHall
+
+# Extract winder traverse sync updates
+class HandleWinderSync:
+    SubscriptionIdParts = 1
+    ParametersMin = ParametersMax = 1
+    DataSets = [
+        ('winder_sync(traverse_speed)', 'Traverse speed set by the sync'),
+        ('winder_sync(correction)', 'Traverse speed change of each sync'),
+        ('winder_sync(spindle_rpm)', 'Spindle speed used by the sync'),
+    ]
+    def __init__(self, lmanager, name, name_parts):
+        self.name = name
+        self.jdispatch = lmanager.get_jdispatch()
+        fields = ['spindle_rpm', 'traverse_speed', 'correction']
+        if name_parts[1] not in fields:
+            raise error("Unknown winder_sync selection '%s'"
+                        % (name_parts[1],))
+        self.field = fields.index(name_parts[1]) + 1
+        self.sel = name_parts[1]
+        self.next_sync = self.cur_sync = (0., 0., 0., 0.)
+        self.cur_data = []
+        self.data_pos = 0
+    def get_label(self):
+        if self.sel == 'spindle_rpm':
+            return {'label': 'Sync spindle speed', 'units': 'Speed\n(RPM)'}
+        label = {'traverse_speed': 'Sync traverse speed',
+                 'correction': 'Sync correction'}[self.sel]
+        return {'label': label, 'units': 'Velocity\n(mm/s)'}
+    def pull_data(self, req_time):
+        while 1:
+            if req_time < self.next_sync[0]:
+                break
+            self.cur_sync = self.next_sync
+            if self.data_pos >= len(self.cur_data):
+                # Read next data block
+                jmsg = self.jdispatch.pull_msg(req_time, self.name)
+                if jmsg is None:
+                    break
+                self.cur_data = jmsg['data']
+                self.data_pos = 0
+                continue
+            self.next_sync = self.cur_data[self.data_pos]
+            self.data_pos += 1
+        if self.sel == 'correction' and req_time >= self.next_sync[0]:
+            # A correction is an event, not a level
+            return 0.
+        return self.cur_sync[self.field]
+LogHandlers["winder_sync"] = HandleWinderSync
+
 
 ######################################################################
 # Log reading
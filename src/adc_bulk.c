@@ -0,0 +1 @@
+../klipper-install/src/adc_bulk.c
\ No newline at end of file
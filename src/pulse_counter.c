@@ -0,0 +1 @@
+../klipper-install/src/pulse_counter.c
\ No newline at end of file